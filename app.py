@@ -1,19 +1,37 @@
-from flask import Flask, request, jsonify, render_template
-from conversation_agent import process_voice_query
-import base64
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
+from conversation_agent import process_voice_query, process_voice_query_stream
 import logging
 
+import serving_common
+from serving_common import SESSION_COOKIE, SSE_HEADERS
+
 app = Flask(__name__)
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 app.logger.setLevel(logging.DEBUG)
 
+serving_common.start_background_jobs()
+
 @app.route('/')
 def index():
     app.logger.debug("Serving index page")
     return render_template('index.html')
 
+def _session():
+    # -> (token, session_id); see serving_common.resolve_session
+    return serving_common.resolve_session(request.headers, request.cookies)
+
+def _with_session_cookie(response, token):
+    if request.cookies.get(SESSION_COOKIE) != token:
+        response.set_cookie(SESSION_COOKIE, token, httponly=True, samesite='Lax')
+    response.headers['X-Session-ID'] = token
+    return response
+
+@app.route('/health')
+def health():
+    return jsonify(serving_common.health_payload())
+
 @app.route('/process_voice', methods=['POST'])
 def process_voice():
     app.logger.debug("Received POST to /process_voice")
@@ -23,18 +41,47 @@ def process_voice():
     audio_file = request.files['audio']
     audio_data = audio_file.read()
     app.logger.debug(f"Audio data length: {len(audio_data)} bytes")
+    token, sid = _session()
+    # ?audio=wav: raw WAV body, texts in headers; default: JSON with base64 audio.
+    raw_audio = serving_common.wants_raw_audio(request.args)
     try:
         app.logger.debug("Calling process_voice_query")
-        assistant_text, audio_b64, user_text, lang = process_voice_query(audio_data)
+        assistant_text, wav, user_text, lang = process_voice_query(audio_data, raw_audio=True, session_id=sid)
         app.logger.debug(
             "process_voice_query returned: "
             f"user_text length {len(user_text)}, assistant_text length {len(assistant_text)}, "
-            f"lang {lang}, audio_b64 length {len(audio_b64) if audio_b64 else 0}"
+            f"lang {lang}, audio length {len(wav) if wav else 0} bytes"
         )
-        return jsonify({'user': user_text, 'response': assistant_text, 'audio': audio_b64, 'lang': lang})
+        if raw_audio:
+            headers = serving_common.raw_audio_headers(user_text, assistant_text, lang)
+            return _with_session_cookie(Response(wav or b'', mimetype='audio/wav', headers=headers), token)
+        return _with_session_cookie(jsonify(serving_common.voice_payload(user_text, assistant_text, wav, lang)), token)
     except Exception as e:
         app.logger.error(f"Error in process_voice_query: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/process_voice_stream', methods=['POST'])
+def process_voice_stream():
+    # Server-sent events: one `sentence` event per spoken sentence, so the browser
+    # can start playback before the whole answer has been synthesized.
+    app.logger.debug("Received POST to /process_voice_stream")
+    if 'audio' not in request.files:
+        app.logger.error("No audio file in request")
+        return jsonify({'error': 'No audio file'}), 400
+    audio_data = request.files['audio'].read()
+    app.logger.debug(f"Audio data length: {len(audio_data)} bytes")
+    token, sid = _session()
+
+    def generate():
+        try:
+            for event in process_voice_query_stream(audio_data, session_id=sid):
+                yield serving_common.sse(event.get('type', 'message'), event)
+        except Exception as e:
+            app.logger.error(f"Error in process_voice_query_stream: {str(e)}", exc_info=True)
+            yield serving_common.sse('error', {'error': str(e)})
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers=SSE_HEADERS)
+    return _with_session_cookie(response, token)
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,91 @@
+from quart import Quart, Response, request, jsonify, render_template
+from conversation_agent import process_voice_query_async, process_voice_query_stream_async
+import logging
+
+import serving_common
+from serving_common import SESSION_COOKIE, SSE_HEADERS
+
+# Async twin of app.py: the same routes, served by Quart on one event loop.
+# Turns await the STT/translate/LLM/TTS calls instead of holding a worker thread each,
+# so many concurrent conversations fit in one process. Run with
+#   python app_async.py            (development)
+#   hypercorn app_async:app        (production)
+app = Quart(__name__)
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+app.logger.setLevel(logging.DEBUG)
+
+serving_common.start_background_jobs()
+
+@app.route('/')
+async def index():
+    app.logger.debug("Serving index page")
+    return await render_template('index.html')
+
+def _session():
+    # -> (token, session_id); see serving_common.resolve_session
+    return serving_common.resolve_session(request.headers, request.cookies)
+
+def _with_session_cookie(response, token):
+    if request.cookies.get(SESSION_COOKIE) != token:
+        response.set_cookie(SESSION_COOKIE, token, httponly=True, samesite='Lax')
+    response.headers['X-Session-ID'] = token
+    return response
+
+async def _read_audio():
+    files = await request.files
+    if 'audio' not in files:
+        return None
+    return files['audio'].read()
+
+@app.route('/health')
+async def health():
+    return jsonify(serving_common.health_payload())
+
+@app.route('/process_voice', methods=['POST'])
+async def process_voice():
+    app.logger.debug("Received POST to /process_voice")
+    audio_data = await _read_audio()
+    if audio_data is None:
+        app.logger.error("No audio file in request")
+        return jsonify({'error': 'No audio file'}), 400
+    app.logger.debug(f"Audio data length: {len(audio_data)} bytes")
+    token, sid = _session()
+    # ?audio=wav: raw WAV body, texts in headers; default: JSON with base64 audio.
+    raw_audio = serving_common.wants_raw_audio(request.args)
+    try:
+        assistant_text, wav, user_text, lang = await process_voice_query_async(audio_data, raw_audio=True, session_id=sid)
+        if raw_audio:
+            headers = serving_common.raw_audio_headers(user_text, assistant_text, lang)
+            return _with_session_cookie(Response(wav or b'', mimetype='audio/wav', headers=headers), token)
+        return _with_session_cookie(jsonify(serving_common.voice_payload(user_text, assistant_text, wav, lang)), token)
+    except Exception as e:
+        app.logger.error(f"Error in process_voice_query_async: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/process_voice_stream', methods=['POST'])
+async def process_voice_stream():
+    # Server-sent events, same event shapes as the Flask endpoint.
+    app.logger.debug("Received POST to /process_voice_stream")
+    audio_data = await _read_audio()
+    if audio_data is None:
+        app.logger.error("No audio file in request")
+        return jsonify({'error': 'No audio file'}), 400
+    app.logger.debug(f"Audio data length: {len(audio_data)} bytes")
+    token, sid = _session()
+
+    async def generate():
+        try:
+            async for event in process_voice_query_stream_async(audio_data, session_id=sid):
+                yield serving_common.sse(event.get('type', 'message'), event)
+        except Exception as e:
+            app.logger.error(f"Error in process_voice_query_stream_async: {str(e)}", exc_info=True)
+            yield serving_common.sse('error', {'error': str(e)})
+
+    response = Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+    response.timeout = None  # turns can outlast Quart's default response timeout
+    return _with_session_cookie(response, token)
+
+if __name__ == '__main__':
+    app.run(debug=True)
@@ -0,0 +1,153 @@
+import base64
+import logging
+import struct
+import warnings
+from array import array
+from collections import namedtuple
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop  # stdlib up to 3.12
+except ImportError:
+    audioop = None
+
+WavParams = namedtuple("WavParams", ["nchannels", "sampwidth", "framerate"])
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+_HEADER_SIZE = 44
+
+
+def parse_wav(wav_bytes):
+    # Returns (WavParams, memoryview over the PCM data chunk) without copying the samples.
+    mv = memoryview(wav_bytes)
+    if len(mv) < 12 or bytes(mv[0:4]) != b"RIFF" or bytes(mv[8:12]) != b"WAVE":
+        raise ValueError("not a RIFF/WAVE buffer")
+
+    params = None
+    pos = 12
+    while pos + 8 <= len(mv):
+        chunk_id = bytes(mv[pos:pos + 4])
+        chunk_size = struct.unpack_from("<I", mv, pos + 4)[0]
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            fmt_tag, nchannels, framerate, _, _, bits = struct.unpack_from("<HHIIHH", mv, body)
+            if fmt_tag == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                fmt_tag = struct.unpack_from("<H", mv, body + 24)[0]
+            if fmt_tag != _WAVE_FORMAT_PCM:
+                raise ValueError(f"unsupported WAV format tag {fmt_tag:#x}")
+            params = WavParams(nchannels, bits // 8, framerate)
+        elif chunk_id == b"data":
+            if params is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            # Streaming encoders sometimes write 0 / 0xFFFFFFFF here; clamp to what we have.
+            end = len(mv) if chunk_size in (0, 0xFFFFFFFF) else min(len(mv), body + chunk_size)
+            return params, mv[body:end]
+        pos = body + chunk_size + (chunk_size & 1)
+    raise ValueError("WAV has no data chunk")
+
+
+def _convert_fallback(frames, src, dst):
+    # Pure-Python path for interpreters without audioop; handles 16-bit PCM only.
+    if src.sampwidth != 2 or dst.sampwidth != 2:
+        raise ValueError("sample width conversion needs audioop")
+    samples = array("h")
+    samples.frombytes(bytes(frames))
+    if src.nchannels == 2 and dst.nchannels == 1:
+        samples = array("h", ((samples[i] + samples[i + 1]) // 2 for i in range(0, len(samples) - 1, 2)))
+    elif src.nchannels == 1 and dst.nchannels == 2:
+        samples = array("h", (s for s in samples for _ in (0, 1)))
+    elif src.nchannels != dst.nchannels:
+        raise ValueError(f"cannot map {src.nchannels} channels to {dst.nchannels}")
+
+    if src.framerate != dst.framerate and samples:
+        ch = dst.nchannels
+        n_in = len(samples) // ch
+        n_out = max(1, int(n_in * dst.framerate / src.framerate))
+        step = src.framerate / dst.framerate
+        out = array("h", bytes(2 * n_out * ch))
+        for i in range(n_out):
+            x = i * step
+            j = int(x)
+            frac = x - j
+            j2 = min(j + 1, n_in - 1)
+            for c in range(ch):
+                a = samples[j * ch + c]
+                b = samples[j2 * ch + c]
+                out[i * ch + c] = int(a + (b - a) * frac)
+        samples = out
+    return samples.tobytes()
+
+
+def convert_frames(frames, src, dst):
+    # Converts raw PCM frames from src params to dst params (width, channels, then rate).
+    if src == dst:
+        return frames
+    if audioop is None:
+        return _convert_fallback(frames, src, dst)
+
+    data = bytes(frames)
+    width = src.sampwidth
+    if width != dst.sampwidth:
+        data = audioop.lin2lin(data, width, dst.sampwidth)
+        width = dst.sampwidth
+    if src.nchannels == 2 and dst.nchannels == 1:
+        data = audioop.tomono(data, width, 0.5, 0.5)
+    elif src.nchannels == 1 and dst.nchannels == 2:
+        data = audioop.tostereo(data, width, 1, 1)
+    elif src.nchannels != dst.nchannels:
+        raise ValueError(f"cannot map {src.nchannels} channels to {dst.nchannels}")
+    if src.framerate != dst.framerate:
+        data, _ = audioop.ratecv(data, width, dst.nchannels, src.framerate, dst.framerate, None)
+    return data
+
+
+def _write_header(buf, params, data_len):
+    block_align = params.nchannels * params.sampwidth
+    struct.pack_into(
+        "<4sI4s4sIHHIIHH4sI", buf, 0,
+        b"RIFF", 36 + data_len, b"WAVE",
+        b"fmt ", 16, _WAVE_FORMAT_PCM, params.nchannels, params.framerate,
+        params.framerate * block_align, block_align, params.sampwidth * 8,
+        b"data", data_len,
+    )
+
+
+def concat_wav(wav_chunks, target=None):
+    # Joins WAV byte strings into one WAV in a single preallocated buffer (linear time).
+    # Chunks whose format differs from `target` (default: the first chunk) are converted
+    # rather than dropped; undecodable chunks are skipped and logged.
+    segments = []
+    for i, chunk in enumerate(wav_chunks):
+        try:
+            params, frames = parse_wav(chunk)
+            if target is None:
+                target = params
+            elif params != target:
+                logging.debug(f"Converting WAV chunk {i} from {params} to {target}")
+                frames = convert_frames(frames, params, target)
+            segments.append(frames)
+        except Exception as e:
+            logging.error(f"Skipping WAV chunk {i}: {e}")
+
+    if target is None:
+        return bytearray()
+
+    data_len = sum(len(seg) for seg in segments)
+    buf = bytearray(_HEADER_SIZE + data_len)
+    _write_header(buf, target, data_len)
+    out = memoryview(buf)
+    pos = _HEADER_SIZE
+    for seg in segments:
+        out[pos:pos + len(seg)] = seg
+        pos += len(seg)
+    return buf
+
+
+def concat_wav_base64(wav_b64_list):
+    # Compatibility helper for callers that still exchange base64 strings.
+    if not wav_b64_list:
+        return ""
+    combined = concat_wav([base64.b64decode(a) for a in wav_b64_list])
+    return base64.b64encode(combined).decode("utf-8")
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import argparse
+
+import scheme_catalog
+
+# Offline build of the English-normalized catalog used by scheme_catalog.py.
+#
+#   python build_catalog_index.py                # data/schemes.json -> data/schemes.en.json
+#   python build_catalog_index.py --force        # re-translate everything
+#
+# For every scheme and every language it is written in (its own fields plus optional
+# "translations": {"hi-IN": {...}}), name/description/tags are translated to English once
+# and stored with a hash of the source text. Re-running only translates the (scheme,
+# language) pairs whose source text changed, and drops entries for removed schemes or
+# languages. Needs SARVAM_API_KEY (uses the agent's cached translate_text).
+
+TARGET_LANG = "en-IN"
+
+
+def _load(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save(path, doc):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)  # the running app never reads a half-written file
+
+
+def _to_english(fields, language, translate):
+    if language == TARGET_LANG:
+        return dict(fields)
+    return {
+        "name": translate(fields["name"], language) if fields["name"] else "",
+        "description": translate(fields["description"], language) if fields["description"] else "",
+        "tags": [translate(t, language) for t in fields["tags"] if t],
+    }
+
+
+def build(schemes_path, out_path, force=False, save_every=25, translate=None):
+    if translate is None:
+        # Imported lazily: only needed when something actually has to be translated.
+        from conversation_agent import translate_text
+
+        def translate(text, language):
+            return translate_text(text, source_lang=language, target_lang=TARGET_LANG)
+
+    catalog = _load(schemes_path)
+    default_lang = catalog.get("language_hint") or "mr-IN"
+    schemes = [s for s in catalog.get("schemes", []) if isinstance(s, dict) and s.get("id")]
+    existing = _load(out_path).get("schemes", {}) if not force else {}
+
+    out = {"version": 1, "target": TARGET_LANG, "schemes": {}}
+    counts = {"kept": 0, "translated": 0, "failed": 0}
+    dirty = 0
+    for scheme in schemes:
+        sid = scheme["id"]
+        entry = {}
+        for lang, fields in scheme_catalog.source_versions(scheme, default_lang).items():
+            digest = scheme_catalog.source_hash(fields, lang)
+            previous = existing.get(sid, {}).get(lang)
+            if isinstance(previous, dict) and previous.get("source_hash") == digest:
+                entry[lang] = previous
+                counts["kept"] += 1
+                continue
+            try:
+                entry[lang] = dict(_to_english(fields, lang, translate), source_hash=digest)
+                counts["translated"] += 1
+                dirty += 1
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"{sid} [{lang}]: translation failed: {e}", file=sys.stderr)
+                if isinstance(previous, dict):
+                    entry[lang] = previous  # stale English beats none until the next run
+        if entry:
+            out["schemes"][sid] = entry
+        if dirty >= save_every:
+            _save(out_path, dict(out, schemes=dict(existing, **out["schemes"])))
+            dirty = 0
+
+    removed = sum(len(v) for k, v in existing.items() if k not in out["schemes"])
+    removed += sum(len(set(v) - set(out["schemes"][k])) for k, v in existing.items() if k in out["schemes"])
+    counts["removed"] = removed
+    _save(out_path, out)
+    print(json.dumps(counts), file=sys.stderr)
+    return counts
+
+
+def main():
+    base = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "schemes.json")
+    parser = argparse.ArgumentParser(description="Build English-normalized scheme catalog fields for search.")
+    parser.add_argument("--schemes", default=base)
+    parser.add_argument("--out", default=None, help="default: <schemes>.en.json next to the catalog")
+    parser.add_argument("--force", action="store_true", help="ignore existing output and translate everything")
+    args = parser.parse_args()
+    build(args.schemes, args.out or scheme_catalog.default_english_path(args.schemes), force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import eligibility_rules
+import scheme_catalog
+
+# Offline eligibility screening for field-camp profile files.
+#
+#   python bulk_screening.py households.csv -o screened.jsonl
+#   python bulk_screening.py households.jsonl -o screened.jsonl --resume
+#
+# Input is CSV (one profile per row, header = profile fields) or JSONL (one profile object
+# per line); an "id" column/key is copied to the output. Every profile is checked against
+# the whole catalog (same rules as eligibility_check) and gets an application checklist for
+# each scheme it is eligible for. Output is JSONL, one line per input row, in input order.
+#
+# Profiles are read lazily and screened in chunks across a process pool with a bounded
+# number of chunks in flight, so memory stays flat regardless of file size. Each finished
+# chunk is flushed to the output immediately; --resume skips the rows already written.
+
+_COMPILED = None
+_CATALOG = None
+
+
+def _init_worker(schemes_path):
+    global _COMPILED, _CATALOG
+    catalog = scheme_catalog.SchemeCatalog(schemes_path, check_interval_s=float("inf"))
+    _CATALOG = {s["id"]: s for s in catalog.schemes()}
+    _COMPILED = eligibility_rules.CompiledRules(_CATALOG.values())
+
+
+def _screen_chunk(chunk, with_checklists):
+    out = []
+    for row, profile in chunk:
+        results = _COMPILED.evaluate_all(profile)
+        eligible = [sid for sid, r in results.items() if r["eligible"]]
+        record = {"row": row, "id": profile.get("id"), "eligible": eligible, "results": results}
+        if with_checklists:
+            record["checklists"] = {sid: eligibility_rules.application_checklist(_CATALOG[sid]) for sid in eligible}
+        out.append(record)
+    return out
+
+
+def _clean(profile):
+    # CSV cells are strings; blank cells count as missing, like an unanswered question.
+    return {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in profile.items() if k}
+
+
+def iter_profiles(path):
+    # Yields (row_number, profile) with row numbers starting at 1.
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for row, record in enumerate(csv.DictReader(f), start=1):
+                yield row, _clean(record)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        row = 0
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row += 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"row {row}: invalid JSON, screened as empty profile", file=sys.stderr)
+                record = {}
+            yield row, _clean(record if isinstance(record, dict) else {})
+
+
+def _chunks(profiles, size):
+    chunk = []
+    for item in profiles:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def resume_point(output_path):
+    # Last row number fully written to output_path (0 if none). A partial last line from an
+    # interrupted run is cut off so appending continues from a clean line boundary.
+    if not os.path.exists(output_path):
+        return 0
+    last_row = 0
+    good_bytes = 0
+    with open(output_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                last_row = json.loads(line)["row"]
+            except (ValueError, KeyError):
+                break
+            good_bytes += len(line)
+    if good_bytes != os.path.getsize(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(good_bytes)
+    return last_row
+
+
+def screen_file(input_path, output_path, schemes_path, workers=None, chunk_size=500,
+                resume=False, with_checklists=True, progress_every_s=2.0):
+    workers = max(1, workers or os.cpu_count() or 1)
+    skip = resume_point(output_path) if resume else 0
+    if skip:
+        print(f"Resuming after row {skip}", file=sys.stderr)
+    profiles = ((row, p) for row, p in iter_profiles(input_path) if row > skip)
+    chunks = _chunks(profiles, chunk_size)
+
+    done = 0
+    eligible_counts = {}
+    started = time.perf_counter()
+    last_report = started
+    max_in_flight = workers * 2
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(schemes_path,)) as pool, \
+            open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_screen_chunk, chunk, with_checklists))
+            if len(pending) < max_in_flight:
+                continue
+            done += _write(pending.popleft().result(), out, eligible_counts)
+            last_report = _progress(done, skip, started, last_report, progress_every_s)
+        while pending:
+            done += _write(pending.popleft().result(), out, eligible_counts)
+            last_report = _progress(done, skip, started, last_report, progress_every_s)
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "screened": done,
+        "skipped_resumed": skip,
+        "seconds": round(elapsed, 2),
+        "profiles_per_second": round(done / elapsed, 1) if elapsed > 0 else None,
+        "eligible_by_scheme": dict(sorted(eligible_counts.items(), key=lambda kv: -kv[1])),
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2), file=sys.stderr)
+    return summary
+
+
+def _write(records, out, eligible_counts):
+    out.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+    out.flush()
+    for r in records:
+        for sid in r["eligible"]:
+            eligible_counts[sid] = eligible_counts.get(sid, 0) + 1
+    return len(records)
+
+
+def _progress(done, skip, started, last_report, every_s):
+    now = time.perf_counter()
+    if now - last_report < every_s:
+        return last_report
+    rate = done / (now - started) if now > started else 0.0
+    print(f"screened {done} profiles (through row {skip + done}), {rate:.0f}/s", file=sys.stderr)
+    return now
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen a CSV/JSONL file of profiles against the scheme catalog.")
+    parser.add_argument("input", help="profiles file (.csv or .jsonl)")
+    parser.add_argument("-o", "--output", required=True, help="results file (.jsonl)")
+    parser.add_argument("--schemes", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "schemes.json"))
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="profiles per task")
+    parser.add_argument("--resume", action="store_true", help="append, skipping rows already in the output")
+    parser.add_argument("--no-checklists", action="store_true", help="omit application checklists")
+    args = parser.parse_args()
+
+    screen_file(
+        args.input, args.output, args.schemes,
+        workers=args.workers, chunk_size=max(1, args.chunk_size),
+        resume=args.resume, with_checklists=not args.no_checklists,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 import os
+import base64
+import hashlib
 from dotenv import load_dotenv
 import chromadb
 import requests
@@ -8,12 +10,30 @@ import logging
 import time
 import random
 import threading
+import asyncio
+import weakref
+from types import SimpleNamespace
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import audio_assembly
+import eligibility_rules
+import embeddings
+import kv_cache
+import llm_stream
+import memory_maintenance
+import memory_writer
+import prompt_builder
+import sarvam_client
+import scheme_catalog
+import search_client
+import semantic_cache
+import session_store
+import tts_cache
+import turn_pipeline
+import turn_router
+
 load_dotenv()
 
-api_key = os.getenv('SARVAM_API_KEY')
-base_url = os.getenv('BASE_URL', 'https://api.sarvam.ai')
 openai_api_key = os.getenv('OPENAI_API_KEY')
 openai_model = os.getenv('OPENAI_MODEL', 'gpt-4o')
 
@@ -23,10 +43,8 @@ SUPPORTED_LANG_CODES = {
     "sat-IN", "sd-IN", "ta-IN", "te-IN", "ur-IN",
 }
 
-USER_STATE = {
-    "profile": {},
-    "contradictions": [],
-}
+# Per-session profile, contradictions and bounded history (see session_store.py).
+SESSIONS = session_store.SessionStore()
 
 def _load_json_file(path):
     try:
@@ -43,8 +61,8 @@ _SCHEMES_PATH = os.path.join(_DATA_DIR, "schemes.json")
 _PERSONAS_PATH = os.path.join(_DATA_DIR, "personas.json")
 _TOOLS_PATH = os.path.join(_DATA_DIR, "tools.json")
 
-_schemes_doc = _load_json_file(_SCHEMES_PATH) or {}
-SCHEME_CATALOG = _schemes_doc.get("schemes", []) if isinstance(_schemes_doc, dict) else []
+CATALOG = scheme_catalog.SchemeCatalog(_SCHEMES_PATH)
+RULES = eligibility_rules.RuleEngine(CATALOG)
 
 _personas_doc = _load_json_file(_PERSONAS_PATH) or {}
 SWAYAM_PERSONA = None
@@ -61,15 +79,23 @@ SUPPORTED_TTS_SPEAKERS = {
     "varun", "manan", "sumit", "roopa", "kabir", "aayan", "shubh",
 }
 
-# OpenAI client
+# OpenAI clients. The async client is bound to the loop it first ran on, so keep one per loop.
 client = openai.OpenAI(api_key=openai_api_key)
+_async_clients = weakref.WeakKeyDictionary()
+
+def _get_async_client():
+    loop = asyncio.get_running_loop()
+    c = _async_clients.get(loop)
+    if c is None:
+        c = openai.AsyncOpenAI(api_key=openai_api_key)
+        _async_clients[loop] = c
+    return c
 
 # Vector store for memory
 chroma_client = chromadb.PersistentClient(path="./chroma_db")
 collection = chroma_client.get_or_create_collection(name="conversation_memory")
 
-def openai_chat(messages, tools=None):
-    logging.debug("Entering openai_chat")
+def _chat_kwargs(messages, tools=None):
     logging.debug(f"Messages: {messages}")
     logging.debug(f"Tools: {tools}")
     kwargs = {
@@ -79,76 +105,142 @@ def openai_chat(messages, tools=None):
     if tools:
         kwargs["tools"] = tools
         kwargs["tool_choice"] = "auto"
-    response = client.chat.completions.create(**kwargs)
+    return kwargs
+
+# Token counting, budgets and per-stage usage for LLM prompts (see prompt_builder.py)
+PROMPTS = prompt_builder.PromptBuilder(model=openai_model)
+
+def openai_chat(messages, tools=None, stage="other"):
+    logging.debug("Entering openai_chat")
+    response = client.chat.completions.create(**_chat_kwargs(messages, tools))
     logging.debug(f"OpenAI response: {response}")
+    PROMPTS.record(stage, messages, response)
     return response
 
-# Tools
-def web_search(query):
-    logging.debug(f"Entering web_search with query: {query}")
+async def openai_chat_async(messages, tools=None, stage="other"):
+    logging.debug("Entering openai_chat_async")
+    response = await _get_async_client().chat.completions.create(**_chat_kwargs(messages, tools))
+    logging.debug(f"OpenAI response: {response}")
+    PROMPTS.record(stage, messages, response)
+    return response
 
-    # ---- Rate-limit protection + caching (process-wide) ----
-    # NOTE: Parallel requests generally increase rate-limits; we only do a guarded "race" when not in cooldown.
+# Streamed completions for the evaluator (see llm_stream.py); OPENAI_STREAM=0 turns them off.
+_LLM_STREAM = os.getenv("OPENAI_STREAM", "1") == "1"
+
+async def openai_chat_stream_async(messages, tools=None, stage="other"):
+    # Yields the chunks of a streamed completion. Usage arrives on the last chunk.
+    logging.debug("Entering openai_chat_stream_async")
+    stream = await _get_async_client().chat.completions.create(
+        stream=True, stream_options={"include_usage": True}, **_chat_kwargs(messages, tools)
+    )
+    usage_chunk = None
+    async for chunk in stream:
+        if getattr(chunk, "usage", None):
+            usage_chunk = chunk
+        yield chunk
+    PROMPTS.record(stage, messages, usage_chunk)
+
+# Tools
+def _web_search_state():
+    # Caching + cooldown (process-wide), shared by web_search and web_search_many.
     if not hasattr(web_search, "_lock"):
         web_search._lock = threading.Lock()
         web_search._cache = {}  # query -> (ts, result_str)
         web_search._cooldown_until = 0.0
-        web_search._last_request_ts = 0.0
         web_search._ratelimit_hits = 0
-
+        # Token bucket instead of a sleep under _lock: waiting searches never hold up
+        # cache hits or unrelated work. Identical concurrent queries share one request.
+        min_interval_s = float(os.getenv("WEB_SEARCH_MIN_INTERVAL_SECONDS", "2.5"))
+        web_search._bucket = search_client.TokenBucket(
+            rate=1.0 / max(0.01, min_interval_s),
+            burst=float(os.getenv("WEB_SEARCH_BURST", "2")),
+        )
+        web_search._flights = search_client.SingleFlight()
+    return web_search
+
+def _format_search_results(results):
+    lines = []
+    for r in results:
+        if not isinstance(r, dict):
+            continue
+        title = (r.get("title") or "").strip()
+        url = (r.get("url") or "").strip()
+        snippet = (r.get("snippet") or "").strip()
+        if title or url:
+            lines.append(f"{title} - {url}".strip())
+        if snippet:
+            lines.append(snippet)
+    return "\n".join(lines).strip() or "No results found"
+
+def _web_search_lookup(qkeys):
+    # Returns ({qkey: cached_result}, blocked_message). Never sleeps.
+    state = _web_search_state()
     now = time.time()
     cache_ttl_s = int(os.getenv("WEB_SEARCH_CACHE_TTL_SECONDS", "900"))
-    min_interval_s = float(os.getenv("WEB_SEARCH_MIN_INTERVAL_SECONDS", "2.5"))
-    cooldown_s = int(os.getenv("WEB_SEARCH_COOLDOWN_SECONDS", "120"))
-    enable_race = os.getenv("WEB_SEARCH_PARALLEL_BACKEND_RACE", "0") == "1"
-
-    qkey = query.strip().lower()
-    with web_search._lock:
-        cached = web_search._cache.get(qkey)
-        if cached and (now - cached[0]) <= cache_ttl_s:
+    with state._lock:
+        hits = {}
+        for qkey in qkeys:
+            cached = state._cache.get(qkey)
+            if cached and (now - cached[0]) <= cache_ttl_s:
+                hits[qkey] = cached[1]
+        if len(hits) == len(set(qkeys)):
             logging.debug("web_search cache hit")
-            return cached[1]
+            return hits, None
 
-        if now < web_search._cooldown_until:
-            retry_after = int(web_search._cooldown_until - now)
+        if now < state._cooldown_until:
+            retry_after = int(state._cooldown_until - now)
             msg = f"Web search temporarily rate-limited. Try again in ~{retry_after}s."
             logging.warning(msg)
-            return msg
+            return hits, msg
+    return hits, None
+
+def _web_search_call(method, urls, **kwargs):
+    # Shared transport for web_search/web_search_many: waits for a rate-limit token, then
+    # sends (hedged across SEARCH_SERVICE_URLS when the race is enabled and we are not in
+    # cooldown). A 429 from the service starts the cooldown.
+    state = _web_search_state()
+    state._bucket.acquire()
+    # NOTE: Parallel requests generally increase rate-limits; we only do a guarded "race" when not in cooldown.
+    enable_race = os.getenv("WEB_SEARCH_PARALLEL_BACKEND_RACE", "0") == "1"
+    with state._lock:
+        hedge = enable_race and time.time() >= state._cooldown_until
+    timeout_s = float(os.getenv("SEARCH_SERVICE_TIMEOUT_SECONDS", "25"))
+    resp = search_client.call(method, urls, hedge=hedge, timeout=timeout_s, **kwargs)
+    with state._lock:
+        if resp.status_code == 429:
+            state._ratelimit_hits += 1
+            state._cooldown_until = time.time() + int(os.getenv("WEB_SEARCH_COOLDOWN_SECONDS", "120"))
+        else:
+            state._ratelimit_hits = 0
+    return resp
+
+def _remember_search(qkey, out):
+    state = _web_search_state()
+    with state._lock:
+        state._cache[qkey] = (time.time(), out)
+
+def _fetch_search(query, qkey):
+    max_results = int(os.getenv("SEARCH_MAX_RESULTS", "5"))
+    resp = _web_search_call("GET", search_client.service_urls(), params={"q": query, "n": max_results})
+    if resp.status_code != 200:
+        return f"Search service error {resp.status_code}: {resp.text}"
+    payload = resp.json() if resp.headers.get("content-type", "").lower().startswith("application/json") else {}
+    results = payload.get("results", []) if isinstance(payload, dict) else []
+    out = _format_search_results(results)
+    _remember_search(qkey, out)
+    return out
 
-        # global throttle (single process)
-        wait_s = (web_search._last_request_ts + min_interval_s) - now
-        if wait_s > 0:
-            time.sleep(wait_s)
-        web_search._last_request_ts = time.time()
+def web_search(query):
+    logging.debug(f"Entering web_search with query: {query}")
+    qkey = query.strip().lower()
+    hits, blocked = _web_search_lookup([qkey])
+    if qkey in hits:
+        return hits[qkey]
+    if blocked:
+        return blocked
 
     try:
-        max_results = int(os.getenv("SEARCH_MAX_RESULTS", "5"))
-        timeout_s = float(os.getenv("SEARCH_SERVICE_TIMEOUT_SECONDS", "25"))
-        service_url = os.getenv("SEARCH_SERVICE_URL", "http://127.0.0.1:5001/search")
-
-        resp = requests.get(service_url, params={"q": query, "n": max_results}, timeout=timeout_s)
-        if resp.status_code != 200:
-            out = f"Search service error {resp.status_code}: {resp.text}"
-        else:
-            payload = resp.json() if resp.headers.get("content-type", "").lower().startswith("application/json") else {}
-            results = payload.get("results", []) if isinstance(payload, dict) else []
-            lines = []
-            for r in results:
-                if not isinstance(r, dict):
-                    continue
-                title = (r.get("title") or "").strip()
-                url = (r.get("url") or "").strip()
-                snippet = (r.get("snippet") or "").strip()
-                if title or url:
-                    lines.append(f"{title} - {url}".strip())
-                if snippet:
-                    lines.append(snippet)
-            out = "\n".join(lines).strip() or "No results found"
-
-        with web_search._lock:
-            web_search._cache[qkey] = (time.time(), out)
-            web_search._ratelimit_hits = 0
-        return out
+        return _web_search_state()._flights.do(qkey, lambda: _fetch_search(query, qkey))
     except requests.exceptions.ConnectionError:
         msg = "Search service is not reachable. Start search_service.py and try again."
         logging.error(msg)
@@ -157,6 +249,59 @@ def web_search(query):
         logging.error(f"Search failed: {str(e)}")
         return f"Search failed: {str(e)}"
 
+def _fetch_search_batch(queries):
+    max_results = int(os.getenv("SEARCH_MAX_RESULTS", "5"))
+    resp = _web_search_call("POST", search_client.batch_urls(), json={"queries": queries, "n": max_results})
+    if resp.status_code != 200:
+        error = f"Search service error {resp.status_code}: {resp.text}"
+        return {q.strip().lower(): error for q in queries}
+    out = {}
+    for item in resp.json().get("results", []):
+        if not isinstance(item, dict):
+            continue
+        qkey = str(item.get("query", "")).strip().lower()
+        if item.get("error"):
+            out[qkey] = f"Search failed: {item['error']}"
+            continue
+        out[qkey] = _format_search_results(item.get("results", []))
+        _remember_search(qkey, out[qkey])
+    return out
+
+def web_search_many(queries):
+    # Bulk web_search: POSTs to the search service's /search/batch, which runs the queries
+    # concurrently, at most SEARCH_BATCH_MAX_QUERIES per request (the service rejects larger
+    # batches). Returns one result string per query, in order.
+    logging.debug(f"Entering web_search_many with {len(queries)} queries")
+    qkeys = [q.strip().lower() for q in queries]
+    hits, blocked = _web_search_lookup(qkeys)
+    missing, seen = [], set(hits)
+    for q, qkey in zip(queries, qkeys):
+        if qkey not in seen:
+            seen.add(qkey)
+            missing.append(q)
+    if not missing:
+        return [hits[k] for k in qkeys]
+    if blocked:
+        return [hits.get(k, blocked) for k in qkeys]
+
+    size = max(1, int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "10")))
+    for i in range(0, len(missing), size):
+        chunk = missing[i:i + size]
+        try:
+            flight_key = "batch\x1f" + "\x1f".join(sorted(q.strip().lower() for q in chunk))
+            hits.update(_web_search_state()._flights.do(flight_key, lambda: _fetch_search_batch(chunk)))
+        except requests.exceptions.ConnectionError:
+            msg = "Search service is not reachable. Start search_service.py and try again."
+            logging.error(msg)
+            hits.update({q.strip().lower(): msg for q in chunk})
+        except Exception as e:
+            logging.error(f"Batch search failed: {str(e)}")
+            hits.update({q.strip().lower(): f"Search failed: {str(e)}" for q in chunk})
+    return [hits.get(k, "No results found") for k in qkeys]
+
+def web_search_stats():
+    return search_client.stats()
+
 def create_file(path, content):
     logging.debug(f"Entering create_file with path: {path}, content length: {len(content)}")
     try:
@@ -209,73 +354,20 @@ def sequential_think(query):
 
 def scheme_catalog_search(query, language_code=None, max_results=5):
     logging.debug(f"Entering scheme_catalog_search with query: {query}, language_code: {language_code}")
-    q = (query or "").strip().lower()
-    hits = []
-    for s in SCHEME_CATALOG:
-        hay = " ".join([s.get("name", ""), s.get("description", ""), " ".join(s.get("tags", []))]).lower()
-        if not q or q in hay:
-            hits.append(s)
-    if not hits and q:
-        for s in SCHEME_CATALOG:
-            if any(t.lower().find(q) >= 0 for t in s.get("tags", [])):
-                hits.append(s)
-    return hits[: int(max_results) if max_results else 5]
+    return CATALOG.search(query, max_results=max_results)
 
 def eligibility_check(profile, scheme_id):
     logging.debug(f"Entering eligibility_check with scheme_id: {scheme_id}")
-    profile = profile or {}
-    scheme_id = (scheme_id or "").strip()
-    scheme = next((s for s in SCHEME_CATALOG if s["id"] == scheme_id), None)
-    if not scheme:
-        return {"eligible": False, "reasons": ["योजना सापडली नाही."], "missing": []}
-
-    missing = [f for f in scheme.get("required_fields", []) if profile.get(f) in (None, "", [])]
-    if missing:
-        return {"eligible": False, "reasons": [], "missing": missing}
-
-    reasons = []
-    eligible = True
-
-    if scheme_id == "old_age_pension":
-        try:
-            age = int(profile.get("age"))
-            if age < 60:
-                eligible = False
-                reasons.append("वय 60 वर्षांपेक्षा कमी आहे.")
-        except Exception:
-            eligible = False
-            reasons.append("वय स्पष्ट नाही.")
-
-    if scheme_id == "ujjwala":
-        gender = str(profile.get("gender", "")).lower()
-        if gender and ("female" not in gender and "स्त्री" not in gender and "महिला" not in gender):
-            reasons.append("ही योजना प्रामुख्याने महिलांसाठी आहे; तरीही कुटुंब पात्रता तपासावी लागेल.")
-
-    if scheme_id == "pmay":
-        has_house = profile.get("has_pucca_house")
-        if isinstance(has_house, str) and has_house.strip().lower() in ("yes", "होय", "आहे"):
-            eligible = False
-            reasons.append("आपल्याकडे पक्के घर असल्यास PMAY अंतर्गत अपात्रता असू शकते.")
-
-    return {"eligible": eligible, "reasons": reasons, "missing": []}
+    return RULES.check(profile, scheme_id)
 
 def build_application_checklist(profile, scheme_id):
     logging.debug(f"Entering build_application_checklist with scheme_id: {scheme_id}")
-    scheme = next((s for s in SCHEME_CATALOG if s["id"] == scheme_id), None)
+    scheme = CATALOG.get(scheme_id)
     if not scheme:
         return "योजना सापडली नाही, चेकलिस्ट बनवता आली नाही."
-    items = [
-        f"योजना: {scheme['name']}",
-        "ओळखपत्र: आधार/मतदार ओळखपत्र (OTP/PIN कधीही देऊ नका)",
-        "पत्ता पुरावा",
-        "बँक खाते तपशील",
-        "उत्पन्न दाखला (लागू असल्यास)",
-        "जात प्रमाणपत्र (लागू असल्यास)",
-        "पासपोर्ट साईज फोटो",
-    ]
-    return "\n".join(items)
+    return eligibility_rules.application_checklist(scheme)
 
-def _run_tool(tool_name, tool_args, detected_lang=None):
+def _run_tool(tool_name, tool_args, detected_lang=None, profile=None):
     logging.debug(f"Running tool {tool_name} with args keys: {list(tool_args.keys()) if isinstance(tool_args, dict) else 'not dict'}")
     try:
         if tool_name == "web_search":
@@ -298,120 +390,198 @@ def _run_tool(tool_name, tool_args, detected_lang=None):
             )
             return json.dumps(results, ensure_ascii=False)
         if tool_name == "eligibility_check":
-            profile = tool_args.get("profile") or USER_STATE.get("profile") or {}
+            profile = tool_args.get("profile") or profile or {}
             result = eligibility_check(profile, tool_args.get("scheme_id", ""))
             return json.dumps(result, ensure_ascii=False)
         if tool_name == "build_application_checklist":
-            profile = tool_args.get("profile") or USER_STATE.get("profile") or {}
+            profile = tool_args.get("profile") or profile or {}
             return build_application_checklist(profile, tool_args.get("scheme_id", ""))
         return "Unknown tool"
     except Exception as e:
         logging.error(f"Tool {tool_name} failed: {e}")
         return f"Tool {tool_name} failed: {str(e)}"
 
-def translate_text(text, source_lang='auto', target_lang='en-IN', model=None):
-    logging.debug(f"Entering translate_text with text length: {len(text)}, source: {source_lang}, target: {target_lang}")
-    if model is None:
-        model = os.getenv('TRANSLATE_MODEL', 'sarvam-translate:v1')
-    if not text:
-        return ""
+_TRANSLATION_CACHE = None
+_TRANSLATION_CACHE_LOCK = threading.Lock()
 
-    def _infer_lang_code_from_text(t: str) -> str:
-        # Heuristic script-based inference for Sarvam translate (does not accept 'auto').
-        # Prefer mr-IN for Devanagari because our system prompt/persona are Marathi.
-        for ch in t:
-            o = ord(ch)
-            if 0x0900 <= o <= 0x097F:
-                return "mr-IN"  # Devanagari
-            if 0x0980 <= o <= 0x09FF:
-                return "bn-IN"  # Bengali/Assamese
-            if 0x0A00 <= o <= 0x0A7F:
-                return "pa-IN"  # Gurmukhi
-            if 0x0A80 <= o <= 0x0AFF:
-                return "gu-IN"  # Gujarati
-            if 0x0B00 <= o <= 0x0B7F:
-                return "od-IN"  # Odia
-            if 0x0B80 <= o <= 0x0BFF:
-                return "ta-IN"  # Tamil
-            if 0x0C00 <= o <= 0x0C7F:
-                return "te-IN"  # Telugu
-            if 0x0C80 <= o <= 0x0CFF:
-                return "kn-IN"  # Kannada
-            if 0x0D00 <= o <= 0x0D7F:
-                return "ml-IN"  # Malayalam
-            if 0x0600 <= o <= 0x06FF:
-                return "ur-IN"  # Arabic/Urdu
-
-        # ASCII-ish => English
-        return "en-IN"
+def _get_translation_cache():
+    # Lazily opened so importing this module never touches the disk when caching is off.
+    global _TRANSLATION_CACHE
+    if os.getenv("TRANSLATION_CACHE_ENABLED", "1") != "1":
+        return None
+    if _TRANSLATION_CACHE is None:
+        with _TRANSLATION_CACHE_LOCK:
+            if _TRANSLATION_CACHE is None:
+                _TRANSLATION_CACHE = kv_cache.TwoLevelCache(
+                    os.getenv("TRANSLATION_CACHE_PATH", "./cache/translations.sqlite3"),
+                    table="translations",
+                    max_memory_items=int(os.getenv("TRANSLATION_CACHE_MEMORY_ITEMS", "2048")),
+                    max_disk_items=int(os.getenv("TRANSLATION_CACHE_MAX_ITEMS", "50000")),
+                    ttl_s=float(os.getenv("TRANSLATION_CACHE_TTL_SECONDS", str(30 * 24 * 3600))),
+                )
+    return _TRANSLATION_CACHE
+
+def _translation_cache_key(text, source_lang, target_lang, model):
+    normalized = " ".join(str(text).split())
+    raw = json.dumps([normalized, source_lang, target_lang, model], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def translation_cache_stats():
+    cache = _get_translation_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+def _infer_lang_code_from_text(t: str) -> str:
+    # Heuristic script-based inference for Sarvam translate (does not accept 'auto').
+    # Prefer mr-IN for Devanagari because our system prompt/persona are Marathi.
+    for ch in t:
+        o = ord(ch)
+        if 0x0900 <= o <= 0x097F:
+            return "mr-IN"  # Devanagari
+        if 0x0980 <= o <= 0x09FF:
+            return "bn-IN"  # Bengali/Assamese
+        if 0x0A00 <= o <= 0x0A7F:
+            return "pa-IN"  # Gurmukhi
+        if 0x0A80 <= o <= 0x0AFF:
+            return "gu-IN"  # Gujarati
+        if 0x0B00 <= o <= 0x0B7F:
+            return "od-IN"  # Odia
+        if 0x0B80 <= o <= 0x0BFF:
+            return "ta-IN"  # Tamil
+        if 0x0C00 <= o <= 0x0C7F:
+            return "te-IN"  # Telugu
+        if 0x0C80 <= o <= 0x0CFF:
+            return "kn-IN"  # Kannada
+        if 0x0D00 <= o <= 0x0D7F:
+            return "ml-IN"  # Malayalam
+        if 0x0600 <= o <= 0x06FF:
+            return "ur-IN"  # Arabic/Urdu
+
+    # ASCII-ish => English
+    return "en-IN"
+
+def _split_text_for_translate(t: str, max_len: int):
+    t = " ".join(str(t).split())
+    if len(t) <= max_len:
+        return [t]
+    chunks = []
+    start = 0
+    while start < len(t):
+        end = min(start + max_len, len(t))
+        if end == len(t):
+            chunks.append(t[start:end])
+            break
+        window = t[start:end]
+        cut = max(window.rfind(". "), window.rfind("? "), window.rfind("! "))
+        if cut == -1:
+            cut = window.rfind(" ")
+        if cut == -1 or cut < int(max_len * 0.5):
+            cut = len(window)
+        chunks.append(t[start : start + cut].strip())
+        start = start + cut
+    return [c for c in chunks if c]
 
+def _prepare_translation(text, source_lang, target_lang, model):
+    # Shared front half of translate_text/translate_text_async.
+    # Returns (cached_result_or_None, job) where job carries everything needed to send chunks.
+    if model is None:
+        model = os.getenv('TRANSLATE_MODEL', 'sarvam-translate:v1')
     if str(source_lang).strip().lower() in ("auto", "unknown", ""):
         source_lang = _infer_lang_code_from_text(text)
 
+    cache = _get_translation_cache()
+    cache_key = _translation_cache_key(text, source_lang, target_lang, model) if cache else None
+    if cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logging.debug("translate_text cache hit")
+            return cached, None
+
     # Sarvam translate models enforce input length limits (sarvam-translate:v1: 2000 chars).
     # Chunk the input conservatively to avoid 400 validation errors.
     max_chars = int(os.getenv("TRANSLATE_MAX_CHARS", "2000"))
     safe_max = max(200, min(max_chars, 2000))
-
-    def _split_text_for_translate(t: str, max_len: int):
-        t = " ".join(str(t).split())
-        if len(t) <= max_len:
-            return [t]
-        chunks = []
-        start = 0
-        while start < len(t):
-            end = min(start + max_len, len(t))
-            if end == len(t):
-                chunks.append(t[start:end])
-                break
-            window = t[start:end]
-            cut = max(window.rfind(". "), window.rfind("? "), window.rfind("! "))
-            if cut == -1:
-                cut = window.rfind(" ")
-            if cut == -1 or cut < int(max_len * 0.5):
-                cut = len(window)
-            chunks.append(t[start : start + cut].strip())
-            start = start + cut
-        return [c for c in chunks if c]
-
-    url = f"{base_url}/translate"
-    logging.debug(f"Translate URL: {url}")
-    headers = {
-        'API-Subscription-Key': api_key,
-        'Content-Type': 'application/json'
+    job = {
+        "source_lang": source_lang,
+        "target_lang": target_lang,
+        "model": model,
+        "cache": cache,
+        "cache_key": cache_key,
+        "parts": _split_text_for_translate(text, safe_max),
+    }
+    return None, job
+
+def _translate_payload(job, part):
+    logging.debug(f"Sending translate request chunk ({len(job['parts'])} total) with length {len(part)}")
+    return {
+        'input': part,
+        'source_language_code': job["source_lang"],
+        'target_language_code': job["target_lang"],
+        'model': job["model"]
     }
 
-    parts = _split_text_for_translate(text, safe_max)
-    translated_parts = []
-    for idx, part in enumerate(parts, start=1):
-        data = {
-            'input': part,
-            'source_language_code': source_lang,
-            'target_language_code': target_lang,
-            'model': model
-        }
-        logging.debug(f"Sending translate request chunk {idx}/{len(parts)} with length {len(part)}")
-        response = requests.post(url, headers=headers, json=data)
-        logging.debug(f"Translate response status: {response.status_code}")
-        if response.status_code == 200:
-            result = response.json()
-            translated_parts.append(result.get('translated_text') or "")
-        else:
-            logging.error(f"Translation failed: {response.text}")
-            raise Exception(f"Translation failed: {response.text}")
-    return " ".join([p for p in translated_parts if p]).strip()
+def _parse_translate_response(response):
+    logging.debug(f"Translate response status: {response.status_code}")
+    if response.status_code == 200:
+        result = response.json()
+        return result.get('translated_text') or ""
+    logging.error(f"Translation failed: {response.text}")
+    raise Exception(f"Translation failed: {response.text}")
 
-def transcribe_audio(audio_data, language_code='unknown', model=None):
-    logging.debug("Entering transcribe_audio")
+def _finish_translation(job, translated_parts):
+    translated = " ".join([p for p in translated_parts if p]).strip()
+    if job["cache"] and translated:
+        job["cache"].set(job["cache_key"], translated)
+    return translated
+
+def translate_text(text, source_lang='auto', target_lang='en-IN', model=None):
+    logging.debug(f"Entering translate_text with text length: {len(text)}, source: {source_lang}, target: {target_lang}")
+    if not text:
+        return ""
+    cached, job = _prepare_translation(text, source_lang, target_lang, model)
+    if job is None:
+        return cached
+
+    def _translate_part(part):
+        response = sarvam_client.post('/translate', json=_translate_payload(job, part))
+        return _parse_translate_response(response)
+
+    # Chunks are independent, so translate them concurrently and join in input order.
+    translated_parts = _ordered_parallel_map(
+        _translate_part,
+        job["parts"],
+        max_workers=int(os.getenv("TRANSLATE_MAX_CONCURRENCY", "4")),
+        attempts=int(os.getenv("TRANSLATE_CHUNK_ATTEMPTS", "2")),
+        label="Translate chunk",
+    )
+    return _finish_translation(job, translated_parts)
+
+async def translate_text_async(text, source_lang='auto', target_lang='en-IN', model=None):
+    logging.debug(f"Entering translate_text_async with text length: {len(text)}, source: {source_lang}, target: {target_lang}")
+    if not text:
+        return ""
+    # Cache reads/writes hit SQLite: keep them off the event loop.
+    cached, job = await asyncio.to_thread(_prepare_translation, text, source_lang, target_lang, model)
+    if job is None:
+        return cached
+
+    async def _translate_part(part):
+        response = await sarvam_client.apost('/translate', json=_translate_payload(job, part))
+        return _parse_translate_response(response)
+
+    translated_parts = await _ordered_gather(
+        _translate_part,
+        job["parts"],
+        max_concurrency=int(os.getenv("TRANSLATE_MAX_CONCURRENCY", "4")),
+        attempts=int(os.getenv("TRANSLATE_CHUNK_ATTEMPTS", "2")),
+        label="Translate chunk",
+    )
+    return await asyncio.to_thread(_finish_translation, job, translated_parts)
+
+def _stt_request(audio_data, language_code, model):
     if model is None:
         model = os.getenv('STT_MODEL', 'saarika:v2.5')
     logging.debug(f"STT Model: {model}, language_code: {language_code}")
     # audio_data is bytes of wav
-    url = f"{base_url}/speech-to-text"
-    logging.debug(f"STT URL: {url}")
-    headers = {
-        'API-Subscription-Key': api_key
-    }
     # The browser sends webm/opus. Our local recorder sends wav. Detect quickly.
     if audio_data[:4] == b'RIFF':
         filename = 'audio.wav'
@@ -428,7 +598,9 @@ def transcribe_audio(audio_data, language_code='unknown', model=None):
         'model': model
     }
     logging.debug(f"Sending STT request with data: {data}, audio length: {len(audio_data)}")
-    response = requests.post(url, headers=headers, files=files, data=data)
+    return files, data
+
+def _parse_stt_response(response):
     logging.debug(f"STT response status: {response.status_code}")
     if response.status_code == 200:
         result = response.json()
@@ -438,6 +610,18 @@ def transcribe_audio(audio_data, language_code='unknown', model=None):
         logging.error(f"STT failed: {response.text}")
         raise Exception(f"STT failed: {response.text}")
 
+def transcribe_audio(audio_data, language_code='unknown', model=None):
+    logging.debug("Entering transcribe_audio")
+    files, data = _stt_request(audio_data, language_code, model)
+    response = sarvam_client.post('/speech-to-text', files=files, data=data)
+    return _parse_stt_response(response)
+
+async def transcribe_audio_async(audio_data, language_code='unknown', model=None):
+    logging.debug("Entering transcribe_audio_async")
+    files, data = _stt_request(audio_data, language_code, model)
+    response = await sarvam_client.apost('/speech-to-text', files=files, data=data)
+    return _parse_stt_response(response)
+
 def record_audio(duration=None, sample_rate=16000):
     logging.debug("Entering record_audio")
     if duration is None:
@@ -543,44 +727,122 @@ def _split_text_for_tts(text: str, max_chars: int = 500):
         start = start + cut
     return [c for c in chunks if c]
 
-def _concat_wav_base64(wav_b64_list):
-    import base64
-    import io
-    import wave
+def _split_sentences(text: str):
+    # Sentence units for TTS batching; same rules as the streamed answer (llm_stream.py).
+    return llm_stream.split_sentences(text)
 
-    if not wav_b64_list:
-        return ""
+def _ordered_parallel_map(fn, items, max_workers=4, attempts=1, label="task"):
+    # Runs fn over items on a bounded thread pool and returns results in input order.
+    # Each item is retried on its own, so one flaky item never re-runs the others.
+    def _call(idx, item):
+        for attempt in range(1, max(1, attempts) + 1):
+            try:
+                return fn(item)
+            except Exception as e:
+                if attempt >= attempts:
+                    raise
+                logging.warning(f"{label} {idx} failed (attempt {attempt}/{attempts}): {e}; retrying")
 
-    params = None
-    combined_frames = b""
-    for i, audio_b64 in enumerate(wav_b64_list):
-        try:
-            wav_bytes = base64.b64decode(audio_b64)
-            with io.BytesIO(wav_bytes) as wav_io:
-                with wave.open(wav_io, 'rb') as wav_file:
-                    if params is None:
-                        params = wav_file.getparams()
-                    else:
-                        if wav_file.getparams()[:3] != params[:3]:
-                            logging.error(
-                                f"WAV params mismatch on chunk {i}: {wav_file.getparams()} vs {params}"
-                            )
-                            return wav_b64_list[0]
-                    combined_frames += wav_file.readframes(wav_file.getnframes())
-        except Exception as e:
-            logging.error(f"Failed to decode/concat wav chunk {i}: {e}")
-            return wav_b64_list[0]
+    if len(items) <= 1 or max_workers <= 1:
+        return [_call(i, item) for i, item in enumerate(items)]
+
+    results = [None] * len(items)
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+    try:
+        futures = {pool.submit(_call, i, item): i for i, item in enumerate(items)}
+        for fut in as_completed(futures):
+            results[futures[fut]] = fut.result()
+    except Exception:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown(wait=True)
+    return results
+
+async def _ordered_gather(fn, items, max_concurrency=4, attempts=1, label="task"):
+    # Async twin of _ordered_parallel_map: coroutine fn, bounded by a semaphore, results
+    # in input order, per-item retries.
+    limit = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def _call(idx, item):
+        for attempt in range(1, max(1, attempts) + 1):
+            try:
+                async with limit:
+                    return await fn(item)
+            except Exception as e:
+                if attempt >= attempts:
+                    raise
+                logging.warning(f"{label} {idx} failed (attempt {attempt}/{attempts}): {e}; retrying")
+
+    return list(await asyncio.gather(*(_call(i, item) for i, item in enumerate(items))))
+
+def _tts_payload(batch, language, speaker, model):
+    logging.debug(f"Sending TTS request with batch size {len(batch)}")
+    return {
+        'language': language,
+        'inputs': batch,
+        'speaker': speaker,
+        'model': model
+    }
 
-    out = io.BytesIO()
-    with wave.open(out, 'wb') as wf:
-        wf.setnchannels(params.nchannels if params else 1)
-        wf.setsampwidth(params.sampwidth if params else 2)
-        wf.setframerate(params.framerate if params else 16000)
-        wf.writeframes(combined_frames)
-    return base64.b64encode(out.getvalue()).decode('utf-8')
+def _parse_tts_response(resp):
+    logging.debug(f"TTS response status: {resp.status_code}")
+    if resp.status_code != 200:
+        logging.error(f"TTS failed: {resp.text}")
+        raise Exception(f"TTS failed: {resp.text}")
 
-def generate_tts(text, language, speaker=None, model=None):
-    logging.debug(f"Entering generate_tts with text length: {len(text)}, language: {language}")
+    try:
+        data = resp.json()
+    except Exception:
+        # Sometimes a plain base64 string is returned
+        return [resp.text]
+
+    audios = None
+    if isinstance(data, dict):
+        if 'audios' in data and isinstance(data['audios'], list):
+            audios = data['audios']
+        elif 'audio' in data:
+            audios = [data['audio']]
+        elif 'data' in data:
+            audios = [data['data']]
+    elif isinstance(data, str):
+        audios = [data]
+
+    if not audios:
+        logging.error(f"TTS response missing audio data: {data}")
+        raise Exception("TTS response missing audio data")
+    return audios
+
+def _tts_batch(batch, language, speaker, model):
+    resp = sarvam_client.post('/text-to-speech', json=_tts_payload(batch, language, speaker, model))
+    return _parse_tts_response(resp)
+
+async def _tts_batch_async(batch, language, speaker, model):
+    resp = await sarvam_client.apost('/text-to-speech', json=_tts_payload(batch, language, speaker, model))
+    return _parse_tts_response(resp)
+
+_TTS_CACHE = None
+_TTS_CACHE_LOCK = threading.Lock()
+
+def _get_tts_cache():
+    global _TTS_CACHE
+    if os.getenv("TTS_CACHE_ENABLED", "1") != "1":
+        return None
+    if _TTS_CACHE is None:
+        with _TTS_CACHE_LOCK:
+            if _TTS_CACHE is None:
+                _TTS_CACHE = tts_cache.AudioFileCache(
+                    os.getenv("TTS_CACHE_DIR", "./cache/tts"),
+                    max_bytes=int(os.getenv("TTS_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+                )
+    return _TTS_CACHE
+
+def tts_cache_stats():
+    cache = _get_tts_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+def _prepare_tts(text, language, speaker, model):
+    # Shared front half of generate_tts_wav/generate_tts_wav_async: normalizes options,
+    # splits the text, resolves cache hits and groups the misses into request batches.
     if speaker is None:
         speaker = os.getenv('DEFAULT_SPEAKER', 'anushka')
     speaker = str(speaker).strip().lower()
@@ -595,75 +857,139 @@ def generate_tts(text, language, speaker=None, model=None):
         logging.warning(f"Unsupported/unknown language '{language}', falling back to en-IN")
         language = 'en-IN'
 
-    chunks = _split_text_for_tts(text, max_chars=500)
-    if not chunks:
-        return {"audios": []}
+    cache = _get_tts_cache()
+    if cache:
+        # Sentence-sized units so recurring lines ("Please tell me your age") hit the cache
+        # even when the surrounding answer differs.
+        chunks = [c for sentence in _split_sentences(text) for c in _split_text_for_tts(sentence, max_chars=500)]
+    else:
+        chunks = _split_text_for_tts(text, max_chars=500)
     logging.debug(f"TTS chunks: {len(chunks)}")
 
-    url = f'{base_url}/text-to-speech'
-    headers = {
-        'API-Subscription-Key': api_key,
-        'Content-Type': 'application/json'
-    }
+    wavs = [None] * len(chunks)
+    keys = [None] * len(chunks)
+    if cache:
+        for i, chunk in enumerate(chunks):
+            keys[i] = cache.make_key(chunk, language, speaker, model)
+            wavs[i] = cache.get(keys[i])
+    pending = [i for i, w in enumerate(wavs) if w is None]
+    logging.debug(f"TTS cache hits: {len(chunks) - len(pending)}/{len(chunks)}")
 
     # Sarvam validates inputs list length; observed limit is 3 items.
     max_inputs_per_request = 3
-    all_audios = []
-    for i in range(0, len(chunks), max_inputs_per_request):
-        batch = chunks[i:i + max_inputs_per_request]
-
-        payload = {
-            'language': language,
-            'inputs': batch,
-            'speaker': speaker,
-            'model': model
-        }
-
-        logging.debug(f"Sending TTS request with batch size {len(batch)} (chunks {i}..{i+len(batch)-1})")
-        resp = requests.post(url, headers=headers, json=payload)
-        logging.debug(f"TTS response status: {resp.status_code}")
-        if resp.status_code != 200:
-            logging.error(f"TTS failed: {resp.text}")
-            raise Exception(f"TTS failed: {resp.text}")
+    return {
+        "language": language,
+        "speaker": speaker,
+        "model": model,
+        "cache": cache,
+        "chunks": chunks,
+        "keys": keys,
+        "wavs": wavs,
+        "batches": [pending[i:i + max_inputs_per_request] for i in range(0, len(pending), max_inputs_per_request)],
+    }
 
-        try:
-            data = resp.json()
-        except Exception:
-            # Sometimes a plain base64 string is returned
-            all_audios.append(resp.text)
+def _finish_tts(job, results):
+    # Sarvam returns base64 WAVs; decode once and assemble the PCM in a single buffer.
+    wavs, keys, cache = job["wavs"], job["keys"], job["cache"]
+    for batch, audios in zip(job["batches"], results):
+        decoded = [base64.b64decode(audio) for audio in audios]
+        if len(decoded) != len(batch):
+            # Cannot map clips back to inputs; keep the audio, skip caching it.
+            logging.warning(f"TTS returned {len(decoded)} clips for {len(batch)} inputs; not caching")
+            wavs[batch[0]] = audio_assembly.concat_wav(decoded)
+            for i in batch[1:]:
+                wavs[i] = b""
             continue
+        for i, wav in zip(batch, decoded):
+            wavs[i] = wav
+            if cache:
+                cache.put(keys[i], wav)
+
+    return audio_assembly.concat_wav([w for w in wavs if w])
+
+def generate_tts_wav(text, language, speaker=None, model=None):
+    # Synthesizes text and returns one WAV as raw bytes (empty when there is nothing to say).
+    logging.debug(f"Entering generate_tts_wav with text length: {len(text)}, language: {language}")
+    job = _prepare_tts(text, language, speaker, model)
+    if not job["chunks"]:
+        return b""
+    chunks = job["chunks"]
+    results = _ordered_parallel_map(
+        lambda batch: _tts_batch([chunks[i] for i in batch], job["language"], job["speaker"], job["model"]),
+        job["batches"],
+        max_workers=int(os.getenv("TTS_MAX_CONCURRENCY", "4")),
+        attempts=int(os.getenv("TTS_BATCH_ATTEMPTS", "2")),
+        label="TTS batch",
+    )
+    return _finish_tts(job, results)
+
+async def generate_tts_wav_async(text, language, speaker=None, model=None):
+    logging.debug(f"Entering generate_tts_wav_async with text length: {len(text)}, language: {language}")
+    # Cache lookups/stores read and write WAV files and concat_wav copies the PCM: run them
+    # in a thread so one long answer does not stall the other turns on the loop.
+    job = await asyncio.to_thread(_prepare_tts, text, language, speaker, model)
+    if not job["chunks"]:
+        return b""
+    chunks = job["chunks"]
+    results = await _ordered_gather(
+        lambda batch: _tts_batch_async([chunks[i] for i in batch], job["language"], job["speaker"], job["model"]),
+        job["batches"],
+        max_concurrency=int(os.getenv("TTS_MAX_CONCURRENCY", "4")),
+        attempts=int(os.getenv("TTS_BATCH_ATTEMPTS", "2")),
+        label="TTS batch",
+    )
+    return await asyncio.to_thread(_finish_tts, job, results)
 
-        audios = None
-        if isinstance(data, dict):
-            if 'audios' in data and isinstance(data['audios'], list):
-                audios = data['audios']
-            elif 'audio' in data:
-                audios = [data['audio']]
-            elif 'data' in data:
-                audios = [data['data']]
-        elif isinstance(data, str):
-            audios = [data]
-
-        if not audios:
-            logging.error(f"TTS response missing audio data: {data}")
-            raise Exception("TTS response missing audio data")
-
-        all_audios.extend(audios)
-
-    combined = _concat_wav_base64(all_audios)
-    return {"audios": [combined]}
+def generate_tts(text, language, speaker=None, model=None):
+    wav = generate_tts_wav(text, language, speaker=speaker, model=model)
+    if not wav:
+        return {"audios": []}
+    return {"audios": [base64.b64encode(wav).decode('utf-8')]}
 
 tools = TOOLS_SCHEMA if isinstance(TOOLS_SCHEMA, list) and TOOLS_SCHEMA else []
 
+# Memory inserts are queued and written to Chroma in batches by a background thread.
+EMBEDDER = embeddings.Embedder()
+MEMORY_WRITER = memory_writer.MemoryWriter(collection, embed_fn=EMBEDDER.embed_many)
+
 def store_memory(text):
     logging.debug(f"Entering store_memory with text length: {len(text)}")
-    # Add to vector store
-    collection.add(documents=[text], ids=[str(len(collection.get()['ids']) + 1)])
-    logging.debug("Memory stored")
-
-def retrieve_memory(query):
+    memory_id = MEMORY_WRITER.submit(text)
+    logging.debug(f"Memory queued: {memory_id}")
+    return memory_id
+
+def _summarize_memories(documents):
+    # Used by memory maintenance to roll a day of old turns into one entry.
+    messages = [
+        {"role": "system", "content": "Summarize these past conversation snippets into a few short factual notes in English: user profile facts, schemes discussed and outcomes. No greetings, no speculation."},
+        {"role": "user", "content": "\n".join(f"- {d}" for d in documents)},
+    ]
+    return openai_chat(messages, stage="memory_summary").choices[0].message.content or ""
+
+# Planner/evaluator answers for near-identical questions asked in the same state. Besides
+# numbers, the profile values named in the question (state, gender, occupation, yes/no)
+# must match: the planner's answer carries the extracted profile.
+def _cache_literals(text):
+    return semantic_cache.number_literals(text) | turn_router.entities(text)
+
+SEMANTIC_CACHE = (
+    semantic_cache.SemanticCache(EMBEDDER.embed, literals_fn=_cache_literals)
+    if os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1" else None
+)
+
+# Started by the web servers (serving_common.start_background_jobs), not on import.
+MEMORY_MAINTENANCE = memory_maintenance.MemoryMaintenance(
+    collection, embed_fn=EMBEDDER.embed_many, summarize_fn=_summarize_memories, db_path="./chroma_db",
+)
+
+def retrieve_memory(query, vector=None):
+    # vector: EMBEDDER.embed(query) when the caller already has it (see _stage_embed_in).
     logging.debug(f"Entering retrieve_memory with query: {query}")
-    results = collection.query(query_texts=[query], n_results=3)
+    try:
+        results = collection.query(query_embeddings=[vector if vector is not None else EMBEDDER.embed(query)], n_results=3)
+    except Exception as e:
+        logging.error(f"Explicit query embedding failed: {e}; letting Chroma embed")
+        results = collection.query(query_texts=[query], n_results=3)
     mem = results['documents'][0] if results['documents'] else []
     logging.debug(f"Retrieved memory: {mem}")
     return mem
@@ -708,141 +1034,544 @@ def _get_persona_en(persona_obj):
     _PERSONA_EN_CACHE["en"] = en
     return en
 
-messages = [{"role": "system", "content": _get_system_prompt_en()}]
-
-def process_voice_query(audio_data):
-    logging.debug("Entering process_voice_query")
-    logging.debug(f"Audio data length: {len(audio_data)}")
-    transcript, lang = transcribe_audio(audio_data)
-    logging.debug(f"Transcript: '{transcript}', Detected lang: {lang}")
-    if not transcript:
-        logging.debug("No transcript, returning")
-        return "No speech detected", "", "", "en-IN"
+def _normalize_detected_lang(lang):
     detected_lang = lang or 'en-IN'
     if detected_lang not in SUPPORTED_LANG_CODES:
         detected_lang = 'en-IN'
+    return detected_lang
 
-    user_input_native = transcript
+async def _transcribe_turn(audio_data):
+    transcript, lang = await transcribe_audio_async(audio_data)
+    logging.debug(f"Transcript: '{transcript}', Detected lang: {lang}")
+    return transcript, _normalize_detected_lang(lang)
+
+# ---- Turn stages ----
+# Each stage takes the shared ctx (graph inputs + results of finished stages) and returns
+# its own result. turn_pipeline.TurnGraph starts independent stages concurrently, e.g.
+# memory retrieval runs alongside the planner, and the memory write never blocks the reply.
+# Network-bound stages are coroutines awaited on the event loop; the rest (Chroma, local
+# catalog, prompt caches) are plain functions the graph runs in worker threads.
+
+async def _stage_translate_in(ctx):
+    user_input_native = ctx["user_input_native"]
+    detected_lang = ctx["detected_lang"]
     logging.debug(f"User input(native): '{user_input_native}', detected_lang: {detected_lang}")
-
     # Translate user input to English for the LLM (automatic, not fixed to any user language)
     try:
         if detected_lang == 'en-IN':
-            user_input_en = user_input_native
-        else:
-            user_input_en = translate_text(user_input_native, source_lang=detected_lang, target_lang='en-IN')
+            return user_input_native
+        return await translate_text_async(user_input_native, source_lang=detected_lang, target_lang='en-IN')
     except Exception as e:
         logging.error(f"User->English translation failed: {e}; using raw transcript")
-        user_input_en = user_input_native
+        return user_input_native
 
-    messages.append({"role": "user", "content": user_input_en})
-    logging.debug(f"Messages count: {len(messages)}")
+def _stage_embed_in(ctx):
+    # The English input is embedded once per turn; memory retrieval and the semantic cache
+    # lookups (planner, evaluator) all use this vector.
+    try:
+        return EMBEDDER.embed(ctx["translate_in"])
+    except Exception as e:
+        logging.error(f"Embedding the user input failed: {e}")
+        return None
 
+def _stage_memory(ctx):
     # Memory is stored/retrieved in English for consistency with the LLM context
-    memory = retrieve_memory(user_input_en)
+    memory = retrieve_memory(ctx["translate_in"], vector=ctx["embed_in"])
     logging.debug(f"Memory retrieved: {len(memory)} items")
-    if memory:
-        messages.append({"role": "system", "content": f"Relevant past info: {' '.join(memory)}"})
-        logging.debug("Added memory to messages")
-
-    persona_str = _get_persona_en(SWAYAM_PERSONA)
-    planner_messages = [
-        {"role": "system", "content": _get_system_prompt_en()},
-        {"role": "system", "content": f"Persona (Swayam): {persona_str}"},
-        {"role": "system", "content": f"Current known profile (JSON): {json.dumps(USER_STATE['profile'], ensure_ascii=False)}"},
-        {"role": "user", "content": user_input_en},
-        {"role": "system", "content": "Planner: Respond ONLY in JSON. keys: extracted_profile (object), goal (string), missing_fields (array), search_query (string)."},
-    ]
+    return memory
+
+def _stage_system_prompt(ctx):
+    return _get_system_prompt_en()
+
+def _stage_persona(ctx):
+    return _get_persona_en(SWAYAM_PERSONA)
+
+# Stage instructions are part of the static prompt prefix; keep per-turn data out of them.
+_PLANNER_INSTRUCTIONS = "Planner: Respond ONLY in JSON. keys: extracted_profile (object), goal (string), missing_fields (array), search_query (string)."
+_EVALUATOR_INSTRUCTIONS = (
+    "Evaluator: Answer in English (for translation). Use Planner→Executor→Evaluator structure and be voice-friendly. "
+    "Scheme lines are: id | name | eligibility | missing fields | reasons."
+)
+
+def _scheme_name_en(scheme):
+    return CATALOG.english_name(scheme.get("id"))
 
-    plan_raw = openai_chat(planner_messages).choices[0].message.content or "{}"
+async def _cached_answer(stage, scope, text, vector=None):
+    # -> (cached answer or None, query vector). vector is the turn's embedding of text, if
+    # any; otherwise the lookup embeds text in a thread (model call on a miss).
+    if SEMANTIC_CACHE is None:
+        return None, None
+    try:
+        return await asyncio.to_thread(SEMANTIC_CACHE.lookup, stage, scope, text, vector)
+    except Exception as e:
+        logging.error(f"Semantic cache lookup failed: {e}")
+        return None, None
+
+async def _cache_answer(stage, scope, text, answer, vector, started):
+    if SEMANTIC_CACHE is None:
+        return
+    try:
+        cost_ms = (time.perf_counter() - started) * 1000
+        await asyncio.to_thread(SEMANTIC_CACHE.store, stage, scope, text, answer, vector, cost_ms)
+    except Exception as e:
+        logging.error(f"Semantic cache store failed: {e}")
+
+async def _stage_planner(ctx):
+    user_input_en = ctx["translate_in"]
+    session = ctx["session"]
+    planner_messages = PROMPTS.build(
+        "planner",
+        static=[ctx["system_prompt"], f"Persona (Swayam): {ctx['persona']}", _PLANNER_INSTRUCTIONS],
+        sections=[("Current known profile", prompt_builder.compact_profile(session.profile))],
+        user=user_input_en,
+    )
+
+    scope = SEMANTIC_CACHE.scope(planner_messages[:-1]) if SEMANTIC_CACHE else None
+    plan_raw, vector = await _cached_answer("planner", scope, user_input_en, ctx.get("embed_in"))
+    if plan_raw is None:
+        started = time.perf_counter()
+        plan_raw = (await openai_chat_async(planner_messages, stage="planner")).choices[0].message.content or "{}"
+        await _cache_answer("planner", scope, user_input_en, plan_raw, vector, started)
     try:
         plan = json.loads(plan_raw)
     except Exception:
-        plan = {"extracted_profile": {}, "goal": "", "missing_fields": [], "search_query": user_input_native, "chosen_language_code": detected_lang}
+        plan = {"extracted_profile": {}, "goal": "", "missing_fields": [], "search_query": ctx["user_input_native"], "chosen_language_code": ctx["detected_lang"]}
 
     extracted = plan.get("extracted_profile") if isinstance(plan.get("extracted_profile"), dict) else {}
     contradictions = []
     for k, v in extracted.items():
         if v in (None, ""):
             continue
-        old = USER_STATE["profile"].get(k)
+        old = session.profile.get(k)
         if old not in (None, "") and str(old).strip() != str(v).strip():
             contradictions.append({"field": k, "old": old, "new": v})
-        USER_STATE["profile"][k] = v
+        session.profile[k] = v
     if contradictions:
-        USER_STATE["contradictions"].extend(contradictions)
-
-    search_query_en = plan.get("search_query") or user_input_en
-    # Scheme catalog currently contains Marathi fields, so translate the query to Marathi for matching.
+        session.contradictions.extend(contradictions)
+    return plan
+
+async def _stage_scheme_query(ctx):
+    search_query_en = ctx["planner"].get("search_query") or ctx["translate_in"]
+    # With English versions of the catalog built offline (build_catalog_index.py) the
+    # English query is matched directly and this stage costs nothing.
+    if CATALOG.english_ready():
+        return search_query_en
+    # Otherwise the catalog only has Marathi fields, so translate the query to Marathi for matching.
     try:
-        scheme_query_mr = translate_text(search_query_en, source_lang='en-IN', target_lang='mr-IN')
+        return await translate_text_async(search_query_en, source_lang='en-IN', target_lang='mr-IN')
     except Exception:
-        scheme_query_mr = search_query_en
+        return search_query_en
 
-    shortlisted = scheme_catalog_search(scheme_query_mr, language_code='mr-IN', max_results=5)
-    checks = []
-    for s in shortlisted:
-        r = eligibility_check(USER_STATE["profile"], s["id"])
-        checks.append({"scheme": s, "result": r})
+def _stage_shortlist(ctx):
+    shortlisted = scheme_catalog_search(ctx["scheme_query"], language_code='mr-IN', max_results=5)
+    # One pass over the whole catalog; the shortlist reads its results from it and the
+    # evaluator also hears about other schemes the profile already qualifies for.
+    results = RULES.check_all(ctx["session"].profile)
+    checks = [{"scheme": s, "result": results[s["id"]]} for s in shortlisted if s["id"] in results]
 
     missing_all = set()
     for c in checks:
         for m in c["result"].get("missing", []) or []:
             missing_all.add(m)
+    shortlisted_ids = {s["id"] for s in shortlisted}
+    also_eligible = [sid for sid, r in results.items() if r["eligible"] and sid not in shortlisted_ids]
+    # Remembered for the turn router, so a bare answer to the next question can skip the LLMs.
+    session = ctx["session"]
+    session.last_shortlist = [s["id"] for s in shortlisted]
+    ordered_missing = _missing_for(session.profile, session.last_shortlist, results)
+    session.pending_field = ordered_missing[0] if ordered_missing else None
+    return {"checks": checks, "missing": sorted(missing_all), "also_eligible": also_eligible[:5]}
+
+def _missing_for(profile, scheme_ids, results=None):
+    # Missing profile fields for the given schemes, in shortlist (rank) order.
+    results = results if results is not None else RULES.check_all(profile)
+    out = []
+    for sid in scheme_ids:
+        for field in (results.get(sid) or {}).get("missing", []):
+            if field not in out:
+                out.append(field)
+    return out
+
+# Greetings, repeats and bare profile answers are handled without the planner/evaluator.
+ROUTER = turn_router.TurnRouter(_missing_for)
+
+def _tool_call_args(tool_call):
+    # Parsed arguments; None when they are not valid JSON. May be any JSON value.
+    try:
+        return json.loads(tool_call.function.arguments) if tool_call.function.arguments else {}
+    except Exception:
+        return None
 
-    eval_messages = [
-        {"role": "system", "content": _get_system_prompt_en()},
-        {"role": "system", "content": f"Persona (Swayam): {persona_str}"},
-        {"role": "system", "content": "Evaluator: Answer in English (for translation). Use Planner→Executor→Evaluator structure and be voice-friendly."},
-        {"role": "system", "content": f"User language code (for translation later): {detected_lang}"},
-        {"role": "system", "content": f"Goal: {plan.get('goal', '')}"},
-        {"role": "system", "content": f"Contradictions: {json.dumps(USER_STATE['contradictions'][-3:], ensure_ascii=False)}"},
-        {"role": "system", "content": f"Shortlisted schemes + results (may contain Marathi fields): {json.dumps(checks, ensure_ascii=False)}"},
-        {"role": "system", "content": f"Missing fields: {json.dumps(sorted(list(missing_all)), ensure_ascii=False)}"},
-        {"role": "user", "content": user_input_en},
-    ]
-
-    # Executor-style loop for tool calls (OpenAI may return tool_calls with empty content)
-    response = openai_chat(eval_messages, tools=tools)
+async def _run_tool_call_async(tool_call, detected_lang, profile):
+    args = _tool_call_args(tool_call)
+    if not isinstance(args, dict):
+        logging.error(f"Tool {tool_call.function.name}: arguments are not a JSON object")
+        return {"role": "tool", "tool_call_id": tool_call.id,
+                "content": f"Tool {tool_call.function.name} failed: arguments must be a JSON object"}
+    # Tools are blocking (web search, files, catalog); keep them off the event loop.
+    result = await asyncio.to_thread(_run_tool, tool_call.function.name, args, detected_lang, profile)
+    return {"role": "tool", "tool_call_id": tool_call.id, "content": result}
+
+def _search_query(tool_call):
+    # The query of a well-formed web_search call, else None (the call then goes through
+    # _run_tool_call_async, which answers malformed arguments with an error tool message).
+    args = _tool_call_args(tool_call)
+    query = args.get("query") if isinstance(args, dict) else None
+    return query if isinstance(query, str) and query.strip() else None
+
+async def _run_tool_calls_async(tool_calls, detected_lang, profile):
+    # Several web_search calls in one response go to the search service as one batch;
+    # everything else runs concurrently alongside it. Tool messages keep the call order.
+    queries = {tc.id: _search_query(tc) for tc in tool_calls if tc.function.name == "web_search"}
+    searches = [tc for tc in tool_calls if queries.get(tc.id) is not None]
+    batched = {}
+    if len(searches) > 1:
+        async def _batch():
+            outs = await asyncio.to_thread(web_search_many, [queries[tc.id] for tc in searches])
+            for tc, out in zip(searches, outs):
+                batched[tc.id] = {"role": "tool", "tool_call_id": tc.id, "content": out}
+        others = [tc for tc in tool_calls if queries.get(tc.id) is None]
+        results = await asyncio.gather(_batch(), *(_run_tool_call_async(tc, detected_lang, profile) for tc in others))
+        by_id = dict(batched)
+        by_id.update({m["tool_call_id"]: m for m in results[1:]})
+        return [by_id[tc.id] for tc in tool_calls]
+    return list(await asyncio.gather(*(_run_tool_call_async(tc, detected_lang, profile) for tc in tool_calls)))
+
+async def _evaluate_blocking(eval_messages, detected_lang, profile):
+    # Executor-style loop for tool calls (OpenAI may return tool_calls with empty content).
+    # Calls from one response are independent, so they run concurrently.
+    # -> (answer, number of tool rounds)
+    response = await openai_chat_async(eval_messages, tools=tools, stage="evaluator")
     msg = response.choices[0].message
     tool_loops = 0
     while getattr(msg, "tool_calls", None) and tool_loops < 5:
         tool_loops += 1
         eval_messages.append(msg)
-        for tool_call in msg.tool_calls:
-            try:
-                args = json.loads(tool_call.function.arguments) if tool_call.function.arguments else {}
-            except Exception:
-                args = {}
-            result = _run_tool(tool_call.function.name, args, detected_lang=detected_lang)
-            eval_messages.append({"role": "tool", "tool_call_id": tool_call.id, "content": result})
-        response = openai_chat(eval_messages, tools=tools)
+        eval_messages.extend(await _run_tool_calls_async(msg.tool_calls, detected_lang, profile))
+        response = await openai_chat_async(eval_messages, tools=tools, stage="evaluator")
         msg = response.choices[0].message
+    return (getattr(msg, "content", None) or "").strip(), tool_loops
+
+async def _evaluator_round_streamed(eval_messages, detected_lang, profile, sentences, run_tools):
+    # One streamed evaluator call. Each tool call starts as soon as its arguments are
+    # complete, while the model is still writing; answer text goes to `sentences` as it
+    # arrives. -> (text, tool calls for the assistant message, tool result messages)
+    assembler = llm_stream.ToolCallAssembler()
+    running = []
+    parts = []
+
+    def _start(calls):
+        for c in calls if run_tools else []:
+            call = SimpleNamespace(id=c["id"], function=SimpleNamespace(**c["function"]))
+            running.append(asyncio.ensure_future(_run_tool_call_async(call, detected_lang, profile)))
 
-    assistant_en = (getattr(msg, "content", None) or "").strip()
+    try:
+        async for chunk in openai_chat_stream_async(eval_messages, tools=tools, stage="evaluator"):
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                parts.append(delta.content)
+                if sentences is not None:
+                    sentences.feed(delta.content)
+            if delta.tool_calls:
+                _start(assembler.add(delta.tool_calls))
+        _start(assembler.finish())
+        results = list(await asyncio.gather(*running))
+    except BaseException:
+        for task in running:
+            task.cancel()
+        raise
+    return "".join(parts), assembler.calls(), results
+
+async def _evaluate_streamed(eval_messages, detected_lang, profile, sentences):
+    # Same loop as _evaluate_blocking over streamed rounds. Text written alongside tool calls
+    # ("Let me check that") has already been spoken, so it stays part of the answer.
+    spoken = []
+    tool_loops = 0
+    while True:
+        text, calls, results = await _evaluator_round_streamed(
+            eval_messages, detected_lang, profile, sentences, run_tools=tool_loops < 5,
+        )
+        if text.strip():
+            spoken.append(text.strip())
+        if not calls or tool_loops >= 5:
+            break
+        tool_loops += 1
+        eval_messages.append({"role": "assistant", "content": text or None, "tool_calls": calls})
+        eval_messages.extend(results)
+    return " ".join(spoken), tool_loops
+
+async def _stage_evaluator(ctx):
+    user_input_en = ctx["translate_in"]
+    detected_lang = ctx["detected_lang"]
+    plan = ctx["planner"]
+    checks = ctx["shortlist"]["checks"]
+    session = ctx["session"]
+
+    session.add_message("user", user_input_en)
+    if ctx["memory"]:
+        session.add_message("system", f"Relevant past info: {' '.join(ctx['memory'])}")
+        logging.debug("Added memory to session history")
+    logging.debug(f"Session {session.session_id} history length: {len(session.history)}")
+
+    # Sections are listed most important first; the builder trims from the end to fit the budget.
+    # The cache scope covers everything but the language code: the answer is English either way.
+    static = [ctx["system_prompt"], f"Persona (Swayam): {ctx['persona']}", _EVALUATOR_INSTRUCTIONS]
+    sections = [
+        ("Goal", plan.get("goal", "")),
+        ("Missing fields", ", ".join(ctx["shortlist"]["missing"]) or "none"),
+        ("Shortlisted schemes", "\n" + prompt_builder.compact_checks(checks, name_for=_scheme_name_en)),
+        ("Contradictions", prompt_builder.compact_contradictions(session.recent_contradictions(3))),
+        ("Other schemes the user already qualifies for (ids)", ", ".join(ctx["shortlist"]["also_eligible"]) or "none"),
+    ]
+    eval_messages = PROMPTS.build(
+        "evaluator",
+        static=static,
+        sections=[("User language code (for translation later)", detected_lang)] + sections,
+        user=user_input_en,
+    )
+
+    scope = SEMANTIC_CACHE.scope(static, prompt_builder.compact_profile(session.profile), sections) if SEMANTIC_CACHE else None
+    assistant_en, vector = await _cached_answer("evaluator", scope, user_input_en, ctx.get("embed_in"))
+    if assistant_en is not None:
+        session.add_message("assistant", assistant_en)
+        return assistant_en
+    started = time.perf_counter()
+
+    if _LLM_STREAM:
+        assistant_en, tool_loops = await _evaluate_streamed(eval_messages, detected_lang, session.profile, ctx.get("sentences"))
+    else:
+        assistant_en, tool_loops = await _evaluate_blocking(eval_messages, detected_lang, session.profile)
     if not assistant_en:
         assistant_en = "Sorry, I could not generate an answer. Please repeat your question."
+    elif tool_loops:
+        # Answers built on tool results (live web search, files) are not reusable.
+        if SEMANTIC_CACHE:
+            SEMANTIC_CACHE.bypass("evaluator")
+    else:
+        await _cache_answer("evaluator", scope, user_input_en, assistant_en, vector, started)
+    session.add_message("assistant", assistant_en)
+    return assistant_en
+
+async def _stage_localize(ctx):
+    return await _localize_answer_async(ctx["evaluator"], ctx["detected_lang"])
+
+async def _stage_tts(ctx):
+    logging.debug("Generating TTS")
+    wav = await generate_tts_wav_async(ctx["localize"], ctx["detected_lang"])
+    logging.debug(f"TTS audio length: {len(wav)} bytes")
+    return wav
+
+def _stage_store_memory(ctx):
+    store_memory(ctx["translate_in"] + " " + ctx["evaluator"])
+    logging.debug("Memory stored")
+
+def _stage_route(ctx):
+    # Cheap local routing (turn_router): a fast-path reply, or None for the full pipeline.
+    route = ROUTER.route(ctx["user_input_native"], ctx["translate_in"], ctx["session"])
+    logging.debug(f"Turn route: {route['kind']}")
+    return route
+
+def _full_path(ctx):
+    return ctx["route"]["reply_en"] is None
+
+def _stage_fast_reply(ctx):
+    # Stands in for the evaluator on fast-path turns: the router already wrote the reply.
+    reply_en = ctx["route"]["reply_en"]
+    ctx["session"].add_message("user", ctx["translate_in"])
+    ctx["session"].add_message("assistant", reply_en)
+    return reply_en
+
+async def _stage_answer(ctx):
+    if _full_path(ctx):
+        return await _stage_evaluator(ctx)
+    return _stage_fast_reply(ctx)
+
+def _build_turn_graph(with_tts, localize=True):
+    # One graph per output mode, from the input translation to the reply audio, so the
+    # reported critical path covers the whole turn. Fast-path turns skip the planner,
+    # catalog and memory stages (when=_full_path) and "evaluator" returns the router's reply.
+    # localize=False is the streaming variant: sentences are translated/synthesized by the
+    # caller as the evaluator writes them (see process_voice_query_stream_async).
+    stages = [
+        turn_pipeline.Stage("translate_in", _stage_translate_in),
+        turn_pipeline.Stage("route", _stage_route, deps=["translate_in"]),
+        turn_pipeline.Stage("system_prompt", _stage_system_prompt),
+        turn_pipeline.Stage("persona", _stage_persona),
+        turn_pipeline.Stage("embed_in", _stage_embed_in, deps=["route"], when=_full_path),
+        turn_pipeline.Stage("memory", _stage_memory, deps=["embed_in"], when=_full_path),
+        turn_pipeline.Stage("planner", _stage_planner, deps=["embed_in", "system_prompt", "persona"], when=_full_path),
+        turn_pipeline.Stage("scheme_query", _stage_scheme_query, deps=["planner"], when=_full_path),
+        turn_pipeline.Stage("shortlist", _stage_shortlist, deps=["scheme_query"], when=_full_path),
+        turn_pipeline.Stage("evaluator", _stage_answer, deps=["route", "planner", "shortlist", "memory", "embed_in", "system_prompt", "persona"]),
+        turn_pipeline.Stage("store_memory", _stage_store_memory, deps=["evaluator"], critical=False, when=_full_path),
+    ]
+    if localize:
+        stages.append(turn_pipeline.Stage("localize", _stage_localize, deps=["evaluator"]))
+    if with_tts:
+        stages.append(turn_pipeline.Stage("tts", _stage_tts, deps=["localize"]))
+    return turn_pipeline.TurnGraph(stages, name="turn+tts" if with_tts else ("turn" if localize else "turn+stream"))
+
+_TURN_GRAPH_WITH_TTS = _build_turn_graph(with_tts=True)
+_TURN_GRAPH_STREAM = _build_turn_graph(with_tts=False, localize=False)
+
+async def _run_turn(user_input_native, detected_lang, session, sentences=None):
+    # Runs the whole turn graph: translation, routing, then the full or the fast path.
+    # With a llm_stream.SentenceStream the English answer is delivered there sentence by
+    # sentence instead of being localized and synthesized here.
+    # The caller holds session.turn_lock.
+    inputs = {"user_input_native": user_input_native, "detected_lang": detected_lang, "session": session}
+    stream = sentences is not None
+    try:
+        if stream:
+            inputs["sentences"] = sentences
+        ctx, _ = await (_TURN_GRAPH_STREAM if stream else _TURN_GRAPH_WITH_TTS).run_async(inputs)
+        if stream:
+            # Fast-path, cached or non-streamed answers arrive here in one piece.
+            sentences.emit_all(ctx["evaluator"])
+        return ctx
+    finally:
+        if stream:
+            sentences.finish()
+
+def _localize_answer(assistant_en, detected_lang):
+    try:
+        if detected_lang == 'en-IN':
+            return assistant_en
+        return translate_text(assistant_en, source_lang='en-IN', target_lang=detected_lang)
+    except Exception as e:
+        logging.error(f"English->User translation failed: {e}; using English")
+        return assistant_en
 
+async def _localize_answer_async(assistant_en, detected_lang):
     try:
         if detected_lang == 'en-IN':
-            assistant_native = assistant_en
-        else:
-            assistant_native = translate_text(assistant_en, source_lang='en-IN', target_lang=detected_lang)
+            return assistant_en
+        return await translate_text_async(assistant_en, source_lang='en-IN', target_lang=detected_lang)
     except Exception as e:
         logging.error(f"English->User translation failed: {e}; using English")
-        assistant_native = assistant_en
+        return assistant_en
+
+# ---- Entry points ----
+# The *_async functions are the real implementation and are what the async server awaits.
+# The sync wrappers (Flask app, CLI loop) submit them to one long-lived background event
+# loop, so pooled HTTP clients and per-session locks are shared across requests instead of
+# being rebuilt by a fresh asyncio.run() each time.
+
+_LOOP = None
+_LOOP_LOCK = threading.Lock()
+
+def _background_loop():
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="agent-loop", daemon=True).start()
+            _LOOP = loop
+    return _LOOP
+
+def run_sync(coro):
+    # Runs a coroutine on the shared background loop and blocks for its result.
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
+
+async def process_voice_query_async(audio_data, raw_audio=False, session_id=None):
+    # raw_audio=True returns the reply WAV as bytes instead of a base64 string.
+    # session_id selects the caller's profile/history; None uses the local default session.
+    logging.debug("Entering process_voice_query_async")
+    logging.debug(f"Audio data length: {len(audio_data)}")
+    transcript, detected_lang = await _transcribe_turn(audio_data)
+    if not transcript:
+        logging.debug("No transcript, returning")
+        return "No speech detected", (b"" if raw_audio else ""), "", "en-IN"
+
+    async with SESSIONS.turn(session_id) as session:
+        ctx = await _run_turn(transcript, detected_lang, session)
+    wav = ctx["tts"]
+    audio_out = wav if raw_audio else (base64.b64encode(wav).decode('utf-8') if wav else "")
+    return ctx["localize"], audio_out, transcript, detected_lang
+
+def process_voice_query(audio_data, raw_audio=False, session_id=None):
+    return run_sync(process_voice_query_async(audio_data, raw_audio=raw_audio, session_id=session_id))
+
+async def process_voice_query_stream_async(audio_data, session_id=None):
+    # Same turn as process_voice_query, but yields events as soon as they are ready:
+    #   {"type": "user", ...}       after STT
+    #   {"type": "sentence", ...}   one per spoken sentence, in order, with its own WAV
+    #   {"type": "done", ...}       full native answer once every sentence was sent
+    # The evaluator's answer is streamed: each English sentence is translated and
+    # synthesized as soon as the model finishes it, while later ones are still being written.
+    logging.debug("Entering process_voice_query_stream_async")
+    logging.debug(f"Audio data length: {len(audio_data)}")
+    transcript, detected_lang = await _transcribe_turn(audio_data)
+    if not transcript:
+        logging.debug("No transcript, returning")
+        yield {"type": "done", "user": "", "response": "No speech detected", "lang": "en-IN"}
+        return
 
-    messages.append({"role": "assistant", "content": assistant_en})
+    user_input_native = transcript
+    yield {"type": "user", "user": user_input_native, "lang": detected_lang}
 
-    logging.debug("Generating TTS")
-    tts_result = generate_tts(assistant_native, detected_lang)
-    audios = tts_result.get('audios') if isinstance(tts_result, dict) else None
-    audio_base64 = audios[0] if audios else ""
-    logging.debug(f"TTS audio length: {len(audio_base64) if isinstance(audio_base64, str) else 0}")
-
-    store_memory(user_input_en + " " + assistant_en)
-    logging.debug("Memory stored, returning")
-    return assistant_native, audio_base64, user_input_native, detected_lang
+    sentences = llm_stream.SentenceStream()
+    limit = asyncio.Semaphore(max(1, int(os.getenv("STREAM_TTS_WORKERS", "3"))))
+    started = asyncio.Queue()  # per-sentence tasks in answer order, None at the end
+
+    async def _sentence(idx, sentence_en):
+        sentence_native = await _localize_answer_async(sentence_en, detected_lang)
+        try:
+            async with limit:
+                wav = await generate_tts_wav_async(sentence_native, detected_lang)
+            audio_base64 = base64.b64encode(wav).decode('utf-8') if wav else ""
+        except Exception as e:
+            logging.error(f"TTS failed for sentence {idx}: {e}")
+            audio_base64 = ""
+        return sentence_native, audio_base64
+
+    async def _dispatch():
+        # Translation + TTS of each sentence starts as soon as the evaluator has written it.
+        idx = 0
+        async for sentence_en in sentences:
+            started.put_nowait(asyncio.ensure_future(_sentence(idx, sentence_en)))
+            idx += 1
+        started.put_nowait(None)
+
+    natives = []
+    tasks = []
+    async with SESSIONS.turn(session_id) as session:
+        turn = asyncio.ensure_future(_run_turn(user_input_native, detected_lang, session, sentences=sentences))
+        dispatcher = asyncio.ensure_future(_dispatch())
+        try:
+            while True:
+                task = await started.get()
+                if task is None:
+                    break
+                tasks.append(task)
+                sentence_native, audio_base64 = await task
+                natives.append(sentence_native)
+                yield {"type": "sentence", "index": len(natives) - 1, "text": sentence_native, "audio": audio_base64}
+            await turn  # re-raises a failed turn
+        finally:
+            for t in tasks + [dispatcher, turn]:
+                t.cancel()
+    assistant_native = " ".join(natives)
+
+    yield {"type": "done", "user": user_input_native, "response": assistant_native, "lang": detected_lang}
+
+def process_voice_query_stream(audio_data, session_id=None):
+    # Sync generator over process_voice_query_stream_async for the Flask app.
+    agen = process_voice_query_stream_async(audio_data, session_id=session_id)
+    try:
+        while True:
+            try:
+                yield run_sync(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        # Client went away mid-stream: let the generator cancel its pending TTS.
+        try:
+            run_sync(agen.aclose())
+        except Exception:
+            pass
 
 def agent_loop():
     detected_lang = None
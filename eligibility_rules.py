@@ -0,0 +1,271 @@
+import re
+import logging
+import threading
+
+# Eligibility rules from data/schemes.json, compiled into predicate objects.
+# A scheme's "rules" object maps rule keys to parameters; the key names the profile field
+# and the kind of check:
+#   min_<field>: number          value must be >= number           (min_age: 60)
+#   <field>_in: [values]         value must contain one of them    (occupation_in)
+#   <field>_any: [values]        same as _in                       (income_bracket_any)
+#   <field>_not: [values]        value must not be one of them     (has_pucca_house_not)
+#   <field>_required: true       value must be a "yes"             (rural_required)
+#   <field>_required: [values]   same, also accepting these values
+#   <field>_advisory: [values]   like _in, but only adds a reason  (gender_advisory)
+# "reasons" overrides the default (Marathi) reason text per rule key; "notes" is ignored.
+#
+# evaluate_all() checks one profile against every scheme column by column: each rule kind
+# is a column of (scheme, parameters) entries and each profile field is normalized once,
+# instead of re-reading the profile for every scheme.
+
+_YES = ["yes", "y", "true", "1", "होय", "हो", "हाँ", "हां", "हा"]
+# Values besides "yes" that satisfy a "<field>_required": true rule.
+_AFFIRMATIVE = {
+    "rural": ["rural", "village", "गाव", "ग्रामीण", "गांव"],
+}
+# A list rule never matches a value that is negated ("not a farmer", "शेतकरी नाही").
+# "ना" is left out: it is also a common tag particle ("शेतकरी आहे ना").
+_NEGATIONS = {"not", "no", "non", "never", "नाही", "नाहीं", "नहीं", "नको"}
+# Explicit Indic ranges so words are not split at vowel signs (see scheme_catalog.py).
+_WORD_RE = re.compile(r"[0-9a-z_\u0900-\u0DFF]+")
+
+_FIELD_LABELS = {
+    "occupation": "व्यवसाय",
+    "income_bracket": "उत्पन्न गट",
+    "rural": "ग्रामीण निवास",
+    "gender": "लिंग",
+    "age": "वय",
+}
+
+NOT_FOUND_REASON = "योजना सापडली नाही."
+
+
+def _norm(value):
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    return " ".join(str(value).split()).lower()
+
+
+def _words(text):
+    return tuple(_WORD_RE.findall(text))
+
+
+def _contains(words, phrase):
+    n = len(phrase)
+    return n > 0 and any(words[i:i + n] == phrase for i in range(len(words) - n + 1))
+
+
+def _empty(value):
+    return value in (None, "", [])
+
+
+class MinValue:
+    def __init__(self, field, threshold, reason=None):
+        self.field = field
+        self.threshold = float(threshold)
+        shown = int(self.threshold) if self.threshold.is_integer() else self.threshold
+        label = _FIELD_LABELS.get(field, field)
+        self.reason = reason or (f"वय {shown} वर्षांपेक्षा कमी आहे." if field == "age" else f"{label} {shown} पेक्षा कमी आहे.")
+        self.unclear = f"{label} स्पष्ट नाही."
+        self.blocking = True
+
+    def prepare(self, value):
+        try:
+            return float(str(value).strip())
+        except Exception:
+            return None
+
+    def check(self, prepared):
+        # -> (ok, reason)
+        if prepared is None:
+            return False, self.unclear
+        return (True, None) if prepared >= self.threshold else (False, self.reason)
+
+
+class ValueIn:
+    # Matches when the value is one of the allowed values, or contains one as whole words
+    # ("small farmer" matches "farmer"; "lower middle" does not match "low").
+    def __init__(self, field, allowed, reason=None, blocking=True):
+        self.field = field
+        self.allowed = [_norm(v) for v in (allowed if isinstance(allowed, list) else [allowed])]
+        self._phrases = [_words(a) for a in self.allowed]
+        self.reason = reason or f"{_FIELD_LABELS.get(self.field, self.field)} पात्रता निकषात बसत नाही."
+        self.blocking = blocking
+
+    def prepare(self, value):
+        normalized = _norm(value)
+        return normalized, _words(normalized)
+
+    def check(self, prepared):
+        normalized, words = prepared
+        if normalized in self.allowed:
+            return True, None
+        if any(w in _NEGATIONS for w in words):
+            return False, self.reason
+        return (True, None) if any(_contains(words, p) for p in self._phrases) else (False, self.reason)
+
+
+class ValueNotIn:
+    def __init__(self, field, disallowed, reason=None):
+        self.field = field
+        self.disallowed = {_norm(v) for v in (disallowed if isinstance(disallowed, list) else [disallowed])}
+        self.reason = reason or f"{_FIELD_LABELS.get(self.field, self.field)} पात्रता निकषात बसत नाही."
+        self.blocking = True
+
+    def prepare(self, value):
+        return _norm(value)
+
+    def check(self, prepared):
+        return (False, self.reason) if prepared in self.disallowed else (True, None)
+
+
+class Required(ValueIn):
+    # Matches an affirmative value only: "urban" or a misheard answer does not satisfy it.
+    def __init__(self, field, params, reason=None):
+        extra = params if isinstance(params, list) else _AFFIRMATIVE.get(field, [])
+        reason = reason or f"या योजनेसाठी {_FIELD_LABELS.get(field, field)} आवश्यक आहे."
+        super().__init__(field, _YES + list(extra), reason)
+
+
+def compile_rule(key, params, reason=None):
+    # Returns a predicate for one rules entry, or None if the key is not a check.
+    if key.startswith("min_"):
+        return MinValue(key[4:], params, reason)
+    if key.endswith("_advisory"):
+        return ValueIn(key[:-9], params, reason, blocking=False)
+    if key.endswith("_in"):
+        return ValueIn(key[:-3], params, reason)
+    if key.endswith("_any"):
+        return ValueIn(key[:-4], params, reason)
+    if key.endswith("_not"):
+        return ValueNotIn(key[:-4], params, reason)
+    if key.endswith("_required"):
+        return Required(key[:-9], params, reason) if params else None
+    return None
+
+
+class CompiledRules:
+    def __init__(self, schemes):
+        self.ids = []
+        self.index = {}      # scheme id -> position
+        self.required = []   # position -> required fields
+        self.rules = []      # position -> [predicate]
+        self.columns = {}    # (type, field) -> [(position, predicate)]
+        for scheme in schemes:
+            sid = scheme.get("id")
+            if not sid or sid in self.index:
+                continue
+            pos = len(self.ids)
+            self.ids.append(sid)
+            self.index[sid] = pos
+            self.required.append(list(scheme.get("required_fields", [])))
+            spec = scheme.get("rules") if isinstance(scheme.get("rules"), dict) else {}
+            reasons = spec.get("reasons") if isinstance(spec.get("reasons"), dict) else {}
+            compiled = []
+            for key, params in spec.items():
+                if key in ("notes", "reasons"):
+                    continue
+                try:
+                    rule = compile_rule(key, params, reasons.get(key))
+                except Exception as e:
+                    logging.error(f"Scheme {sid}: cannot compile rule {key}={params!r}: {e}")
+                    continue
+                if rule is None:
+                    logging.warning(f"Scheme {sid}: unknown rule {key}; ignored")
+                    continue
+                compiled.append(rule)
+                self.columns.setdefault((type(rule).__name__, rule.field), []).append((pos, rule))
+            self.rules.append(compiled)
+
+    def _missing(self, profile, positions):
+        present = {}
+        out = {}
+        for pos in positions:
+            missing = []
+            for f in self.required[pos]:
+                if f not in present:
+                    present[f] = not _empty(profile.get(f))
+                if not present[f]:
+                    missing.append(f)
+            out[pos] = missing
+        return out
+
+    def evaluate(self, profile, scheme_id):
+        profile = profile or {}
+        pos = self.index.get((scheme_id or "").strip())
+        if pos is None:
+            return {"eligible": False, "reasons": [NOT_FOUND_REASON], "missing": []}
+        missing = self._missing(profile, [pos])[pos]
+        if missing:
+            return {"eligible": False, "reasons": [], "missing": missing}
+        eligible, reasons = True, []
+        for rule in self.rules[pos]:
+            ok, reason = rule.check(rule.prepare(profile.get(rule.field)))
+            if not ok:
+                reasons.append(reason)
+                eligible = eligible and not rule.blocking
+        return {"eligible": eligible, "reasons": reasons, "missing": []}
+
+    def evaluate_all(self, profile):
+        # {scheme_id: {"eligible", "reasons", "missing"}} for every scheme, in catalog order.
+        profile = profile or {}
+        n = len(self.ids)
+        missing = self._missing(profile, range(n))
+        complete = [not missing[pos] for pos in range(n)]
+        eligible = complete[:]
+        reasons = [[] for _ in range(n)]
+        for (_, field), entries in self.columns.items():
+            prepared = None  # the profile value is normalized once per column
+            for pos, rule in entries:
+                if not complete[pos]:
+                    continue
+                if prepared is None:
+                    prepared = (rule.prepare(profile.get(field)),)
+                ok, reason = rule.check(prepared[0])
+                if not ok:
+                    reasons[pos].append(reason)
+                    if rule.blocking:
+                        eligible[pos] = False
+        return {
+            sid: {"eligible": eligible[pos], "reasons": reasons[pos], "missing": missing[pos]}
+            for pos, sid in enumerate(self.ids)
+        }
+
+
+def application_checklist(scheme):
+    items = [
+        f"योजना: {scheme['name']}",
+        "ओळखपत्र: आधार/मतदार ओळखपत्र (OTP/PIN कधीही देऊ नका)",
+        "पत्ता पुरावा",
+        "बँक खाते तपशील",
+        "उत्पन्न दाखला (लागू असल्यास)",
+        "जात प्रमाणपत्र (लागू असल्यास)",
+        "पासपोर्ट साईज फोटो",
+    ]
+    return "\n".join(items)
+
+
+class RuleEngine:
+    # Keeps CompiledRules in step with a scheme_catalog.SchemeCatalog: rules are recompiled
+    # only when the catalog reports a new version.
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._lock = threading.Lock()
+        self._version = None
+        self._compiled = None
+
+    def compiled(self):
+        version, schemes = self.catalog.snapshot()  # also picks up file changes
+        with self._lock:
+            if self._compiled is None or self._version != version:
+                self._compiled = CompiledRules(schemes)
+                self._version = version
+                logging.debug(f"Compiled eligibility rules for {len(self._compiled.ids)} schemes")
+            return self._compiled
+
+    def check(self, profile, scheme_id):
+        return self.compiled().evaluate(profile, scheme_id)
+
+    def check_all(self, profile):
+        return self.compiled().evaluate_all(profile)
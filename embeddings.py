@@ -0,0 +1,96 @@
+import os
+import time
+import hashlib
+import threading
+
+import kv_cache
+
+
+def default_embedding_function():
+    # The same model Chroma uses for collections created without an embedding function
+    # (all-MiniLM-L6-v2, ONNX, CPU), so vectors stay comparable with what is already stored.
+    try:
+        from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+        return ONNXMiniLM_L6_V2()  # one instance: the model is loaded once, not per call
+    except ImportError:
+        from chromadb.utils import embedding_functions
+        return embedding_functions.DefaultEmbeddingFunction()
+
+
+class Embedder:
+    # Explicit embeddings for the memory collection.
+    #  - vectors are cached by hash of (model, normalized text) in a TwoLevelCache, so a
+    #    repeated question or a retried write never runs the model twice
+    #  - misses from one call are embedded in batches of batch_size in a single model call
+    # Callers pass the vectors to collection.query/add instead of letting Chroma embed.
+
+    def __init__(self, fn=None, model_name=None, cache=None, batch_size=None):
+        self._fn = fn
+        self._fn_lock = threading.Lock()
+        self.model_name = model_name or os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+        self.batch_size = max(1, int(batch_size or os.getenv("EMBEDDING_BATCH_SIZE", "32")))
+        self.cache = cache
+        if self.cache is None and os.getenv("EMBEDDING_CACHE_ENABLED", "1") == "1":
+            self.cache = kv_cache.TwoLevelCache(
+                os.getenv("EMBEDDING_CACHE_PATH", "./cache/embeddings.sqlite3"),
+                table="embeddings",
+                max_memory_items=int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "1024")),
+                max_disk_items=int(os.getenv("EMBEDDING_CACHE_MAX_ITEMS", "20000")),
+            )
+        self._lock = threading.Lock()
+        self._counters = {"texts": 0, "computed": 0, "model_calls": 0, "model_ms_total": 0.0}
+
+    def _model(self):
+        if self._fn is None:
+            with self._fn_lock:
+                if self._fn is None:
+                    self._fn = default_embedding_function()
+        return self._fn
+
+    def key(self, text):
+        normalized = " ".join(str(text).split())
+        return hashlib.sha256(f"{self.model_name}\x1f{normalized}".encode("utf-8")).hexdigest()
+
+    def embed_many(self, texts):
+        # -> one vector (list of floats) per text, in order.
+        texts = list(texts)
+        keys = [self.key(t) for t in texts]
+        vectors = [self.cache.get(k) if self.cache else None for k in keys]
+
+        # Identical texts in one call are embedded once.
+        todo = {}
+        for i, v in enumerate(vectors):
+            if v is None:
+                todo.setdefault(keys[i], texts[i])
+        pending = list(todo.items())
+        computed = {}
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            started = time.perf_counter()
+            out = self._model()([t for _, t in batch])
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._counters["model_calls"] += 1
+                self._counters["model_ms_total"] += elapsed_ms
+            for (k, _), vec in zip(batch, out):
+                computed[k] = [float(x) for x in vec]
+                if self.cache:
+                    self.cache.set(k, computed[k])
+
+        with self._lock:
+            self._counters["texts"] += len(texts)
+            self._counters["computed"] += len(computed)
+        return [v if v is not None else computed[k] for k, v in zip(keys, vectors)]
+
+    def embed(self, text):
+        return self.embed_many([text])[0]
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+        calls = out["model_calls"]
+        out["avg_model_ms"] = round(out.pop("model_ms_total") / calls, 1) if calls else 0.0
+        out["reused"] = out["texts"] - out["computed"]
+        if self.cache:
+            out["cache"] = self.cache.stats()
+        return out
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+
+class TwoLevelCache:
+    # In-process LRU in front of a SQLite table.
+    #  - memory: bounded OrderedDict (most recently used at the end)
+    #  - disk:   survives restarts and is shared by every process pointing at the same file
+    # Values must be JSON-serializable. Entries older than ttl_s are treated as misses.
+
+    def __init__(self, path, table="cache", max_memory_items=1024, max_disk_items=50000, ttl_s=None):
+        self.path = path
+        self.table = table
+        self.max_memory_items = max(0, int(max_memory_items))
+        self.max_disk_items = max(0, int(max_disk_items))
+        self.ttl_s = float(ttl_s) if ttl_s else None
+        self._mem = OrderedDict()  # key -> (created_ts, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes_since_prune = 0
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "sets": 0, "evictions": 0}
+        self._disk_ok = True
+        try:
+            self._init_db()
+        except Exception as e:
+            logging.error(f"Cache {table}: disk store unavailable at {path}: {e}; memory only")
+            self._disk_ok = False
+
+    # ---- SQLite plumbing ----
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table}(accessed)")
+        conn.commit()
+
+    def _is_expired(self, created, now):
+        return self.ttl_s is not None and (now - created) > self.ttl_s
+
+    # ---- public API ----
+    def get_entry(self, key):
+        # Returns (value, created_ts) even if expired, or None. Does not touch hit/miss counters.
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                self._mem.move_to_end(key)
+                return entry[1], entry[0]
+        if not self._disk_ok:
+            return None
+        try:
+            conn = self._conn()
+            row = conn.execute(f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            value = json.loads(row[0])
+        except Exception as e:
+            logging.error(f"Cache {self.table}: disk read failed: {e}")
+            return None
+        self._remember(key, row[1], value)
+        return value, row[1]
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            in_memory = key in self._mem
+        entry = self.get_entry(key)
+        with self._lock:
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            if self._is_expired(entry[1], now):
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._counters["memory_hits" if in_memory else "disk_hits"] += 1
+        return entry[0]
+
+    def set(self, key, value):
+        now = time.time()
+        self._remember(key, now, value)
+        with self._lock:
+            self._counters["sets"] += 1
+            self._writes_since_prune += 1
+            prune = self._writes_since_prune >= 100
+            if prune:
+                self._writes_since_prune = 0
+        if not self._disk_ok:
+            return
+        try:
+            conn = self._conn()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            conn.commit()
+            if prune:
+                self.prune()
+        except Exception as e:
+            logging.error(f"Cache {self.table}: disk write failed: {e}")
+
+    def prune(self):
+        # Drops expired rows, then the least recently accessed rows beyond max_disk_items.
+        if not self._disk_ok:
+            return 0
+        conn = self._conn()
+        removed = 0
+        if self.ttl_s is not None:
+            removed += conn.execute(f"DELETE FROM {self.table} WHERE created < ?", (time.time() - self.ttl_s,)).rowcount
+        if self.max_disk_items:
+            removed += conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_items,),
+            ).rowcount
+        conn.commit()
+        with self._lock:
+            self._counters["evictions"] += removed
+        return removed
+
+    def _remember(self, key, created, value):
+        if not self.max_memory_items:
+            return
+        with self._lock:
+            self._mem[key] = (created, value)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_memory_items:
+                self._mem.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+            out["memory_items"] = len(self._mem)
+        lookups = out["memory_hits"] + out["disk_hits"] + out["misses"]
+        out["hit_rate"] = round((out["memory_hits"] + out["disk_hits"]) / lookups, 3) if lookups else 0.0
+        if self._disk_ok:
+            try:
+                out["disk_items"] = self._conn().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            except Exception:
+                pass
+        return out
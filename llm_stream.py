@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import asyncio
+
+# Helpers for streamed chat completions (stream=True).
+#
+# ToolCallAssembler rebuilds tool calls from their deltas. A call counts as complete as soon
+# as its arguments parse as a JSON object (the API streams each call's arguments
+# contiguously, so a parsable object cannot grow further), or at the latest when the next
+# call starts or the stream ends. Complete calls can be started while the model is still
+# writing the rest of the response.
+#
+# SentenceStream turns answer text deltas into whole sentences that a consumer can
+# translate and synthesize while the model is still writing.
+
+# Sentence boundary: terminator (Devanagari danda too) followed by whitespace. A "." after
+# a number ("1.", "2019."), a single letter ("A.") or a known abbreviation ("Rs.", "Dr.")
+# is not a boundary. Pieces shorter than MIN_SENTENCE_CHARS are joined with the next one,
+# so every translate call and TTS clip carries a useful amount of speech.
+SENTENCE_END_RE = re.compile(r'(?<=[.!?।॥])\s+')
+MIN_SENTENCE_CHARS = int(os.getenv("MIN_SENTENCE_CHARS", "20"))
+_ABBREVIATIONS = {
+    "rs", "dr", "no", "nos", "etc", "mr", "mrs", "ms", "sr", "jr", "st", "vs", "govt", "approx",
+    "shri", "smt", "ltd", "e.g", "i.e", "sq", "km", "ft",
+}
+_LAST_WORD_RE = re.compile(r"([^\s(\"']+)\.$")
+
+
+def _is_boundary(text, end):
+    # end: index just past the terminator
+    if text[end - 1] != ".":
+        return True
+    m = _LAST_WORD_RE.search(text[:end])
+    if not m:
+        return True
+    word = m.group(1).lower()
+    return not (word.isdigit() or (len(word) == 1 and word.isalpha()) or word in _ABBREVIATIONS)
+
+
+def split_complete(text):
+    # -> (finished sentences, unfinished rest)
+    out, start = [], 0
+    for m in SENTENCE_END_RE.finditer(text):
+        if _is_boundary(text, m.start()):
+            out.append(text[start:m.start()])
+            start = m.end()
+    return out, text[start:]
+
+
+def split_sentences(text, min_chars=None):
+    # Whole-text version of what SentenceStream emits; a short last piece joins the previous one.
+    min_chars = MIN_SENTENCE_CHARS if min_chars is None else min_chars
+    complete, rest = split_complete(" ".join((text or "").split()))
+    out, pending = [], ""
+    for piece in complete + [rest]:
+        pending = f"{pending} {piece}".strip()
+        if len(pending) >= min_chars:
+            out.append(pending)
+            pending = ""
+    if pending:
+        if out:
+            out[-1] = f"{out[-1]} {pending}"
+        else:
+            out.append(pending)
+    return out
+
+
+class ToolCallAssembler:
+
+    def __init__(self):
+        self._calls = {}     # index -> {"id", "name", "arguments"}
+        self._ready = set()  # indexes already handed out
+
+    def add(self, deltas):
+        # Feeds delta.tool_calls of one chunk; returns calls that just became complete.
+        out = []
+        for d in deltas or []:
+            call = self._calls.setdefault(d.index, {"id": None, "name": "", "arguments": ""})
+            if d.id:
+                call["id"] = d.id
+            fn = getattr(d, "function", None)
+            if fn is not None:
+                call["name"] += fn.name or ""
+                call["arguments"] += fn.arguments or ""
+            # A new index means every earlier call is finished.
+            out.extend(self._take(i) for i in sorted(self._calls) if i < d.index and i not in self._ready)
+        out.extend(self._take(i) for i in sorted(self._calls) if i not in self._ready and self._parsable(i))
+        return out
+
+    def finish(self):
+        # Stream ended: whatever is left is complete.
+        return [self._take(i) for i in sorted(self._calls) if i not in self._ready]
+
+    def _parsable(self, index):
+        call = self._calls[index]
+        if not (call["id"] and call["name"] and call["arguments"].rstrip().endswith("}")):
+            return False
+        try:
+            return isinstance(json.loads(call["arguments"]), dict)
+        except ValueError:
+            return False
+
+    def _take(self, index):
+        self._ready.add(index)
+        return self._message_call(self._calls[index])
+
+    @staticmethod
+    def _message_call(c):
+        return {"id": c["id"], "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}}
+
+    def calls(self):
+        # Tool calls in the assistant-message format, in index order.
+        return [self._message_call(c) for _, c in sorted(self._calls.items())]
+
+
+class SentenceStream:
+    # Producer: feed() text deltas, finish() at the end (idempotent), or emit_all() for an
+    # answer that was not streamed. Consumer: `async for sentence in stream`.
+    # Emits exactly what split_sentences() returns for the whole text. A finished sentence is
+    # therefore held back until at least min_chars of text follow it, because a shorter
+    # tail would still be joined to it.
+
+    def __init__(self, min_chars=None):
+        self.min_chars = MIN_SENTENCE_CHARS if min_chars is None else min_chars
+        self._queue = asyncio.Queue()
+        self._buffer = ""
+        self._pending = ""  # finished but too short, waits for the next sentence
+        self._held = ""     # long enough, waits until it cannot get a short tail any more
+        self.started = False
+        self.closed = False
+
+    def feed(self, text):
+        if self.closed or not text:
+            return
+        self.started = True
+        self._buffer += text
+        complete, self._buffer = split_complete(self._buffer)
+        for sentence in complete:
+            self._pending = " ".join(f"{self._pending} {sentence}".split())
+            if len(self._pending) >= self.min_chars:
+                self._release()
+                self._held = self._pending
+                self._pending = ""
+        if len(self._tail()) >= self.min_chars:
+            self._release()
+
+    def finish(self):
+        if self.closed:
+            return
+        tail = self._tail()
+        if tail and len(tail) < self.min_chars and self._held:
+            self._held = f"{self._held} {tail}"
+            tail = ""
+        self._release()
+        self._put(tail)
+        self._pending = ""
+        self._buffer = ""
+        self.closed = True
+        self._queue.put_nowait(None)
+
+    def emit_all(self, text):
+        if not self.started:
+            self.feed(text)
+        self.finish()
+
+    def _tail(self):
+        # Text after the held sentence, as split_sentences() would join it.
+        return " ".join(f"{self._pending} {self._buffer}".split())
+
+    def _release(self):
+        if self._held:
+            self._put(self._held)
+            self._held = ""
+
+    def _put(self, sentence):
+        sentence = " ".join(sentence.split())
+        if sentence:
+            self._queue.put_nowait(sentence)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        sentence = await self._queue.get()
+        if sentence is None:
+            raise StopAsyncIteration
+        return sentence
@@ -0,0 +1,314 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock, one runner per store is up to the deployment
+    fcntl = None
+
+# Background upkeep for the conversation_memory collection, which otherwise only grows.
+# Each run, in order:
+#   1. stamps entries written before the `ts` metadata existed, so they can age out
+#   2. deletes turns older than MEMORY_TTL_DAYS (summaries: MEMORY_SUMMARY_TTL_DAYS)
+#   3. rolls turns older than MEMORY_SUMMARIZE_AFTER_DAYS up into one summary per day
+#   4. merges near-duplicates among entries added since the last run: the newest text is
+#      kept (the texts are near-identical) and the older entries' metadata folded into it
+#      (merged count, first_ts, keys it lacks) before they are deleted
+#   5. caps the collection at MEMORY_MAX_ENTRIES, dropping the oldest turns first
+# and records collection size, on-disk size and query latency before and after.
+#
+# The loop is not started on import: the server starts it (MEMORY_MAINTENANCE_ENABLED=1),
+# and a lock file makes sure only one process per store runs it. Or run it from cron:
+#   python memory_maintenance.py
+
+_DAY_S = 86400.0
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, str(default)))
+
+
+def _dir_bytes(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+class MemoryMaintenance:
+
+    def __init__(self, collection, embed_fn=None, summarize_fn=None, db_path=None):
+        # embed_fn(texts) -> vectors, used for summary entries; summarize_fn(documents) -> str.
+        # Without summarize_fn step 3 is skipped.
+        self.collection = collection
+        self.embed_fn = embed_fn
+        self.summarize_fn = summarize_fn
+        self.db_path = db_path
+        self.ttl_s = _env_float("MEMORY_TTL_DAYS", 90) * _DAY_S
+        self.summary_ttl_s = _env_float("MEMORY_SUMMARY_TTL_DAYS", 365) * _DAY_S
+        self.summarize_after_s = _env_float("MEMORY_SUMMARIZE_AFTER_DAYS", 7) * _DAY_S
+        self.summary_min_entries = int(os.getenv("MEMORY_SUMMARY_MIN_ENTRIES", "5"))
+        self.summary_max_groups = int(os.getenv("MEMORY_SUMMARY_MAX_GROUPS", "10"))
+        self.dedup_similarity = _env_float("MEMORY_DEDUP_SIMILARITY", 0.95)
+        self.dedup_scan_max = int(os.getenv("MEMORY_DEDUP_SCAN_MAX", "2000"))
+        self.max_entries = int(os.getenv("MEMORY_MAX_ENTRIES", "5000"))
+        self.interval_s = _env_float("MEMORY_MAINTENANCE_INTERVAL_SECONDS", 6 * 3600)
+        self.first_run_s = _env_float("MEMORY_MAINTENANCE_FIRST_RUN_SECONDS", 300)
+        self._last_dedup_ts = 0.0
+        self._run_lock = threading.Lock()
+        self._thread = None
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._runs = 0
+        self._last_report = None
+
+    # ---- helpers ----
+    def _scan(self, page=1000):
+        # [(id, metadata)] for the whole collection, read in pages.
+        out = []
+        offset = 0
+        while True:
+            res = self.collection.get(include=["metadatas"], limit=page, offset=offset)
+            ids = res.get("ids") or []
+            metas = res.get("metadatas") or [None] * len(ids)
+            out.extend((i, m or {}) for i, m in zip(ids, metas))
+            if len(ids) < page:
+                return out
+            offset += page
+
+    def _delete(self, ids):
+        for start in range(0, len(ids), 500):
+            self.collection.delete(ids=ids[start:start + 500])
+
+    def _similarity(self, distance):
+        space = (getattr(self.collection, "metadata", None) or {}).get("hnsw:space", "l2")
+        if space == "l2":
+            return 1.0 - distance / 2.0  # squared L2 of unit vectors = 2 - 2cos
+        return 1.0 - distance            # cosine / ip distances
+
+    def _probe_latency_ms(self, sample_id, repeats=5):
+        if sample_id is None:
+            return None
+        try:
+            res = self.collection.get(ids=[sample_id], include=["embeddings"])
+            vectors = res.get("embeddings")
+            if vectors is None or len(vectors) == 0:
+                return None
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                self.collection.query(query_embeddings=[list(vectors[0])], n_results=3)
+                timings.append((time.perf_counter() - started) * 1000)
+            return round(sorted(timings)[len(timings) // 2], 2)
+        except Exception as e:
+            logging.debug(f"Memory latency probe failed: {e}")
+            return None
+
+    def _measure(self, entries):
+        sample = entries[-1][0] if entries else None
+        return {
+            "entries": len(entries),
+            "disk_bytes": _dir_bytes(self.db_path) if self.db_path else None,
+            "query_ms": self._probe_latency_ms(sample),
+        }
+
+    # ---- steps ----
+    def _stamp_legacy(self, entries, now):
+        legacy = [(i, m) for i, m in entries if not isinstance(m.get("ts"), (int, float))]
+        if legacy:
+            self.collection.update(ids=[i for i, _ in legacy], metadatas=[dict(m, ts=now) for _, m in legacy])
+            for _, m in legacy:
+                m["ts"] = now
+        return len(legacy)
+
+    def _expire(self, entries, now):
+        expired = []
+        for i, m in entries:
+            ttl = self.summary_ttl_s if m.get("kind") == "summary" else self.ttl_s
+            if now - m["ts"] > ttl:
+                expired.append(i)
+        self._delete(expired)
+        return expired
+
+    def _summarize(self, entries, now):
+        if self.summarize_fn is None:
+            return 0, []
+        groups = {}
+        for i, m in entries:
+            if m.get("kind") == "summary" or now - m["ts"] <= self.summarize_after_s:
+                continue
+            day = datetime.fromtimestamp(m["ts"], tz=timezone.utc).strftime("%Y-%m-%d")
+            groups.setdefault(day, []).append((i, m))
+        made, removed = 0, []
+        for day in sorted(groups)[: self.summary_max_groups]:
+            members = groups[day]
+            if len(members) < self.summary_min_entries:
+                continue
+            ids = [i for i, _ in members]
+            docs = self.collection.get(ids=ids, include=["documents"]).get("documents") or []
+            try:
+                summary = (self.summarize_fn(docs) or "").strip()
+            except Exception as e:
+                logging.error(f"Memory summary for {day} failed: {e}")
+                continue
+            if not summary:
+                continue
+            meta = {"ts": max(m["ts"] for _, m in members), "kind": "summary", "period": day, "count": len(members)}
+            kwargs = {"ids": [f"summary-{day}-{int(now)}"], "documents": [summary], "metadatas": [meta]}
+            if self.embed_fn is not None:
+                kwargs["embeddings"] = self.embed_fn([summary])
+            self.collection.add(**kwargs)
+            self._delete(ids)
+            removed.extend(ids)
+            made += 1
+        return made, removed
+
+    def _dedup(self, entries):
+        # Only entries added since the last run are compared, each against its nearest
+        # neighbours in the whole collection (one batched query through the ANN index).
+        fresh = sorted(((m["ts"], i) for i, m in entries if m["ts"] > self._last_dedup_ts), reverse=True)
+        fresh = [i for _, i in fresh[: self.dedup_scan_max]]
+        if not fresh:
+            return []
+        ts = {i: m["ts"] for i, m in entries}
+        got = self.collection.get(ids=fresh, include=["embeddings"])
+        ids = got.get("ids") or []
+        vectors = got.get("embeddings")
+        if vectors is None or len(ids) == 0:
+            return []
+        res = self.collection.query(
+            query_embeddings=[list(v) for v in vectors],
+            n_results=min(4, len(entries)),
+            include=["distances"],
+        )
+        gone, keep_for = set(), {}
+        for qid, n_ids, n_dist in zip(ids, res["ids"], res["distances"]):
+            if qid in gone:
+                continue
+            for nid, dist in zip(n_ids, n_dist):
+                if nid == qid or nid in gone:
+                    continue
+                if self._similarity(dist) >= self.dedup_similarity and ts.get(nid, 0) <= ts.get(qid, 0):
+                    gone.add(nid)
+                    keep_for[nid] = qid
+        merged = self._merge_metadata(entries, gone, keep_for)
+        if merged:
+            self.collection.update(ids=list(merged), metadatas=list(merged.values()))
+        self._delete(list(gone))
+        self._last_dedup_ts = max(ts.values()) if ts else self._last_dedup_ts
+        return list(gone)
+
+    @staticmethod
+    def _merge_metadata(entries, gone, keep_for):
+        # -> {kept id: metadata with the dropped duplicates folded in}
+        metas = dict(entries)
+        out = {}
+        for nid in gone:
+            kid = nid
+            while kid in keep_for:  # a kept entry may itself be a duplicate of a newer one
+                kid = keep_for[kid]
+            kept = out.setdefault(kid, dict(metas.get(kid, {})))
+            old = metas.get(nid, {})
+            kept["merged"] = int(kept.get("merged", 0)) + int(old.get("merged", 0)) + 1
+            kept["first_ts"] = min(kept.get("first_ts", kept["ts"]), old.get("first_ts", old["ts"]))
+            for k, v in old.items():
+                kept.setdefault(k, v)
+        return out
+
+    def _cap(self, entries):
+        over = len(entries) - self.max_entries
+        if over <= 0:
+            return []
+        # Oldest turns go first; summaries only if turns alone are not enough.
+        order = sorted(entries, key=lambda e: (e[1].get("kind") == "summary", e[1]["ts"]))
+        victims = [i for i, _ in order[:over]]
+        self._delete(victims)
+        return victims
+
+    # ---- driver ----
+    def run_once(self):
+        with self._run_lock:
+            started = time.perf_counter()
+            now = time.time()
+            entries = self._scan()
+            before = self._measure(entries)
+            report = {"started_at": now, "before": before}
+
+            report["stamped"] = self._stamp_legacy(entries, now)
+            expired = set(self._expire(entries, now))
+            entries = [e for e in entries if e[0] not in expired]
+            report["expired"] = len(expired)
+
+            made, summarized = self._summarize(entries, now)
+            report["summaries_created"] = made
+            report["summarized"] = len(summarized)
+            if made:
+                entries = self._scan()
+
+            merged = set(self._dedup(entries))
+            entries = [e for e in entries if e[0] not in merged]
+            report["merged_duplicates"] = len(merged)
+
+            report["capped"] = len(self._cap(entries))
+
+            report["after"] = self._measure(self._scan())
+            report["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self._runs += 1
+            self._last_report = report
+            logging.info(
+                f"Memory maintenance: entries {before['entries']} -> {report['after']['entries']}, "
+                f"query {before['query_ms']}ms -> {report['after']['query_ms']}ms, "
+                f"disk {before['disk_bytes']} -> {report['after']['disk_bytes']} bytes"
+            )
+            return report
+
+    def _loop(self):
+        if self._stop.wait(self.first_run_s):
+            return
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Memory maintenance run failed: {e}")
+            if self._stop.wait(self.interval_s):
+                return
+
+    def start(self, lock_path=None):
+        # Starts the background loop unless another process holding lock_path already runs
+        # it (e.g. the other workers of the same server). Returns True if started here.
+        if self._thread is not None:
+            return True
+        if lock_path and fcntl is not None:
+            lock = open(lock_path, "a")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                logging.info(f"Memory maintenance runs in another process ({lock_path} is locked)")
+                return False
+            self._lock_file = lock  # held for the life of the process
+        self._thread = threading.Thread(target=self._loop, name="memory-maintenance", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {"running": self._thread is not None, "runs": self._runs, "interval_s": self.interval_s, "last_report": self._last_report}
+
+
+if __name__ == "__main__":
+    # One run against the app's memory store: python memory_maintenance.py
+    import json
+    from conversation_agent import MEMORY_MAINTENANCE, MEMORY_WRITER
+
+    MEMORY_WRITER.flush()
+    print(json.dumps(MEMORY_MAINTENANCE.run_once(), indent=2))
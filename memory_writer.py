@@ -0,0 +1,137 @@
+import os
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+
+
+class MemoryWriter:
+    # Write-behind queue for the Chroma memory collection.
+    # Callers enqueue and return immediately; one daemon thread drains the queue into
+    # bulk collection.add calls. IDs are random UUIDs, so concurrent writers (threads or
+    # processes) never collide and no read of the collection is needed to pick one.
+    # With embed_fn (texts -> vectors) set, entries submitted without an embedding are
+    # embedded per batch on the writer thread, in one call.
+
+    def __init__(self, collection, max_queue=None, batch_size=None, flush_interval_s=None, embed_fn=None):
+        self.collection = collection
+        self.embed_fn = embed_fn
+        self.batch_size = int(batch_size or os.getenv("MEMORY_WRITE_BATCH_SIZE", "32"))
+        self.flush_interval_s = float(flush_interval_s or os.getenv("MEMORY_WRITE_FLUSH_SECONDS", "1.0"))
+        self._queue = queue.Queue(maxsize=int(max_queue or os.getenv("MEMORY_WRITE_QUEUE_MAX", "1000")))
+        self._stop = threading.Event()
+        self._counters = {"enqueued": 0, "written": 0, "batches": 0, "dropped": 0, "failed": 0}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @staticmethod
+    def new_id():
+        return uuid.uuid4().hex
+
+    def submit(self, document, metadata=None, embedding=None):
+        item = {
+            "id": self.new_id(),
+            "document": document,
+            "metadata": dict(metadata or {}, ts=time.time()),
+            "embedding": embedding,
+        }
+        try:
+            self._queue.put(item, timeout=0.5)
+        except queue.Full:
+            with self._lock:
+                self._counters["dropped"] += 1
+            logging.warning("Memory write queue full; dropping memory entry")
+            return None
+        with self._lock:
+            self._counters["enqueued"] += 1
+        return item["id"]
+
+    def _next_batch(self):
+        try:
+            first = self._queue.get(timeout=self.flush_interval_s)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval_s
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop.is_set():
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _embed_missing(self, batch):
+        todo = [i for i in batch if i["embedding"] is None]
+        if not todo or self.embed_fn is None:
+            return
+        try:
+            for item, vec in zip(todo, self.embed_fn([i["document"] for i in todo])):
+                item["embedding"] = vec
+        except Exception as e:
+            # Leave them unset: Chroma then embeds with the collection's own function.
+            logging.error(f"Memory batch embedding failed: {e}")
+
+    def _write(self, batch):
+        self._embed_missing(batch)
+        kwargs = {
+            "ids": [i["id"] for i in batch],
+            "documents": [i["document"] for i in batch],
+            "metadatas": [i["metadata"] for i in batch],
+        }
+        # Chroma needs embeddings for all items or none.
+        if all(i["embedding"] is not None for i in batch):
+            kwargs["embeddings"] = [i["embedding"] for i in batch]
+        for attempt in (1, 2):
+            try:
+                self.collection.add(**kwargs)
+                with self._lock:
+                    self._counters["written"] += len(batch)
+                    self._counters["batches"] += 1
+                logging.debug(f"Memory writer stored {len(batch)} entries")
+                return
+            except Exception as e:
+                logging.error(f"Memory batch write failed (attempt {attempt}/2): {e}")
+        with self._lock:
+            self._counters["failed"] += len(batch)
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout=10.0):
+        # Blocks until everything enqueued so far has been written (or timeout).
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self._queue.unfinished_tasks == 0
+
+    def close(self, timeout=10.0):
+        if self._stop.is_set():
+            return
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout=max(0.1, self.flush_interval_s * 2))
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+        out["queued"] = self._queue.qsize()
+        return out
@@ -0,0 +1,162 @@
+import os
+import math
+import logging
+import threading
+
+# Prompt assembly for the planner and evaluator LLM calls.
+#  - messages always start with the static prefix in a fixed order: system prompt, persona,
+#    stage instructions. Both stages share the first two messages, so the provider's prompt
+#    cache can reuse them across stages and turns.
+#  - per-turn data (profile, goal, scheme checks, ...) follows as one compact system message,
+#    then the user message
+#  - prompt tokens are counted before the call and the per-turn sections are trimmed, lowest
+#    priority (last) first, to fit the stage budget (PROMPT_BUDGET_<STAGE>)
+#  - token usage reported by the API (prompt / cached / completion) is logged and summed per stage
+#
+# Token counts use tiktoken when it is installed; otherwise a character-based estimate.
+
+_DEFAULT_BUDGETS = {"planner": 3000, "evaluator": 6000}
+_MESSAGE_OVERHEAD = 4   # role/separator tokens per chat message
+_MIN_SECTION_TOKENS = 16
+
+
+def _load_encoder(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def _estimate_tokens(text):
+    # Roughly 4 chars per token for ASCII; Indic scripts split much finer.
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5)
+
+
+def compact_profile(profile):
+    items = [(k, v) for k, v in (profile or {}).items() if v not in (None, "", [])]
+    return "; ".join(f"{k}={v}" for k, v in items) or "(empty)"
+
+
+def compact_contradictions(contradictions):
+    return "; ".join(f"{c.get('field')}: {c.get('old')} -> {c.get('new')}" for c in contradictions) or "none"
+
+
+def compact_checks(checks, name_for=None):
+    # One line per shortlisted scheme instead of the full JSON record:
+    #   pm_kisan | PM-KISAN | not eligible | missing: state | why: ...
+    # name_for(scheme) may return an English name; otherwise the catalog name is used.
+    lines = []
+    for c in checks:
+        scheme = c.get("scheme") or {}
+        result = c.get("result") or {}
+        name = (name_for(scheme) if name_for else None) or scheme.get("name", "")
+        parts = [scheme.get("id", "?"), name]
+        if result.get("missing"):
+            parts.append("incomplete")
+            parts.append("missing: " + ", ".join(result["missing"]))
+        else:
+            parts.append("eligible" if result.get("eligible") else "not eligible")
+        if result.get("reasons"):
+            parts.append("why: " + "; ".join(result["reasons"]))
+        lines.append(" | ".join(parts))
+    return "\n".join(lines) or "none"
+
+
+class PromptBuilder:
+
+    def __init__(self, model=None, budgets=None):
+        self.model = model or os.getenv("OPENAI_MODEL", "gpt-4o")
+        self._encoder = _load_encoder(self.model)
+        self._budgets = dict(_DEFAULT_BUDGETS)
+        self._budgets.update(budgets or {})
+        self._lock = threading.Lock()
+        self._usage = {}  # stage -> counters
+
+    def budget(self, stage):
+        return int(os.getenv(f"PROMPT_BUDGET_{stage.upper()}", str(self._budgets.get(stage, 4000))))
+
+    def count(self, text):
+        text = text or ""
+        if self._encoder is not None:
+            return len(self._encoder.encode(text))
+        return _estimate_tokens(text)
+
+    def count_messages(self, messages):
+        total = 0
+        for m in messages:
+            content = m.get("content") if isinstance(m, dict) else getattr(m, "content", None)
+            total += _MESSAGE_OVERHEAD + self.count(content if isinstance(content, str) else "")
+        return total
+
+    def _truncate(self, text, max_tokens):
+        if self.count(text) <= max_tokens:
+            return text
+        if self._encoder is not None:
+            return self._encoder.decode(self._encoder.encode(text)[:max_tokens]) + " …"
+        # Shrink proportionally until the estimate fits.
+        cut = len(text)
+        while cut > 0 and _estimate_tokens(text[:cut]) > max_tokens:
+            cut = int(cut * max_tokens / _estimate_tokens(text[:cut])) - 1
+        return text[:max(cut, 0)] + " …"
+
+    def build(self, stage, static, sections, user):
+        # static: [str] fixed per deployment (system prompt, persona, stage instructions).
+        # sections: [(label, text)] per-turn context, most important first.
+        # Returns the message list; the static part is never trimmed.
+        messages = [{"role": "system", "content": s} for s in static if s]
+        user_msg = {"role": "user", "content": user}
+        remaining = self.budget(stage) - self.count_messages(messages + [user_msg]) - _MESSAGE_OVERHEAD
+
+        kept, trimmed = [], 0
+        for label, text in sections:
+            line = f"{label}: {text}"
+            cost = self.count(line) + 1
+            if cost > remaining:
+                trimmed += 1
+                if remaining < _MIN_SECTION_TOKENS:
+                    continue
+                line = self._truncate(line, remaining - 1)
+                cost = self.count(line) + 1
+            kept.append(line)
+            remaining -= cost
+        if trimmed:
+            logging.warning(f"Prompt for {stage} over its {self.budget(stage)}-token budget: {trimmed} section(s) trimmed")
+            self._add(stage, trimmed=trimmed)
+        if kept:
+            messages.append({"role": "system", "content": "\n".join(kept)})
+        messages.append(user_msg)
+        return messages
+
+    def _add(self, stage, **counts):
+        with self._lock:
+            usage = self._usage.setdefault(stage, {
+                "calls": 0, "estimated_prompt_tokens": 0, "prompt_tokens": 0,
+                "cached_tokens": 0, "completion_tokens": 0, "trimmed": 0,
+            })
+            for k, v in counts.items():
+                usage[k] += v
+
+    def record(self, stage, messages, response):
+        # Called after each chat completion with the messages that were sent.
+        estimated = self.count_messages(messages)
+        usage = getattr(response, "usage", None)
+        prompt = getattr(usage, "prompt_tokens", None) or 0
+        completion = getattr(usage, "completion_tokens", None) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or 0
+        self._add(stage, calls=1, estimated_prompt_tokens=estimated, prompt_tokens=prompt,
+                  cached_tokens=cached, completion_tokens=completion)
+        logging.info(f"LLM usage [{stage}]: prompt={prompt} (cached {cached}, estimated {estimated}), completion={completion}")
+
+    def stats(self):
+        with self._lock:
+            out = {stage: dict(u) for stage, u in self._usage.items()}
+        for u in out.values():
+            u["avg_prompt_tokens"] = round(u["prompt_tokens"] / u["calls"], 1) if u["calls"] else 0.0
+            u["cache_hit_ratio"] = round(u["cached_tokens"] / u["prompt_tokens"], 3) if u["prompt_tokens"] else 0.0
+        return {"tokenizer": "tiktoken" if self._encoder is not None else "estimate", "stages": out}
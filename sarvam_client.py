@@ -0,0 +1,239 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import weakref
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+try:
+    import httpx
+except ImportError:  # only needed for the async pipeline
+    httpx = None
+
+load_dotenv()
+
+API_KEY = os.getenv('SARVAM_API_KEY')
+BASE_URL = os.getenv('BASE_URL', 'https://api.sarvam.ai')
+
+# (connect, read) timeouts in seconds per endpoint kind; override with SARVAM_TIMEOUT_<KIND>=connect,read
+_DEFAULT_TIMEOUTS = {
+    "translate": (3.05, 20.0),
+    "stt": (3.05, 45.0),
+    "tts": (3.05, 45.0),
+    "default": (3.05, 30.0),
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+# httpx.AsyncClient is bound to the loop it was first used on, so keep one per loop.
+_async_clients = weakref.WeakKeyDictionary()
+_stats_lock = threading.Lock()
+_stats = {
+    "requests": 0,
+    "retries": 0,
+    "failures": 0,
+    "by_endpoint": {},  # kind -> {"requests", "errors", "total_ms"}
+}
+
+
+def _endpoint_kind(path):
+    if "translate" in path:
+        return "translate"
+    if "speech-to-text" in path:
+        return "stt"
+    if "text-to-speech" in path:
+        return "tts"
+    return "default"
+
+
+def _timeout_for(kind):
+    raw = os.getenv(f"SARVAM_TIMEOUT_{kind.upper()}")
+    if raw:
+        try:
+            parts = [float(p) for p in raw.split(",")]
+            return (parts[0], parts[-1])
+        except ValueError:
+            logging.warning(f"Invalid SARVAM_TIMEOUT_{kind.upper()}={raw!r}; using default")
+    return _DEFAULT_TIMEOUTS.get(kind, _DEFAULT_TIMEOUTS["default"])
+
+
+def get_session():
+    # One keep-alive session per process: every call reuses pooled TCP+TLS connections.
+    global _session
+    if _session is not None:
+        return _session
+    with _session_lock:
+        if _session is None:
+            pool_size = int(os.getenv("SARVAM_POOL_MAXSIZE", "16"))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+            s = requests.Session()
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers.update({"API-Subscription-Key": API_KEY or ""})
+            _session = s
+            logging.debug(f"Sarvam session created (pool_maxsize={pool_size})")
+    return _session
+
+
+def _backoff_delay(attempt, response=None):
+    base = float(os.getenv("SARVAM_RETRY_BACKOFF_SECONDS", "0.5"))
+    cap = float(os.getenv("SARVAM_RETRY_BACKOFF_MAX_SECONDS", "8"))
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(cap, float(retry_after))
+            except ValueError:
+                pass
+    # Full jitter: spreads retries from concurrent callers instead of synchronizing them.
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _record(kind, elapsed_ms, error=False, retried=False):
+    with _stats_lock:
+        _stats["requests"] += 1
+        if retried:
+            _stats["retries"] += 1
+        ep = _stats["by_endpoint"].setdefault(kind, {"requests": 0, "errors": 0, "total_ms": 0.0})
+        ep["requests"] += 1
+        ep["total_ms"] += elapsed_ms
+        if error:
+            ep["errors"] += 1
+
+
+def post(path, json=None, data=None, files=None, headers=None, timeout=None):
+    # POST over the shared pool, retrying 429/5xx and connection errors with jittered backoff.
+    # Returns the last response so callers keep their own status handling; raises only when
+    # every attempt failed without a response.
+    url = path if path.startswith("http") else f"{BASE_URL}{path}"
+    kind = _endpoint_kind(path)
+    if timeout is None:
+        timeout = _timeout_for(kind)
+    max_attempts = max(1, int(os.getenv("SARVAM_MAX_RETRIES", "3")) + 1)
+    session = get_session()
+
+    last_exc = None
+    for attempt in range(max_attempts):
+        started = time.perf_counter()
+        try:
+            resp = session.post(url, json=json, data=data, files=files, headers=headers, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            _record(kind, (time.perf_counter() - started) * 1000, error=True, retried=attempt > 0)
+            last_exc = e
+            if attempt + 1 < max_attempts:
+                delay = _backoff_delay(attempt)
+                logging.warning(f"Sarvam {kind} request failed ({e}); retry {attempt + 1} in {delay:.2f}s")
+                time.sleep(delay)
+            continue
+
+        _record(kind, (time.perf_counter() - started) * 1000, error=resp.status_code >= 400, retried=attempt > 0)
+        if resp.status_code in RETRY_STATUSES and attempt + 1 < max_attempts:
+            delay = _backoff_delay(attempt, resp)
+            logging.warning(f"Sarvam {kind} returned {resp.status_code}; retry {attempt + 1} in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+        return resp
+
+    with _stats_lock:
+        _stats["failures"] += 1
+    raise last_exc
+
+
+def get_async_client():
+    if httpx is None:
+        raise RuntimeError("httpx is not installed. Install it to use the async pipeline: pip install httpx")
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        pool_size = int(os.getenv("SARVAM_POOL_MAXSIZE", "16"))
+        client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            headers={"API-Subscription-Key": API_KEY or ""},
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+        _async_clients[loop] = client
+        logging.debug(f"Sarvam async client created (max_connections={pool_size})")
+    return client
+
+
+async def apost(path, json=None, data=None, files=None, headers=None, timeout=None):
+    # Async twin of post(): same timeouts, retry policy and stats, on a pooled httpx client.
+    kind = _endpoint_kind(path)
+    if timeout is None:
+        timeout = _timeout_for(kind)
+    connect_s, read_s = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    max_attempts = max(1, int(os.getenv("SARVAM_MAX_RETRIES", "3")) + 1)
+    client = get_async_client()
+
+    last_exc = None
+    for attempt in range(max_attempts):
+        started = time.perf_counter()
+        try:
+            resp = await client.post(
+                path, json=json, data=data, files=files, headers=headers,
+                timeout=httpx.Timeout(read_s, connect=connect_s),
+            )
+        except (httpx.TransportError, httpx.TimeoutException) as e:
+            _record(kind, (time.perf_counter() - started) * 1000, error=True, retried=attempt > 0)
+            last_exc = e
+            if attempt + 1 < max_attempts:
+                delay = _backoff_delay(attempt)
+                logging.warning(f"Sarvam {kind} request failed ({e}); retry {attempt + 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            continue
+
+        _record(kind, (time.perf_counter() - started) * 1000, error=resp.status_code >= 400, retried=attempt > 0)
+        if resp.status_code in RETRY_STATUSES and attempt + 1 < max_attempts:
+            delay = _backoff_delay(attempt, resp)
+            logging.warning(f"Sarvam {kind} returned {resp.status_code}; retry {attempt + 1} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            continue
+        return resp
+
+    with _stats_lock:
+        _stats["failures"] += 1
+    raise last_exc
+
+
+def pool_stats():
+    with _stats_lock:
+        out = {
+            "requests": _stats["requests"],
+            "retries": _stats["retries"],
+            "failures": _stats["failures"],
+            "by_endpoint": {
+                k: {
+                    "requests": v["requests"],
+                    "errors": v["errors"],
+                    "avg_ms": round(v["total_ms"] / v["requests"], 1) if v["requests"] else 0.0,
+                }
+                for k, v in _stats["by_endpoint"].items()
+            },
+        }
+    pools = []
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            manager = getattr(adapter, "poolmanager", None)
+            if manager is None:
+                continue
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is None:
+                    continue
+                pools.append({
+                    "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                    "connections_opened": pool.num_connections,
+                    "requests": pool.num_requests,
+                    "free_slots": pool.pool.qsize() if pool.pool is not None else 0,
+                    "maxsize": pool.pool.maxsize if pool.pool is not None else 0,
+                })
+    out["pools"] = pools
+    out["async_clients"] = len(_async_clients)
+    return out
@@ -1,12 +1,12 @@
-import requests
 import json
 import os
 from dotenv import load_dotenv
 
+import sarvam_client
+
 load_dotenv()
 
-API_KEY = os.getenv('SARVAM_API_KEY')
-BASE_URL = os.getenv('BASE_URL', 'https://api.sarvam.ai')
+# SARVAM_API_KEY / BASE_URL are read by sarvam_client, which makes every request.
 TTS_MODEL = os.getenv('TTS_MODEL', 'bulbul:v2')
 STT_MODEL = os.getenv('STT_MODEL', 'saarika:v2.5')
 TRANSLATE_MODEL = os.getenv('TRANSLATE_MODEL', 'sarvam-translate:v1')
@@ -14,15 +14,10 @@ DEFAULT_SPEAKER = os.getenv('DEFAULT_SPEAKER', 'Anushka')
 RECORD_DURATION = int(os.getenv('RECORD_DURATION', '5'))
 
 def detect_language(text):
-    url = f'{BASE_URL}/text/identify-language'
-    headers = {
-        'API-Subscription-Key': API_KEY,
-        'Content-Type': 'application/json'
-    }
     data = {
         'input': text
     }
-    response = requests.post(url, headers=headers, json=data)
+    response = sarvam_client.post('/text/identify-language', json=data)
     if response.status_code == 200:
         result = response.json()
         return result.get('language_code'), result.get('script_code')
@@ -34,18 +29,13 @@ def generate_tts(text, language, speaker=None, model=None):
         speaker = DEFAULT_SPEAKER
     if model is None:
         model = TTS_MODEL
-    url = f'{BASE_URL}/text-to-speech/convert'
-    headers = {
-        'API-Subscription-Key': API_KEY,
-        'Content-Type': 'application/json'
-    }
     data = {
         'language': language,
         'inputs': [text],
         'speaker': speaker,
         'model': model
     }
-    response = requests.post(url, headers=headers, json=data)
+    response = sarvam_client.post('/text-to-speech/convert', json=data)
     if response.status_code == 200:
         result = response.json()
         return result
@@ -55,18 +45,13 @@ def generate_tts(text, language, speaker=None, model=None):
 def translate_text(text, source_lang='auto', target_lang='en-IN', model=None):
     if model is None:
         model = TRANSLATE_MODEL
-    url = f'{BASE_URL}/text/translate'
-    headers = {
-        'API-Subscription-Key': API_KEY,
-        'Content-Type': 'application/json'
-    }
     data = {
         'input': text,
         'source_language_code': source_lang,
         'target_language_code': target_lang,
         'model': model
     }
-    response = requests.post(url, headers=headers, json=data)
+    response = sarvam_client.post('/text/translate', json=data)
     if response.status_code == 200:
         result = response.json()
         return result.get('translated_text')
@@ -77,10 +62,6 @@ def transcribe_audio(audio_data, language_code='unknown', model=None):
     if model is None:
         model = STT_MODEL
     # audio_data is bytes of wav
-    url = f'{BASE_URL}/speech-to-text'
-    headers = {
-        'API-Subscription-Key': API_KEY
-    }
     files = {
         'file': ('audio.wav', audio_data, 'audio/wav')
     }
@@ -88,7 +69,7 @@ def transcribe_audio(audio_data, language_code='unknown', model=None):
         'language_code': language_code,
         'model': model
     }
-    response = requests.post(url, headers=headers, files=files, data=data)
+    response = sarvam_client.post('/speech-to-text', files=files, data=data)
     if response.status_code == 200:
         result = response.json()
         return result.get('transcript'), result.get('language_code')
@@ -0,0 +1,318 @@
+import os
+import re
+import json
+import math
+import time
+import heapq
+import bisect
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import Counter
+
+# Scheme catalog with a ranked full-text index over name, description and tags.
+#  - text is Unicode-normalized for Indic scripts before tokenizing, so spelling variants
+#    (nukta, chandrabindu, ZWJ/ZWNJ, Devanagari digits) hit the same terms
+#  - postings are built once; queries are scored with BM25 and the top k taken with a heap
+#  - when data/schemes.json changes on disk, only added/changed/removed schemes are
+#    re-indexed
+#  - English versions of the fields produced offline by build_catalog_index.py
+#    (data/schemes.en.json) are indexed too, so English queries match without a runtime
+#    translation. An English entry whose source_hash no longer matches the scheme text is
+#    stale and ignored until the index is rebuilt.
+
+# Field weights: a query word in the scheme name or tags counts more than in the description.
+_FIELD_WEIGHTS = (("name", 2), ("tags", 2), ("description", 1))
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+# Query words missing from the vocabulary are matched against indexed words sharing their
+# first few characters (Marathi/Hindi inflect by suffix: शेतकरी / शेतकऱ्यांना), at a discount.
+_PREFIX_LEN = 4
+_PREFIX_WEIGHT = 0.5
+
+# \w alone would split words at vowel signs (combining marks), so add the Indic blocks.
+_TOKEN_RE = re.compile(r"[\w\u0900-\u0DFF]+")
+_DEVANAGARI_DIGITS = {ord("०") + i: str(i) for i in range(10)}
+_CHAR_MAP = {
+    0x093C: None,        # nukta: क़ -> क
+    0x0901: 0x0902,      # chandrabindu -> anusvara
+    0x200C: None,        # ZWNJ
+    0x200D: None,        # ZWJ
+    0x0964: " ",         # danda
+    0x0965: " ",         # double danda
+    **_DEVANAGARI_DIGITS,
+}
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFC", str(text or ""))
+    # NFD splits precomposed nukta letters (e.g. U+0958) so the nukta can be dropped.
+    text = unicodedata.normalize("NFD", text).translate(_CHAR_MAP)
+    return unicodedata.normalize("NFC", text).lower()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+def _doc_terms(versions):
+    # versions: the scheme itself plus its English normalizations (same field names).
+    counts = Counter()
+    for version in versions:
+        for field, weight in _FIELD_WEIGHTS:
+            value = version.get(field, "")
+            if isinstance(value, list):
+                value = " ".join(str(v) for v in value)
+            for token in tokenize(value):
+                counts[token] += weight
+    return counts
+
+
+def _fingerprint(obj):
+    raw = json.dumps(obj, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def searchable_fields(scheme):
+    return {"name": scheme.get("name", ""), "description": scheme.get("description", ""), "tags": list(scheme.get("tags", []))}
+
+
+def source_versions(scheme, default_language):
+    # {language_code: fields} for every language a scheme is written in: its own fields
+    # (in scheme["language"] or the catalog's language_hint) plus scheme["translations"].
+    versions = {scheme.get("language") or default_language: searchable_fields(scheme)}
+    translations = scheme.get("translations")
+    if isinstance(translations, dict):
+        for lang, fields in translations.items():
+            if isinstance(fields, dict):
+                versions[lang] = searchable_fields(fields)
+    return versions
+
+
+def source_hash(fields, language):
+    # Identifies the source text an English normalization was built from.
+    return _fingerprint([language, fields])[:16]
+
+
+def default_english_path(path):
+    return os.path.splitext(path)[0] + ".en.json"
+
+
+class SchemeCatalog:
+
+    def __init__(self, path, check_interval_s=None, english_path=None):
+        self.path = path
+        self.english_path = english_path or default_english_path(path)
+        self.check_interval_s = float(
+            check_interval_s if check_interval_s is not None else os.getenv("SCHEME_CATALOG_CHECK_SECONDS", "5")
+        )
+        self._lock = threading.RLock()
+        self._schemes = {}       # id -> scheme dict, in file order
+        self._fingerprints = {}  # id -> content hash
+        self._doc_terms = {}     # id -> Counter(term -> weighted tf)
+        self._doc_len = {}       # id -> weighted length
+        self._postings = {}      # term -> {id: weighted tf}
+        self._vocab = []         # sorted terms, for prefix lookups
+        self._total_len = 0
+        self._mtime = None
+        self._english_doc = {}   # id -> {language: English fields + source_hash}, as built
+        self._english = {}       # id -> [English fields, one per source language], fresh only
+        self._english_gaps = set()  # ids with a source language lacking a fresh English entry
+        self._english_stale = 0
+        self._last_check = 0.0
+        self.version = 0         # bumped whenever the set of schemes or their content changes
+        self._counters = {"loads": 0, "reindexed_docs": 0, "searches": 0}
+        self.refresh(force=True)
+
+    # ---- loading ----
+    def refresh(self, force=False):
+        # Re-reads the files if their mtimes changed. Returns True when the index was updated.
+        now = time.time()
+        if not force and now - self._last_check < self.check_interval_s:
+            return False
+        with self._lock:
+            self._last_check = now
+            mtime = (self._file_mtime(self.path), self._file_mtime(self.english_path))
+            if not force and mtime == self._mtime:
+                return False
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    doc = json.load(f)
+            except Exception as e:
+                logging.error(f"Failed to load scheme catalog {self.path}: {e}")
+                return False
+            schemes = doc.get("schemes", []) if isinstance(doc, dict) else []
+            default_language = (doc.get("language_hint") if isinstance(doc, dict) else None) or "mr-IN"
+            self._english_doc = self._load_english()
+            self._apply(schemes, default_language)
+            self._mtime = mtime
+            self._counters["loads"] += 1
+            return True
+
+    @staticmethod
+    def _file_mtime(path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    def _load_english(self):
+        if not os.path.exists(self.english_path):
+            return {}
+        try:
+            with open(self.english_path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except Exception as e:
+            logging.error(f"Failed to load English catalog {self.english_path}: {e}; indexing source text only")
+            return {}
+        return {sid: by_lang for sid, by_lang in (doc.get("schemes") or {}).items() if isinstance(by_lang, dict)}
+
+    def _fresh_english(self, sid, scheme, default_language):
+        # -> (English fields built from the current source text, all languages covered?)
+        built = self._english_doc.get(sid, {})
+        fresh, complete = [], True
+        for lang, fields in sorted(source_versions(scheme, default_language).items()):
+            entry = built.get(lang)
+            if not isinstance(entry, dict):
+                complete = False
+            elif entry.get("source_hash") != source_hash(fields, lang):
+                self._english_stale += 1
+                complete = False
+            else:
+                fresh.append(searchable_fields(entry))
+        return fresh, complete
+
+    def _apply(self, schemes, default_language="mr-IN"):
+        incoming = {}
+        for s in schemes:
+            if isinstance(s, dict) and s.get("id"):
+                incoming[s["id"]] = s
+        self._english, self._english_gaps, self._english_stale = {}, set(), 0
+        for sid, scheme in incoming.items():
+            fresh, complete = self._fresh_english(sid, scheme, default_language)
+            if fresh:
+                self._english[sid] = fresh
+            if not complete:
+                self._english_gaps.add(sid)
+        if self._english_stale:
+            logging.warning(f"{self._english_stale} English catalog entries are stale (source text changed); run build_catalog_index.py")
+        changed = 0
+        for sid in list(self._schemes):
+            if sid not in incoming:
+                self._unindex(sid)
+                changed += 1
+        for sid, scheme in incoming.items():
+            english = self._english.get(sid, [])
+            fp = _fingerprint([scheme, english])
+            if self._fingerprints.get(sid) == fp:
+                continue
+            if sid in self._fingerprints:
+                self._unindex(sid)
+            self._index(sid, [scheme] + english, fp)
+            changed += 1
+        # Keep file order for unranked listings.
+        self._schemes = {sid: incoming[sid] for sid in incoming}
+        if changed:
+            self._vocab = sorted(self._postings)
+            self.version += 1
+        self._counters["reindexed_docs"] += changed
+        logging.debug(f"Scheme catalog: {len(self._schemes)} schemes, {changed} re-indexed, {len(self._vocab)} terms")
+
+    def _index(self, sid, versions, fp):
+        terms = _doc_terms(versions)
+        self._fingerprints[sid] = fp
+        self._doc_terms[sid] = terms
+        length = sum(terms.values())
+        self._doc_len[sid] = length
+        self._total_len += length
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[sid] = tf
+
+    def _unindex(self, sid):
+        for term in self._doc_terms.pop(sid, {}):
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(sid, None)
+                if not posting:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(sid, 0)
+        self._fingerprints.pop(sid, None)
+
+    # ---- lookups ----
+    def schemes(self):
+        self.refresh()
+        with self._lock:
+            return list(self._schemes.values())
+
+    def snapshot(self):
+        # (version, schemes) read together, for consumers that cache derived data.
+        self.refresh()
+        with self._lock:
+            return self.version, list(self._schemes.values())
+
+    def english_ready(self):
+        # True when every scheme has an up-to-date English version of each of its languages
+        # indexed, i.e. English queries can be matched directly.
+        self.refresh()
+        with self._lock:
+            return bool(self._schemes) and not self._english_gaps
+
+    def get(self, scheme_id):
+        self.refresh()
+        with self._lock:
+            return self._schemes.get(scheme_id)
+
+    def english_name(self, scheme_id):
+        # English name from the offline build, or None if the scheme has none.
+        with self._lock:
+            for fields in self._english.get(scheme_id, []):
+                if fields.get("name"):
+                    return fields["name"]
+        return None
+
+    def _expand(self, term):
+        # [(indexed_term, weight)] for one query term.
+        if term in self._postings:
+            return [(term, 1.0)]
+        if len(term) < _PREFIX_LEN:
+            return []
+        prefix = term[:_PREFIX_LEN]
+        out = []
+        i = bisect.bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            out.append((self._vocab[i], _PREFIX_WEIGHT))
+            i += 1
+        return out
+
+    def search(self, query, max_results=5):
+        self.refresh()
+        k = int(max_results) if max_results else 5
+        terms = tokenize(query)
+        with self._lock:
+            self._counters["searches"] += 1
+            if not terms:
+                return list(self._schemes.values())[:k]
+            n_docs = len(self._schemes)
+            avg_len = (self._total_len / n_docs) if n_docs else 0.0
+            scores = {}
+            for term in dict.fromkeys(terms):
+                for indexed, weight in self._expand(term):
+                    posting = self._postings[indexed]
+                    idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                    for sid, tf in posting.items():
+                        norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * self._doc_len[sid] / avg_len)
+                        scores[sid] = scores.get(sid, 0.0) + weight * idf * tf * (_BM25_K1 + 1) / (tf + norm)
+            order = {sid: i for i, sid in enumerate(self._schemes)}
+            top = heapq.nsmallest(k, scores.items(), key=lambda kv: (-kv[1], order[kv[0]]))
+            return [self._schemes[sid] for sid, _ in top]
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+            out["schemes"] = len(self._schemes)
+            out["terms"] = len(self._postings)
+            out["version"] = self.version
+            out["english_coverage"] = sum(1 for sid in self._schemes if self._english.get(sid))
+            out["english_stale"] = self._english_stale
+        return out
@@ -0,0 +1,185 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# HTTP side of the agent's web search: rate limiting, coalescing of identical in-flight
+# searches, and optional hedged requests across several search_service.py instances.
+
+_session = None
+_session_lock = threading.Lock()
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search-hedge")
+_stats_lock = threading.Lock()
+_stats = {
+    "requests": 0,
+    "hedges_sent": 0,
+    "hedge_wins": 0,
+    "failovers": 0,
+    "coalesced": 0,
+    "throttled": 0,
+    "throttle_wait_ms": 0.0,
+}
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+class TokenBucket:
+    # Allows `burst` requests at once, refilling at `rate` per second. acquire() reserves a
+    # token under the lock and sleeps outside it, so waiting callers never block cache hits
+    # or other threads that only need to look at shared state.
+
+    def __init__(self, rate, burst=1):
+        self.rate = max(1e-6, float(rate))
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait_s=None):
+        # Returns seconds waited, or None (without consuming a token) if the wait would exceed max_wait_s.
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait_s = max(0.0, (1.0 - self._tokens) / self.rate)
+            if max_wait_s is not None and wait_s > max_wait_s:
+                return None
+            self._tokens -= 1.0  # may go negative: that is the reservation for this caller
+        if wait_s > 0:
+            _count("throttled")
+            _count("throttle_wait_ms", wait_s * 1000)
+            time.sleep(wait_s)
+        return wait_s
+
+
+class SingleFlight:
+    # Concurrent calls with the same key share one execution of fn and get its result (or exception).
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> [threading.Event, result, exception]
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = [threading.Event(), None, None]
+                self._calls[key] = call
+        if not leader:
+            _count("coalesced")
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+        try:
+            call[1] = fn()
+            return call[1]
+        except Exception as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call[0].set()
+
+
+def get_session():
+    global _session
+    if _session is not None:
+        return _session
+    with _session_lock:
+        if _session is None:
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+            s = requests.Session()
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+    return _session
+
+
+def service_urls():
+    # SEARCH_SERVICE_URLS is a comma-separated list of /search endpoints; the first one is
+    # the primary. Falls back to the single SEARCH_SERVICE_URL.
+    raw = os.getenv("SEARCH_SERVICE_URLS", "")
+    urls = [u.strip() for u in raw.split(",") if u.strip()]
+    return urls or [os.getenv("SEARCH_SERVICE_URL", "http://127.0.0.1:5001/search")]
+
+
+def batch_urls():
+    override = os.getenv("SEARCH_SERVICE_BATCH_URL")
+    if override:
+        return [override]
+    return [u.rstrip("/") + "/batch" for u in service_urls()]
+
+
+def _usable(resp):
+    # A response worth returning instead of waiting for another backend.
+    return resp.status_code < 500 and resp.status_code != 429
+
+
+def call(method, urls, hedge=False, timeout=25.0, **kwargs):
+    # Sends one logical request. Without hedging, backends are tried in order and only a
+    # connection error moves on to the next. With hedging, the next backend is also asked
+    # whenever the current ones have not answered within WEB_SEARCH_HEDGE_DELAY_MS, and the
+    # first usable answer wins (slower duplicates finish in the background and are ignored).
+    _count("requests")
+    session = get_session()
+
+    def _send(url):
+        return session.request(method, url, timeout=timeout, **kwargs)
+
+    if not hedge or len(urls) < 2:
+        last_exc = None
+        for i, url in enumerate(urls):
+            try:
+                return _send(url)
+            except requests.exceptions.ConnectionError as e:
+                last_exc = e
+                if i + 1 < len(urls):
+                    _count("failovers")
+                    logging.warning(f"Search backend {url} unreachable; trying next")
+        raise last_exc
+
+    delay_s = float(os.getenv("WEB_SEARCH_HEDGE_DELAY_MS", "400")) / 1000.0
+    pending = {_HEDGE_POOL.submit(_send, urls[0]): 0}
+    next_idx = 1
+    last_resp, last_exc = None, None
+    while pending:
+        timeout_s = delay_s if next_idx < len(urls) else None
+        done, _ = wait(list(pending), timeout=timeout_s, return_when=FIRST_COMPLETED)
+        for fut in done:
+            idx = pending.pop(fut)
+            try:
+                resp = fut.result()
+            except Exception as e:
+                last_exc = e
+                continue
+            if _usable(resp):
+                if idx > 0:
+                    _count("hedge_wins")
+                return resp
+            last_resp = resp
+        # Nothing usable yet (slow or failed): bring in the next backend.
+        if next_idx < len(urls) and (not done or not pending):
+            _count("hedges_sent")
+            pending[_HEDGE_POOL.submit(_send, urls[next_idx])] = next_idx
+            next_idx += 1
+    if last_resp is not None:
+        return last_resp
+    raise last_exc
+
+
+def stats():
+    with _stats_lock:
+        out = dict(_stats)
+    out["throttle_wait_ms"] = round(out["throttle_wait_ms"], 1)
+    out["backends"] = service_urls()
+    return out
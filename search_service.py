@@ -1,86 +1,331 @@
 import os
 import time
+import atexit
+import asyncio
 import logging
+import threading
+import concurrent.futures
 from urllib.parse import quote
 
 from flask import Flask, request, jsonify
 
+import kv_cache
+
 try:
-    from playwright.sync_api import sync_playwright
+    from playwright.async_api import async_playwright
 except Exception:
-    sync_playwright = None
+    async_playwright = None
 
 logging.basicConfig(level=logging.DEBUG)
 
 app = Flask(__name__)
 
-_CACHE = {}
+_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
 
 
-def _bing_search(query: str, max_results: int = 5, timeout_ms: int = 20000):
-    if not sync_playwright:
-        raise RuntimeError("playwright is not installed. Install it and run: python -m playwright install chromium")
+class _PooledPage:
+    def __init__(self, context, page, generation):
+        self.context = context
+        self.page = page
+        self.generation = generation
+        self.uses = 0
+        self.crashed = False
+        page.on("crash", lambda _: setattr(self, "crashed", True))
+
+
+class BrowserPool:
+    # One long-lived headless Chromium with a pool of reusable context+page pairs.
+    # Playwright's sync API is bound to the thread that started it, but Flask serves
+    # requests from many threads, so the browser lives on its own asyncio loop thread and
+    # request threads submit work to it with run().
+    #  - at most max_pages searches run at once; extra callers wait for a free page
+    #  - a page is recycled (context closed, new one opened) after max_uses searches,
+    #    after a crash, or after any error while it was in use
+    #  - if the browser process dies it is relaunched on the next search
+
+    def __init__(self, max_pages=None, max_uses=None):
+        self.max_pages = max(1, int(max_pages or os.getenv("SEARCH_BROWSER_PAGES", "4")))
+        self.max_uses = max(1, int(max_uses or os.getenv("SEARCH_PAGE_MAX_USES", "50")))
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._playwright = None
+        self._browser = None
+        self._generation = 0
+        self._idle = []
+        self._slots = None
+        self._launch_lock = None
+        self._in_use = 0
+        self._counters = {
+            "searches": 0, "failures": 0, "browser_launches": 0, "browser_crashes": 0,
+            "pages_created": 0, "pages_recycled": 0, "wait_ms_total": 0.0, "busy_ms_total": 0.0,
+        }
+
+    def _ensure_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="search-browser", daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def run(self, fn, timeout_s):
+        # fn(page) is a coroutine function; runs on a pooled page and returns its result.
+        if not async_playwright:
+            raise RuntimeError("playwright is not installed. Install it and run: python -m playwright install chromium")
+        future = asyncio.run_coroutine_threadsafe(self._with_page(fn), self._ensure_loop())
+        try:
+            return future.result(timeout=timeout_s)
+        except concurrent.futures.TimeoutError:
+            future.cancel()  # frees the page; _with_page recycles it as failed
+            raise
+
+    async def _ensure_browser(self):
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            if self._browser is not None:
+                self._counters["browser_crashes"] += 1
+                logging.warning("Search browser disconnected; relaunching")
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            self._generation += 1
+            self._idle = []  # pages of the old browser are gone with it
+            self._counters["browser_launches"] += 1
+            logging.info(f"Search browser launched (generation {self._generation})")
+
+    async def _acquire(self):
+        await self._ensure_browser()
+        while self._idle:
+            slot = self._idle.pop()
+            if slot.generation == self._generation and not slot.crashed and not slot.page.is_closed():
+                return slot
+        context = await self._browser.new_context(user_agent=_USER_AGENT, locale="en-US")
+        page = await context.new_page()
+        self._counters["pages_created"] += 1
+        return _PooledPage(context, page, self._generation)
+
+    async def _release(self, slot, failed):
+        slot.uses += 1
+        healthy = not failed and not slot.crashed and not slot.page.is_closed() and slot.generation == self._generation
+        if healthy and slot.uses < self.max_uses:
+            self._idle.append(slot)
+            return
+        self._counters["pages_recycled"] += 1
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+
+    async def _with_page(self, fn):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pages)
+            self._launch_lock = asyncio.Lock()
+        queued = time.perf_counter()
+        async with self._slots:
+            started = time.perf_counter()
+            self._counters["wait_ms_total"] += (started - queued) * 1000
+            self._in_use += 1
+            slot = None
+            failed = True
+            try:
+                slot = await self._acquire()
+                result = await fn(slot.page)
+                failed = False
+                return result
+            finally:
+                self._in_use -= 1
+                self._counters["searches"] += 1
+                self._counters["busy_ms_total"] += (time.perf_counter() - started) * 1000
+                if failed:
+                    self._counters["failures"] += 1
+                if slot is not None:
+                    await self._release(slot, failed)
+
+    async def _shutdown(self):
+        for slot in self._idle:
+            try:
+                await slot.context.close()
+            except Exception:
+                pass
+        self._idle = []
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+        if self._playwright is not None:
+            await self._playwright.stop()
 
+    def close(self):
+        if self._loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=10)
+        except Exception as e:
+            logging.error(f"Search browser shutdown failed: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def stats(self):
+        out = dict(self._counters)
+        searches = out.pop("searches")
+        out["searches"] = searches
+        out["avg_wait_ms"] = round(out.pop("wait_ms_total") / searches, 1) if searches else 0.0
+        out["avg_busy_ms"] = round(out.pop("busy_ms_total") / searches, 1) if searches else 0.0
+        out["browser_connected"] = bool(self._browser is not None and self._browser.is_connected())
+        out["pages_in_use"] = self._in_use
+        out["pages_idle"] = len(self._idle)
+        out["max_pages"] = self.max_pages
+        out["max_uses_per_page"] = self.max_uses
+        return out
+
+
+BROWSER_POOL = BrowserPool()
+atexit.register(BROWSER_POOL.close)
+
+
+async def _bing_search_page(page, url, max_results, timeout_ms):
+    page.set_default_timeout(timeout_ms)
+    await page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+    # Bing can trigger internal redirects / additional navigation; avoid strict "visible" waits.
+    await page.wait_for_timeout(750)
+    try:
+        await page.wait_for_selector("#b_results li.b_algo", state="attached", timeout=timeout_ms)
+    except Exception:
+        # Fallback: element may exist but Playwright can still time out while waiting for navigation.
+        items_probe = await page.query_selector_all("#b_results li.b_algo") or await page.query_selector_all("li.b_algo")
+        if not items_probe:
+            html = await page.content()
+            lowered = html.lower()
+            if "unusual traffic" in lowered or "verify you are a human" in lowered or "form=" in lowered and "captcha" in lowered:
+                raise RuntimeError("Bing blocked automated browsing (bot-check/captcha). Try again later or switch to another provider.")
+            raise
+
+    results = []
+    items = await page.query_selector_all("#b_results li.b_algo")
+    if not items:
+        items = await page.query_selector_all("li.b_algo")
+    for idx, li in enumerate(items[:max_results], start=1):
+        a = await li.query_selector("h2 a")
+        title = ((await a.inner_text()).strip() if a else "")
+        link = ((await a.get_attribute("href")) if a else "")
+        p_el = await li.query_selector("div p")
+        snippet = ((await p_el.inner_text()).strip() if p_el else "")
+        if title or link or snippet:
+            results.append({
+                "position": idx,
+                "title": title,
+                "url": link,
+                "snippet": snippet,
+                "source": "bing",
+            })
+    return results
+
+
+def _bing_search(query: str, max_results: int = 5, timeout_ms: int = 20000):
     query = (query or "").strip()
     if not query:
         return []
 
     url = f"https://www.bing.com/search?q={quote(query)}&setlang=en-US&cc=US"
+    # Allow for waiting on a free page on top of the page load itself.
+    return BROWSER_POOL.run(
+        lambda page: _bing_search_page(page, url, max_results, timeout_ms),
+        timeout_s=2 * timeout_ms / 1000 + 5,
+    )
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            ),
-            locale="en-US",
-        )
-        context.set_default_timeout(timeout_ms)
-        page = context.new_page()
-        page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
-        # Bing can trigger internal redirects / additional navigation; avoid strict "visible" waits.
-        page.wait_for_timeout(750)
-        try:
-            page.wait_for_selector("#b_results li.b_algo", state="attached", timeout=timeout_ms)
-        except Exception:
-            # Fallback: element may exist but Playwright can still time out while waiting for navigation.
-            items_probe = page.query_selector_all("#b_results li.b_algo") or page.query_selector_all("li.b_algo")
-            if not items_probe:
-                html = page.content()
-                lowered = html.lower()
-                if "unusual traffic" in lowered or "verify you are a human" in lowered or "form=" in lowered and "captcha" in lowered:
-                    raise RuntimeError("Bing blocked automated browsing (bot-check/captcha). Try again later or switch to another provider.")
-                raise
-
-        results = []
-        items = page.query_selector_all("#b_results li.b_algo")
-        if not items:
-            items = page.query_selector_all("li.b_algo")
-        for idx, li in enumerate(items[:max_results], start=1):
-            a = li.query_selector("h2 a")
-            title = (a.inner_text().strip() if a else "")
-            link = (a.get_attribute("href") if a else "")
-            p_el = li.query_selector("div p")
-            snippet = (p_el.inner_text().strip() if p_el else "")
-            if title or link or snippet:
-                results.append({
-                    "position": idx,
-                    "title": title,
-                    "url": link,
-                    "snippet": snippet,
-                    "source": "bing",
-                })
-
-        context.close()
-        browser.close()
-        return results
+
+# ---- Result cache ----
+# Shared by every search worker process through one SQLite file, with a bounded LRU in
+# front. Entries are fresh for SEARCH_CACHE_TTL_SECONDS; after that they are still served
+# (for up to SEARCH_CACHE_STALE_SECONDS more) while a background refresh fetches new results.
+_CACHE_TTL_S = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "600"))
+_CACHE_STALE_S = float(os.getenv("SEARCH_CACHE_STALE_SECONDS", "86400"))
+
+SEARCH_CACHE = kv_cache.TwoLevelCache(
+    os.getenv("SEARCH_CACHE_PATH", "./cache/search.sqlite3"),
+    table="search_results",
+    max_memory_items=int(os.getenv("SEARCH_CACHE_MEMORY_ITEMS", "512")),
+    max_disk_items=int(os.getenv("SEARCH_CACHE_MAX_ITEMS", "20000")),
+    ttl_s=_CACHE_TTL_S + _CACHE_STALE_S,
+)
+
+_REFRESH_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-refresh")
+_REFRESHING = set()
+_CACHE_LOCK = threading.Lock()
+_CACHE_COUNTERS = {"fresh_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0}
+
+
+def _cache_key(query: str, max_results: int):
+    return f"{' '.join(query.lower().split())}\x1f{max_results}"
+
+
+def _count(name):
+    with _CACHE_LOCK:
+        _CACHE_COUNTERS[name] += 1
+
+
+def _refresh(query, max_results, key):
+    try:
+        SEARCH_CACHE.set(key, _bing_search(query=query, max_results=max_results))
+        _count("refreshes")
+    except Exception as e:
+        _count("refresh_failures")
+        logging.error(f"Background refresh failed for {query!r}: {e}")
+    finally:
+        with _CACHE_LOCK:
+            _REFRESHING.discard(key)
+
+
+def _schedule_refresh(query, max_results, key):
+    with _CACHE_LOCK:
+        if key in _REFRESHING:
+            return
+        _REFRESHING.add(key)
+    _REFRESH_POOL.submit(_refresh, query, max_results, key)
+
+
+def cached_search(query: str, max_results: int):
+    # Returns (results, cache_status) with cache_status "fresh", "stale" or "miss".
+    # Raises if there is no usable cache entry and the live search fails.
+    key = _cache_key(query, max_results)
+    entry = SEARCH_CACHE.get_entry(key)
+    if entry is not None:
+        results, created = entry
+        age = time.time() - created
+        if age <= _CACHE_TTL_S:
+            _count("fresh_hits")
+            return results, "fresh"
+        if age <= _CACHE_TTL_S + _CACHE_STALE_S:
+            _count("stale_hits")
+            _schedule_refresh(query, max_results, key)
+            return results, "stale"
+
+    _count("misses")
+    results = _bing_search(query=query, max_results=max_results)
+    SEARCH_CACHE.set(key, results)
+    return results, "miss"
+
+
+def cache_stats():
+    with _CACHE_LOCK:
+        out = dict(_CACHE_COUNTERS)
+        out["refreshing"] = len(_REFRESHING)
+    store = SEARCH_CACHE.stats()
+    out["memory_items"] = store.get("memory_items")
+    out["disk_items"] = store.get("disk_items")
+    lookups = out["fresh_hits"] + out["stale_hits"] + out["misses"]
+    out["hit_rate"] = round((out["fresh_hits"] + out["stale_hits"]) / lookups, 3) if lookups else 0.0
+    return out
 
 
 @app.get("/health")
 def health():
-    return jsonify({"ok": True})
+    return jsonify({"ok": True, "browser_pool": BROWSER_POOL.stats(), "cache": cache_stats()})
 
 
 @app.get("/search")
@@ -88,22 +333,51 @@ def search():
     query = request.args.get("q", "")
     max_results = int(request.args.get("n", "5"))
 
-    cache_ttl = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "600"))
-    now = time.time()
-    qkey = query.strip().lower()
-
-    cached = _CACHE.get(qkey)
-    if cached and (now - cached[0]) <= cache_ttl:
-        return jsonify({"query": query, "results": cached[1], "cached": True})
-
     try:
-        results = _bing_search(query=query, max_results=max_results)
+        results, status = cached_search(query, max_results)
     except Exception as e:
         logging.exception("search failed")
         return jsonify({"query": query, "results": [], "error": str(e)}), 500
 
-    _CACHE[qkey] = (now, results)
-    return jsonify({"query": query, "results": results, "cached": False})
+    return jsonify({"query": query, "results": results, "cached": status != "miss", "cache": status})
+
+
+_BATCH_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv("SEARCH_BATCH_WORKERS", str(2 * BROWSER_POOL.max_pages))),
+    thread_name_prefix="search-batch",
+)
+
+
+def _search_one(query, max_results):
+    try:
+        results, status = cached_search(query, max_results)
+        return {"query": query, "results": results, "cached": status != "miss", "cache": status}
+    except Exception as e:
+        logging.error(f"Batch search failed for {query!r}: {e}")
+        return {"query": query, "results": [], "cache": "miss", "error": str(e)}
+
+
+@app.post("/search/batch")
+def search_batch():
+    # Body: {"queries": ["...", ...], "n": 5}. Queries run concurrently (bounded by the
+    # browser pool); the response lists one entry per query, in request order.
+    body = request.get_json(silent=True) or {}
+    queries = body.get("queries")
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        return jsonify({"error": "queries must be a list of strings"}), 400
+    max_batch = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "10"))
+    if len(queries) > max_batch:
+        return jsonify({"error": f"at most {max_batch} queries per batch"}), 400
+    max_results = int(body.get("n", 5))
+
+    # Identical queries in one batch are searched once.
+    unique = {}
+    for q in queries:
+        unique.setdefault(_cache_key(q, max_results), q)
+    futures = {key: _BATCH_POOL.submit(_search_one, q, max_results) for key, q in unique.items()}
+    by_key = {key: fut.result() for key, fut in futures.items()}
+    items = [dict(by_key[_cache_key(q, max_results)], query=q) for q in queries]
+    return jsonify({"n": max_results, "results": items})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+import os
+import re
+import math
+import time
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+# Semantic cache for LLM answers (planner JSON, evaluator reply).
+#
+# An entry is stored under (stage, scope) where scope is a hash of everything besides the
+# user's words that shapes the answer: the static prompt, the known profile and, for the
+# evaluator, the shortlisted scheme results. A lookup embeds the English user input and
+# returns the stored answer whose input is most similar, if the cosine similarity is at
+# least SEMANTIC_CACHE_THRESHOLD and the literals of both inputs match exactly ("I am 60"
+# and "I am 65" embed almost identically but must not share a planner result). Literals are
+# the numbers in the text, or whatever literals_fn(text) returns.
+#
+# Entries expire after SEMANTIC_CACHE_TTL_SECONDS; beyond SEMANTIC_CACHE_MAX_ITEMS the least
+# recently used ones are dropped. Callers must not store answers that depended on tool
+# calls (web search results go stale and differ per query).
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _dot(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def number_literals(text):
+    return frozenset(_NUMBER_RE.findall(text or ""))
+
+
+class SemanticCache:
+
+    def __init__(self, embed_fn, threshold=None, ttl_s=None, max_items=None, literals_fn=None):
+        # embed_fn(text) -> vector; literals_fn(text) -> hashable set that must match exactly
+        self.embed_fn = embed_fn
+        self.literals_fn = literals_fn or number_literals
+        self.threshold = float(threshold or os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.93"))
+        self.ttl_s = float(ttl_s or os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "21600"))
+        self.max_items = int(max_items or os.getenv("SEMANTIC_CACHE_MAX_ITEMS", "2000"))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # entry id -> entry, least recently used first
+        self._parts = {}               # (stage, scope) -> set of entry ids
+        self._next_id = 0
+        self._stats = {}               # stage -> counters
+
+    @staticmethod
+    def scope(*parts):
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, stage, name, n=1):
+        counters = self._stats.setdefault(stage, {
+            "lookups": 0, "hits": 0, "stores": 0, "bypassed": 0, "expired": 0, "evicted": 0, "saved_ms": 0.0,
+        })
+        counters[name] += n
+
+    def lookup(self, stage, scope, text, vector=None):
+        # -> (value or None, vector). vector: embed_fn(text) if the caller already has it.
+        # Pass the returned vector back to store() on a miss.
+        vector = _normalize(vector if vector is not None else self.embed_fn(text))
+        literals = self.literals_fn(text)
+        now = time.time()
+        with self._lock:
+            self._count(stage, "lookups")
+            best, best_sim = None, self.threshold
+            for eid in list(self._parts.get((stage, scope), ())):
+                entry = self._entries[eid]
+                if now - entry["ts"] > self.ttl_s:
+                    self._remove(eid)
+                    self._count(stage, "expired")
+                    continue
+                if entry["literals"] != literals:
+                    continue
+                sim = _dot(vector, entry["vector"])
+                if sim >= best_sim:
+                    best, best_sim = eid, sim
+            if best is None:
+                return None, vector
+            entry = self._entries[best]
+            self._entries.move_to_end(best)
+            self._count(stage, "hits")
+            self._count(stage, "saved_ms", entry["cost_ms"])
+        logging.debug(f"Semantic cache hit [{stage}] similarity={best_sim:.3f}")
+        return entry["value"], vector
+
+    def store(self, stage, scope, text, value, vector=None, cost_ms=0.0):
+        vector = _normalize(vector if vector is not None else self.embed_fn(text))
+        with self._lock:
+            eid = self._next_id
+            self._next_id += 1
+            self._entries[eid] = {
+                "part": (stage, scope), "vector": vector, "literals": self.literals_fn(text),
+                "value": value, "ts": time.time(), "cost_ms": float(cost_ms),
+            }
+            self._parts.setdefault((stage, scope), set()).add(eid)
+            self._count(stage, "stores")
+            while len(self._entries) > self.max_items:
+                old_id = next(iter(self._entries))
+                self._count(self._entries[old_id]["part"][0], "evicted")
+                self._remove(old_id)
+
+    def bypass(self, stage):
+        # Counts an answer that was not cached because it used tools.
+        with self._lock:
+            self._count(stage, "bypassed")
+
+    def _remove(self, eid):
+        entry = self._entries.pop(eid)
+        ids = self._parts.get(entry["part"])
+        if ids is not None:
+            ids.discard(eid)
+            if not ids:
+                del self._parts[entry["part"]]
+
+    def stats(self):
+        with self._lock:
+            out = {stage: dict(c) for stage, c in self._stats.items()}
+            size = len(self._entries)
+        for c in out.values():
+            c["hit_ratio"] = round(c["hits"] / c["lookups"], 3) if c["lookups"] else 0.0
+            c["saved_ms"] = round(c["saved_ms"], 1)
+        return {"entries": size, "max_items": self.max_items, "threshold": self.threshold, "stages": out}
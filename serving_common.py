@@ -0,0 +1,95 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import uuid
+from urllib.parse import quote
+
+import sarvam_client
+import turn_pipeline
+from conversation_agent import CATALOG, EMBEDDER, MEMORY_MAINTENANCE, MEMORY_WRITER, PROMPTS, ROUTER, SEMANTIC_CACHE, SESSIONS, translation_cache_stats, tts_cache_stats, web_search_stats
+
+# Framework-neutral pieces shared by app.py (Flask, sync) and app_async.py (Quart, async).
+
+SESSION_COOKIE = 'anuvad_session'
+
+# /process_voice?audio=wav answers with the WAV bytes as the body and the texts in these
+# headers (percent-encoded UTF-8), so the reply needs no base64 encode and no second request.
+# Without the flag the body is the JSON payload with base64 `audio`, as before.
+TEXT_HEADERS = {'user': 'X-User-Text', 'response': 'X-Response-Text', 'lang': 'X-Lang'}
+
+def wants_raw_audio(args):
+    return args.get('audio') == 'wav'
+
+def voice_payload(user_text, assistant_text, wav, lang):
+    payload = {'user': user_text, 'response': assistant_text, 'lang': lang}
+    if wav:
+        payload['audio'] = base64.b64encode(wav).decode('utf-8')
+    return payload
+
+def raw_audio_headers(user_text, assistant_text, lang):
+    values = {'user': user_text, 'response': assistant_text, 'lang': lang}
+    headers = {name: quote(values[key] or '', safe='') for key, name in TEXT_HEADERS.items()}
+    headers['Access-Control-Expose-Headers'] = ', '.join(list(TEXT_HEADERS.values()) + ['X-Session-ID'])
+    headers['Cache-Control'] = 'no-store'
+    return headers
+
+# Session ids are issued by the server as "<id>.<hmac>" tokens, in the anuvad_session cookie
+# and the X-Session-ID response header (for API clients, which send it back in the same
+# header). Tokens that do not verify are ignored and a new session is issued, so a caller
+# cannot pick another user's id. Set SESSION_SECRET (shared by all workers) to keep sessions
+# valid across workers and restarts.
+_SESSION_SECRET = os.getenv('SESSION_SECRET', '').encode('utf-8')
+if not _SESSION_SECRET:
+    logging.warning("SESSION_SECRET is not set; using a per-process secret (sessions do not survive restarts or span workers)")
+    _SESSION_SECRET = secrets.token_bytes(32)
+
+def _sign(sid):
+    return hmac.new(_SESSION_SECRET, sid.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+def _verify(token):
+    sid, _, sig = (token or '').strip().partition('.')
+    if sid and sig and hmac.compare_digest(sig, _sign(sid)):
+        return sid
+    return None
+
+def resolve_session(headers, cookies):
+    # -> (token, session_id). Unsigned or forged ids get a fresh server-issued session.
+    for token in (headers.get('X-Session-ID'), cookies.get(SESSION_COOKIE)):
+        sid = _verify(token)
+        if sid:
+            return token.strip(), sid
+    sid = uuid.uuid4().hex
+    return f"{sid}.{_sign(sid)}", sid
+
+def start_background_jobs():
+    # Called once by each server module. Memory maintenance is opt-in and, with several
+    # workers, runs in whichever process takes the lock file first.
+    if os.getenv('MEMORY_MAINTENANCE_ENABLED', '0') == '1':
+        MEMORY_MAINTENANCE.start(lock_path=os.path.join('chroma_db', '.maintenance.lock'))
+
+def sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def health_payload():
+    return {
+        'ok': True,
+        'sarvam': sarvam_client.pool_stats(),
+        'translation_cache': translation_cache_stats(),
+        'tts_cache': tts_cache_stats(),
+        'web_search': web_search_stats(),
+        'sessions': SESSIONS.stats(),
+        'scheme_catalog': CATALOG.stats(),
+        'memory_writer': MEMORY_WRITER.stats(),
+        'embeddings': EMBEDDER.stats(),
+        'memory_maintenance': MEMORY_MAINTENANCE.stats(),
+        'prompts': PROMPTS.stats(),
+        'semantic_cache': SEMANTIC_CACHE.stats() if SEMANTIC_CACHE else None,
+        'turn_router': ROUTER.stats(),
+        'recent_turns': turn_pipeline.recent_reports(),
+    }
@@ -0,0 +1,148 @@
+import os
+import json
+import asyncio
+import time
+import logging
+import threading
+import contextlib
+from collections import OrderedDict, deque
+
+DEFAULT_SESSION_ID = "local"
+
+
+class SessionState:
+    # Per-user conversation state. `turn_lock` serializes turns of the same session;
+    # different sessions run fully in parallel. It is an asyncio.Lock, so it must only be
+    # used from the agent's event loop (see conversation_agent.run_sync).
+
+    def __init__(self, session_id, history_max, contradictions_max):
+        self.session_id = session_id
+        self.profile = {}
+        self.contradictions = deque(maxlen=contradictions_max)
+        self.history = deque(maxlen=history_max)
+        self.created = time.time()
+        self.last_seen = self.created
+        self.approx_bytes = 0
+        self.turn_lock = asyncio.Lock()
+        self.holds = 0  # turns waiting for or holding turn_lock; guarded by the store lock
+        # Set by full turns for turn_router: the shortlisted scheme ids and the profile
+        # field the assistant is most likely asking about next.
+        self.last_shortlist = []
+        self.pending_field = None
+
+    def add_message(self, role, content):
+        self.history.append({"role": role, "content": content})
+
+    def recent_contradictions(self, n=3):
+        return list(self.contradictions)[-n:]
+
+    def estimate_size(self):
+        try:
+            raw = json.dumps(
+                [self.profile, list(self.contradictions), list(self.history)],
+                ensure_ascii=False, default=str,
+            )
+            self.approx_bytes = len(raw.encode("utf-8"))
+        except Exception:
+            pass
+        return self.approx_bytes
+
+
+class SessionStore:
+    # Bounded map of session_id -> SessionState.
+    #  - history/contradictions per session are capped (deque maxlen)
+    #  - sessions idle longer than idle_ttl_s are dropped
+    #  - when the session count or estimated total size is over budget, the least
+    #    recently used sessions are dropped first
+    #  - a session in use by a turn (see turn()) is never dropped: a new SessionState would
+    #    come with a second turn_lock and let the next turn run concurrently
+
+    def __init__(self, max_sessions=None, max_bytes=None, idle_ttl_s=None, history_max=None, contradictions_max=None):
+        self.max_sessions = int(max_sessions or os.getenv("SESSION_MAX_SESSIONS", "500"))
+        self.max_bytes = int(max_bytes or os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.idle_ttl_s = float(idle_ttl_s or os.getenv("SESSION_IDLE_TTL_SECONDS", "1800"))
+        self.history_max = int(history_max or os.getenv("SESSION_HISTORY_MAX", "20"))
+        self.contradictions_max = int(contradictions_max or os.getenv("SESSION_CONTRADICTIONS_MAX", "20"))
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._evicted = {"idle": 0, "capacity": 0}
+
+    def get(self, session_id=None, hold=False):
+        session_id = str(session_id or DEFAULT_SESSION_ID)
+        now = time.time()
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = SessionState(session_id, self.history_max, self.contradictions_max)
+                self._sessions[session_id] = state
+                logging.debug(f"Session created: {session_id}")
+            else:
+                self._sessions.move_to_end(session_id)
+            state.last_seen = now
+            if hold:
+                state.holds += 1
+            if now - self._last_sweep > 30:
+                self._sweep_locked(now)
+        return state
+
+    @contextlib.asynccontextmanager
+    async def turn(self, session_id=None):
+        # `async with SESSIONS.turn(sid) as session:` runs one turn under session.turn_lock.
+        # The session is held from lookup to touch(), so it cannot be evicted meanwhile.
+        state = self.get(session_id, hold=True)
+        try:
+            async with state.turn_lock:
+                yield state
+        finally:
+            self.touch(state, release=True)
+
+    def touch(self, state, release=False):
+        # Call after a turn so the size estimate and LRU order reflect the new history.
+        state.last_seen = time.time()
+        state.estimate_size()
+        with self._lock:
+            if release:
+                state.holds -= 1
+            if state.session_id in self._sessions:
+                self._sessions.move_to_end(state.session_id)
+            self._enforce_caps_locked(keep=state.session_id)
+
+    def drop(self, session_id):
+        with self._lock:
+            return self._sessions.pop(str(session_id), None) is not None
+
+    def _sweep_locked(self, now):
+        self._last_sweep = now
+        idle = [sid for sid, st in self._sessions.items() if now - st.last_seen > self.idle_ttl_s and not self._busy(st)]
+        for sid in idle:
+            del self._sessions[sid]
+        self._evicted["idle"] += len(idle)
+        if idle:
+            logging.debug(f"Evicted {len(idle)} idle sessions")
+        self._enforce_caps_locked()
+
+    @staticmethod
+    def _busy(state):
+        return state.holds > 0 or state.turn_lock.locked()
+
+    def _enforce_caps_locked(self, keep=None):
+        total = sum(st.approx_bytes for st in self._sessions.values())
+        for sid in list(self._sessions.keys()):
+            if len(self._sessions) <= self.max_sessions and total <= self.max_bytes:
+                break
+            if sid == keep or self._busy(self._sessions[sid]):
+                continue
+            total -= self._sessions.pop(sid).approx_bytes
+            self._evicted["capacity"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "approx_bytes": sum(st.approx_bytes for st in self._sessions.values()),
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "evicted_idle": self._evicted["idle"],
+                "evicted_capacity": self._evicted["capacity"],
+            }
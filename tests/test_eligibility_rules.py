@@ -0,0 +1,78 @@
+import os
+import json
+
+import pytest
+
+import eligibility_rules
+
+_SCHEMES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "schemes.json")
+
+
+@pytest.fixture(scope="module")
+def rules():
+    with open(_SCHEMES, "r", encoding="utf-8") as f:
+        return eligibility_rules.CompiledRules(json.load(f)["schemes"])
+
+
+@pytest.mark.parametrize("occupation", ["farmer", "Farmer", "small farmer", "शेतकरी"])
+def test_occupation_in_matches_value(rules, occupation):
+    profile = {"occupation": occupation, "state": "Maharashtra"}
+    assert rules.evaluate(profile, "pm_kisan")["eligible"]
+    assert rules.evaluate_all(profile)["pm_kisan"]["eligible"]
+
+
+@pytest.mark.parametrize("occupation", ["not a farmer", "no farmer", "non farmer", "शेतकरी नाही", "farmers union clerk", "teacher"])
+def test_occupation_in_rejects_negated_or_partial(rules, occupation):
+    profile = {"occupation": occupation, "state": "Maharashtra"}
+    assert not rules.evaluate(profile, "pm_kisan")["eligible"]
+    assert not rules.evaluate_all(profile)["pm_kisan"]["eligible"]
+
+
+@pytest.mark.parametrize("income", ["low", "BPL", "low income", "बीपीएल"])
+def test_income_any_matches_value(rules, income):
+    assert rules.evaluate_all({"income_bracket": income, "state": "Bihar"})["pmjay"]["eligible"]
+
+
+@pytest.mark.parametrize("income", ["lower middle", "below", "not bpl", "middle", "fellow"])
+def test_income_any_rejects_substrings(rules, income):
+    profile = {"income_bracket": income, "state": "Bihar"}
+    assert not rules.evaluate(profile, "pmjay")["eligible"]
+    assert not rules.evaluate_all(profile)["pmjay"]["eligible"]
+
+
+def test_advisory_uses_whole_values(rules):
+    female = rules.evaluate({"gender": "female", "state": "Bihar"}, "ujjwala")
+    male = rules.evaluate({"gender": "male", "state": "Bihar"}, "ujjwala")
+    assert female["eligible"] and not female["reasons"]
+    # "female" used to match inside "not female"; advisory rules only add a reason.
+    negated = rules.evaluate({"gender": "not female", "state": "Bihar"}, "ujjwala")
+    assert male["eligible"] and male["reasons"]
+    assert negated["reasons"]
+
+
+def test_tag_particle_is_not_a_negation(rules):
+    # "ना" ends many plain statements ("शेतकरी आहे ना" - "I am a farmer, right").
+    profile = {"occupation": "शेतकरी आहे ना", "state": "Maharashtra"}
+    assert rules.evaluate(profile, "pm_kisan")["eligible"]
+    assert rules.evaluate_all(profile)["pm_kisan"]["eligible"]
+
+
+@pytest.mark.parametrize("rural", ["yes", "Yes", True, "होय", "village", "rural area", "गाव"])
+def test_required_accepts_affirmative_values(rules, rural):
+    profile = {"rural": rural, "state": "Bihar"}
+    assert rules.evaluate(profile, "mgnrega")["eligible"]
+    assert rules.evaluate_all(profile)["mgnrega"]["eligible"]
+
+
+@pytest.mark.parametrize("rural", ["no", False, "urban", "city", "not rural", "maybe", "yeah right no"])
+def test_required_rejects_other_values(rules, rural):
+    profile = {"rural": rural, "state": "Bihar"}
+    assert not rules.evaluate(profile, "mgnrega")["eligible"]
+    assert not rules.evaluate_all(profile)["mgnrega"]["eligible"]
+
+
+def test_required_list_lists_accepted_values():
+    rule = eligibility_rules.compile_rule("disability_required", ["disabled", "दिव्यांग"])
+    assert rule.check(rule.prepare("दिव्यांग"))[0]
+    assert rule.check(rule.prepare("yes"))[0]
+    assert not rule.check(rule.prepare("disco"))[0]
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+import llm_stream
+
+
+def _stream(deltas, min_chars=None):
+    async def run():
+        stream = llm_stream.SentenceStream(min_chars=min_chars)
+        for d in deltas:
+            stream.feed(d)
+        stream.finish()
+        return [s async for s in stream]
+    return asyncio.run(run())
+
+
+def test_no_split_after_abbreviation():
+    text = "You are eligible for PM-KISAN! Rs. 6000 per year is paid। Visit the CSC office."
+    assert llm_stream.split_sentences(text, min_chars=0) == [
+        "You are eligible for PM-KISAN!",
+        "Rs. 6000 per year is paid।",
+        "Visit the CSC office.",
+    ]
+
+
+def test_no_split_after_list_numbers_or_single_letters():
+    text = "Bring these documents: 1. Aadhaar card 2. Bank passbook. Ask Dr. Rao or Shri A. Patil at the office."
+    assert llm_stream.split_sentences(text, min_chars=0) == [
+        "Bring these documents: 1. Aadhaar card 2. Bank passbook.",
+        "Ask Dr. Rao or Shri A. Patil at the office.",
+    ]
+
+
+def test_short_fragments_merge_into_next_sentence():
+    text = "Yes. You qualify. The amount is paid in three installments."
+    assert llm_stream.split_sentences(text, min_chars=20) == [
+        "Yes. You qualify. The amount is paid in three installments.",
+    ]
+    # A short last piece joins the previous sentence.
+    assert llm_stream.split_sentences("The amount is paid in three installments. Okay.", min_chars=20) == [
+        "The amount is paid in three installments. Okay.",
+    ]
+
+
+def test_stream_matches_whole_text_split():
+    text = "You are eligible for PM-KISAN! Rs. 6000 per year is paid। 1. Aadhaar card is needed. Yes. Visit the CSC office."
+    # Deltas cut right after "Rs." and inside the list number.
+    deltas = ["You are eligible for PM-KISAN! Rs.", " 6000 per year is paid। 1", ". Aadhaar card is needed. Yes.", " Visit the CSC office."]
+    assert _stream(deltas, min_chars=20) == llm_stream.split_sentences(text, min_chars=20) == [
+        "You are eligible for PM-KISAN!",
+        "Rs. 6000 per year is paid।",
+        "1. Aadhaar card is needed.",
+        "Yes. Visit the CSC office.",
+    ]
+
+
+@pytest.mark.parametrize("text", [
+    "The amount is paid in three installments. Okay.",
+    "You are eligible for PM-KISAN! Rs. 6000 per year is paid. Thanks!",
+    "Yes. No.",
+    "Visit the CSC office with your Aadhaar card. Bring the bank passbook too. Done. Ok.",
+    "Short one. Another short. A much longer sentence that is clearly over the limit.",
+])
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_stream_matches_split_with_short_tails(text, size):
+    deltas = [text[i:i + size] for i in range(0, len(text), size)]
+    assert _stream(deltas, min_chars=20) == llm_stream.split_sentences(text, min_chars=20)
+
+
+def test_sentence_released_once_enough_text_follows():
+    async def run():
+        stream = llm_stream.SentenceStream(min_chars=20)
+        stream.feed("The amount is paid in three installments. ")
+        assert stream._queue.empty()  # a short tail could still join it
+        stream.feed("Visit the office near")
+        return stream._queue.get_nowait()
+    assert asyncio.run(run()) == "The amount is paid in three installments."
@@ -0,0 +1,63 @@
+import memory_maintenance
+
+
+class FakeCollection:
+    # Minimal in-memory stand-in for the Chroma calls _dedup makes.
+    metadata = {"hnsw:space": "cosine"}
+
+    def __init__(self, rows):
+        self.rows = rows  # id -> {"vector", "meta"}
+
+    def get(self, ids=None, include=None, limit=None, offset=0):
+        ids = ids or list(self.rows)
+        return {"ids": ids, "embeddings": [self.rows[i]["vector"] for i in ids]}
+
+    def query(self, query_embeddings, n_results, include=None):
+        out = {"ids": [], "distances": []}
+        for q in query_embeddings:
+            scored = sorted(self.rows, key=lambda i: -sum(a * b for a, b in zip(q, self.rows[i]["vector"])))[:n_results]
+            out["ids"].append(scored)
+            out["distances"].append([1 - sum(a * b for a, b in zip(q, self.rows[i]["vector"])) for i in scored])
+        return out
+
+    def update(self, ids, metadatas):
+        for i, m in zip(ids, metadatas):
+            self.rows[i]["meta"] = m
+
+    def delete(self, ids):
+        for i in ids:
+            self.rows.pop(i)
+
+
+def test_dedup_folds_older_duplicates_into_the_newest():
+    rows = {
+        "old": {"vector": [1.0, 0.0], "meta": {"ts": 100.0, "session": "a"}},
+        "mid": {"vector": [1.0, 0.0], "meta": {"ts": 200.0, "merged": 2, "first_ts": 50.0}},
+        "new": {"vector": [1.0, 0.0], "meta": {"ts": 300.0}},
+        "other": {"vector": [0.0, 1.0], "meta": {"ts": 300.0}},
+    }
+    collection = FakeCollection(rows)
+    maintenance = memory_maintenance.MemoryMaintenance(collection)
+    entries = [(i, dict(r["meta"])) for i, r in rows.items()]
+
+    assert sorted(maintenance._dedup(entries)) == ["mid", "old"]
+    assert sorted(rows) == ["new", "other"]
+    kept = rows["new"]["meta"]
+    assert kept["ts"] == 300.0
+    assert kept["merged"] == 4  # "old", "mid" and the two "mid" had already absorbed
+    assert kept["first_ts"] == 50.0
+    assert kept["session"] == "a"
+    assert rows["other"]["meta"] == {"ts": 300.0}
+
+
+def test_only_one_runner_per_lock_file(tmp_path):
+    lock = str(tmp_path / "maintenance.lock")
+    first = memory_maintenance.MemoryMaintenance(FakeCollection({}))
+    second = memory_maintenance.MemoryMaintenance(FakeCollection({}))
+    try:
+        assert first.start(lock_path=lock)
+        assert not second.start(lock_path=lock)
+        assert second.stats()["running"] is False
+    finally:
+        first.stop()
+        second.stop()
@@ -0,0 +1,31 @@
+import json
+
+import scheme_catalog
+
+
+def _write(path, doc):
+    path.write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+
+
+def _catalog(tmp_path, description):
+    scheme = {"id": "pm_kisan", "name": "पीएम किसान", "description": description, "tags": ["शेतकरी"]}
+    _write(tmp_path / "schemes.json", {"language_hint": "mr-IN", "schemes": [scheme]})
+    built = scheme_catalog.source_hash(scheme_catalog.searchable_fields(
+        {"name": "पीएम किसान", "description": "शेतकऱ्यांना मदत", "tags": ["शेतकरी"]}), "mr-IN")
+    english = {"name": "PM Kisan", "description": "income support for farmers", "tags": ["farmer"], "source_hash": built}
+    _write(tmp_path / "schemes.en.json", {"version": 1, "schemes": {"pm_kisan": {"mr-IN": english}}})
+    return scheme_catalog.SchemeCatalog(str(tmp_path / "schemes.json"), check_interval_s=0)
+
+
+def test_english_entry_used_when_source_unchanged(tmp_path):
+    catalog = _catalog(tmp_path, "शेतकऱ्यांना मदत")
+    assert catalog.english_ready()
+    assert [s["id"] for s in catalog.search("farmers income support")] == ["pm_kisan"]
+
+
+def test_stale_english_entry_is_ignored(tmp_path):
+    catalog = _catalog(tmp_path, "महिलांना मदत")
+    assert not catalog.english_ready()
+    assert catalog.english_name("pm_kisan") is None
+    assert catalog.stats()["english_stale"] == 1
+    assert catalog.search("income support") == []
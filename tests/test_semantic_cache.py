@@ -0,0 +1,58 @@
+import semantic_cache
+import turn_router
+
+
+def _literals(text):
+    # Same guard conversation_agent installs on the planner/evaluator cache.
+    return semantic_cache.number_literals(text) | turn_router.entities(text)
+
+
+def _cache():
+    # Worst case: every input embeds to the same vector, so only the literals can keep
+    # near-identical questions apart.
+    return semantic_cache.SemanticCache(lambda text: [1.0, 0.0], threshold=0.93, literals_fn=_literals)
+
+
+def _planner_answer(state):
+    return '{"extracted_profile": {"occupation": "farmer", "state": "%s"}}' % state
+
+
+def test_planner_answer_not_reused_across_states():
+    cache = _cache()
+    cache.store("planner", "scope", "I am a farmer from Bihar", _planner_answer("Bihar"))
+    value, _ = cache.lookup("planner", "scope", "I am a farmer from Assam")
+    assert value is None
+    value, _ = cache.lookup("planner", "scope", "i am a farmer from bihar")
+    assert value == _planner_answer("Bihar")
+
+
+def test_gender_occupation_and_yes_no_must_match():
+    cache = _cache()
+    cache.store("planner", "scope", "I am a male farmer", "male")
+    cache.store("planner", "scope", "Yes, I live in a village", "yes")
+    assert cache.lookup("planner", "scope", "I am a female farmer")[0] is None
+    assert cache.lookup("planner", "scope", "I am a male student")[0] is None
+    assert cache.lookup("planner", "scope", "No, I live in a village")[0] is None
+    assert cache.lookup("planner", "scope", "I am a male farmer.")[0] == "male"
+
+
+def test_numbers_must_match():
+    cache = _cache()
+    cache.store("planner", "scope", "I am 60 years old", "60")
+    assert cache.lookup("planner", "scope", "I am 65 years old")[0] is None
+    assert cache.lookup("planner", "scope", "I am 60 years old")[0] == "60"
+
+
+def test_lookup_uses_the_callers_vector():
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        return [1.0, 0.0]
+
+    cache = semantic_cache.SemanticCache(embed, threshold=0.93)
+    value, vector = cache.lookup("planner", "s", "which documents", vector=[2.0, 0.0])
+    assert value is None and calls == []
+    cache.store("planner", "s", "which documents", "answer", vector)
+    assert cache.lookup("planner", "s", "which documents", vector=[1.0, 0.0])[0] == "answer"
+    assert calls == []
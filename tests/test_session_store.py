@@ -0,0 +1,31 @@
+import asyncio
+
+import session_store
+
+
+def test_session_in_use_is_not_evicted():
+    store = session_store.SessionStore(max_sessions=1)
+
+    async def main():
+        async with store.turn("a") as a:
+            store.get("b")
+            store.touch(store.get("c"))  # over the cap: "b" goes, "a" is busy
+            assert store._sessions.get("a") is a
+            assert "b" not in store._sessions
+        # Released: the next turn on "a" still gets the same state and lock.
+        async with store.turn("a") as again:
+            assert again is a
+
+    asyncio.run(main())
+
+
+def test_released_session_can_be_evicted():
+    store = session_store.SessionStore(max_sessions=1)
+
+    async def main():
+        async with store.turn("a") as a:
+            pass
+        store.touch(store.get("b"))
+        assert store.get("a") is not a
+
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+import asyncio
+
+import turn_pipeline
+
+
+def _graph():
+    async def translate(ctx):
+        await asyncio.sleep(0.01)
+        return "hello"
+
+    def full(ctx):
+        return ctx["route"] == "full"
+
+    stages = [
+        turn_pipeline.Stage("translate_in", translate),
+        turn_pipeline.Stage("route", lambda ctx: "fast" if ctx["translate_in"] == "hello" else "full", deps=["translate_in"]),
+        turn_pipeline.Stage("planner", lambda ctx: "plan", deps=["route"], when=full),
+        turn_pipeline.Stage("evaluator", lambda ctx: ctx["planner"] or "greeting", deps=["route", "planner"]),
+    ]
+    return turn_pipeline.TurnGraph(stages, name="test")
+
+
+def test_skipped_stages_are_none_and_not_on_the_critical_path():
+    ctx, report = asyncio.run(_graph().run_async({}))
+    assert ctx["planner"] is None
+    assert ctx["evaluator"] == "greeting"
+    assert report["skipped"] == ["planner"]
+    assert [p["stage"] for p in report["critical_path"]] == ["translate_in", "route", "evaluator"]
+
+
+def test_stage_given_in_inputs_is_not_run_or_checked():
+    ctx, report = asyncio.run(_graph().run_async({"translate_in": "hi there"}))
+    assert ctx["evaluator"] == "plan"
+    assert report["skipped"] == []
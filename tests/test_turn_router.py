@@ -0,0 +1,30 @@
+import pytest
+
+import turn_router
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("I am from a low income family", "low"),
+    ("my family income is middle", "middle"),
+    ("salary is very low", "low"),
+    ("lower income group", "low"),
+    ("I have a BPL card", "bpl"),
+])
+def test_income_needs_an_income_word(text, expected):
+    assert turn_router.extract_slots(text) == {"income_bracket": expected}
+
+
+@pytest.mark.parametrize("text", [
+    "I'm in the middle of harvest",
+    "my son is in high school",
+    "I passed high school",
+    "the price is high",
+])
+def test_income_words_alone_go_to_the_full_path(text):
+    assert turn_router.extract_slots(text) is None
+    assert not any(field == "income_bracket" for field, _ in turn_router.entities(text))
+
+
+def test_bare_income_answer_only_when_asked():
+    assert turn_router.extract_slots("middle", pending_field="income_bracket") == {"income_bracket": "middle"}
+    assert turn_router.extract_slots("middle") is None
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+# Importing the agent builds its API clients; no request is sent in these tests.
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+ca = pytest.importorskip("conversation_agent")
+
+
+def test_web_search_many_splits_into_service_sized_batches(monkeypatch):
+    sent = []
+
+    def fake_batch(queries):
+        sent.append(list(queries))
+        return {q.strip().lower(): f"result {q}" for q in queries}
+
+    monkeypatch.setenv("SEARCH_BATCH_MAX_QUERIES", "10")
+    monkeypatch.setattr(ca, "_web_search_lookup", lambda qkeys: ({}, None))
+    monkeypatch.setattr(ca, "_fetch_search_batch", fake_batch)
+    queries = [f"scheme {i}" for i in range(23)]
+
+    assert ca.web_search_many(queries) == [f"result {q}" for q in queries]
+    assert [len(b) for b in sent] == [10, 10, 3]
+
+
+def test_web_search_many_keeps_other_batches_when_one_fails(monkeypatch):
+    def fake_batch(queries):
+        if "scheme 0" in queries:
+            raise RuntimeError("boom")
+        return {q.strip().lower(): f"result {q}" for q in queries}
+
+    monkeypatch.setenv("SEARCH_BATCH_MAX_QUERIES", "2")
+    monkeypatch.setattr(ca, "_web_search_lookup", lambda qkeys: ({}, None))
+    monkeypatch.setattr(ca, "_fetch_search_batch", fake_batch)
+
+    out = ca.web_search_many(["scheme 0", "scheme 1", "scheme 2"])
+    assert out[:2] == ["Search failed: boom"] * 2
+    assert out[2] == "result scheme 2"
+
+
+def _call(cid, arguments):
+    return ca.SimpleNamespace(id=cid, function=ca.SimpleNamespace(name="web_search", arguments=arguments))
+
+
+@pytest.mark.parametrize("arguments", ['["a list"]', '"a string"', '{"query": 42}', "{not json"])
+def test_malformed_search_arguments_give_an_error_message(monkeypatch, arguments):
+    monkeypatch.setattr(ca, "web_search_many", lambda queries: [f"result {q}" for q in queries])
+    monkeypatch.setattr(ca, "web_search", lambda query: f"single {query.strip()}")
+    calls = [_call("a", '{"query": "pm kisan"}'), _call("b", arguments), _call("c", '{"query": "pmay"}')]
+
+    messages = ca.asyncio.run(ca._run_tool_calls_async(calls, "en-IN", {}))
+
+    assert [m["tool_call_id"] for m in messages] == ["a", "b", "c"]
+    assert messages[0]["content"] == "result pm kisan"
+    assert messages[2]["content"] == "result pmay"
+    assert messages[1]["content"].startswith("Tool web_search failed")
@@ -0,0 +1,134 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+
+
+class AudioFileCache:
+    # Content-addressed WAV files on disk with a total byte budget.
+    # File mtime doubles as the LRU clock: hits touch the file, eviction removes the oldest.
+
+    def __init__(self, root, max_bytes=256 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._index = {}  # key -> [size, last_used_ts]
+        self._total_bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def make_key(sentence, language, speaker, model):
+        normalized = " ".join(str(sentence).split())
+        raw = "\x1f".join([normalized, language or "", speaker or "", model or ""])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.wav")
+
+    def _scan(self):
+        index = {}
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith(".wav"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+                index[name[:-4]] = [st.st_size, st.st_mtime]
+                total += st.st_size
+        with self._lock:
+            self._index = index
+            self._total_bytes = total
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self._counters["misses"] += 1
+                entry = self._index.pop(key, None)
+                if entry:
+                    self._total_bytes -= entry[0]
+            return None
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            self._counters["hits"] += 1
+            entry = self._index.get(key)
+            if entry is None:
+                self._index[key] = [len(data), now]
+                self._total_bytes += len(data)
+            else:
+                entry[1] = now
+        return data
+
+    def put(self, key, wav_bytes):
+        if not wav_bytes or len(wav_bytes) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(wav_bytes)
+            os.replace(tmp, path)  # atomic, so readers never see a partial file
+        except OSError as e:
+            logging.error(f"TTS cache write failed for {key}: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            old = self._index.get(key)
+            if old:
+                self._total_bytes -= old[0]
+            self._index[key] = [len(wav_bytes), time.time()]
+            self._total_bytes += len(wav_bytes)
+            self._counters["writes"] += 1
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def _evict(self):
+        # Other processes may share the directory, so refresh the view before deleting.
+        self._scan()
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+            # Leave some headroom so we don't evict on every single write.
+            target = int(self.max_bytes * 0.9)
+            victims = []
+            for key, (size, ts) in sorted(self._index.items(), key=lambda kv: kv[1][1]):
+                if self._total_bytes <= target:
+                    break
+                victims.append(key)
+                self._total_bytes -= size
+                del self._index[key]
+            self._counters["evictions"] += len(victims)
+        for key in victims:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+        logging.debug(f"TTS cache evicted {len(victims)} files")
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+            out["files"] = len(self._index)
+            out["bytes"] = self._total_bytes
+            out["max_bytes"] = self.max_bytes
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 3) if lookups else 0.0
+        return out
@@ -0,0 +1,196 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Non-critical stages (memory writes, cache warmups, ...) run here so the turn can
+# return without waiting for them.
+_BACKGROUND = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TURN_BACKGROUND_WORKERS", "2")),
+    thread_name_prefix="turn-bg",
+)
+
+_RECENT_REPORTS = deque(maxlen=int(os.getenv("TURN_REPORTS_KEPT", "20")))
+_RECENT_LOCK = threading.Lock()
+
+
+class Stage:
+    # fn(ctx) -> result, either a plain function or a coroutine function. ctx maps every
+    # finished stage name (and the graph inputs) to its result.
+    # critical=False stages run in the background and never delay the turn.
+    # when(ctx) -> bool, checked once the deps are done: False skips the stage (its result
+    # is None, it is not timed) so one graph can hold alternative paths.
+
+    def __init__(self, name, fn, deps=(), critical=True, when=None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.critical = critical
+        self.when = when
+
+
+class TurnGraph:
+    def __init__(self, stages, max_workers=None, name="turn"):
+        self.name = name
+        self.stages = {s.name: s for s in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("duplicate stage names")
+        for s in stages:
+            for d in s.deps:
+                if d not in self.stages:
+                    raise ValueError(f"stage {s.name} depends on unknown stage {d}")
+                if s.critical and not self.stages[d].critical:
+                    raise ValueError(f"critical stage {s.name} cannot wait on background stage {d}")
+        self.max_workers = max_workers or int(os.getenv("TURN_STAGE_WORKERS", "4"))
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        state = {}
+
+        def visit(n):
+            if state.get(n) == 1:
+                raise ValueError(f"cycle through stage {n}")
+            if state.get(n) == 2:
+                return
+            state[n] = 1
+            for d in self.stages[n].deps:
+                visit(d)
+            state[n] = 2
+
+        for n in self.stages:
+            visit(n)
+
+    def run(self, inputs=None):
+        # Sync entry point for callers without an event loop of their own.
+        return asyncio.run(self.run_async(inputs))
+
+    async def run_async(self, inputs=None):
+        # Starts every stage as soon as its deps are done; returns (ctx, report) once all
+        # critical stages finished. Coroutine stages are awaited on the loop, plain functions
+        # run in worker threads. Background stages are handed off and not awaited.
+        # A stage whose result is already in inputs is not run again.
+        ctx = dict(inputs or {})
+        timings = {}  # name -> (start, end) relative to t0
+        t0 = time.perf_counter()
+        waiting = {n: set(s.deps) - set(ctx) for n, s in self.stages.items() if n not in ctx}
+        dependents = {n: [] for n in self.stages}
+        for n, s in self.stages.items():
+            for d in s.deps:
+                dependents[d].append(n)
+        limit = asyncio.Semaphore(self.max_workers)
+
+        async def _invoke(stage):
+            view = dict(ctx)
+            async with limit:
+                start = time.perf_counter() - t0
+                if asyncio.iscoroutinefunction(stage.fn):
+                    result = await stage.fn(view)
+                else:
+                    result = await asyncio.to_thread(stage.fn, view)
+            return stage, result, start, time.perf_counter() - t0
+
+        def _mark_done(n):
+            for m in dependents[n]:
+                if m in waiting:
+                    waiting[m].discard(n)
+
+        running = set()
+        skipped = []
+
+        def _launch_ready():
+            ready = [n for n, deps in waiting.items() if not deps]
+            while ready:
+                for n in ready:
+                    del waiting[n]
+                    stage = self.stages[n]
+                    if stage.when is not None and not stage.when(ctx):
+                        ctx[n] = None
+                        skipped.append(n)
+                        _mark_done(n)
+                    elif stage.critical:
+                        running.add(asyncio.ensure_future(_invoke(stage)))
+                    else:
+                        _start_background(stage, dict(ctx))
+                        _mark_done(n)
+                ready = [n for n, deps in waiting.items() if not deps]
+
+        try:
+            _launch_ready()
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    running.discard(task)
+                    stage, result, start, end = task.result()  # re-raises the stage's exception
+                    timings[stage.name] = (start, end)
+                    ctx[stage.name] = result
+                    _mark_done(stage.name)
+                _launch_ready()
+            if waiting:
+                raise RuntimeError(f"stages never became ready: {sorted(waiting)}")
+        finally:
+            for task in running:
+                task.cancel()
+
+        report = self._report(timings, time.perf_counter() - t0)
+        report["skipped"] = skipped
+        with _RECENT_LOCK:
+            _RECENT_REPORTS.append(report)
+        logging.info(
+            f"{self.name} finished in {report['total_ms']}ms; critical path: "
+            + " -> ".join(f"{p['stage']}({p['ms']}ms)" for p in report["critical_path"])
+        )
+        return ctx, report
+
+    def _report(self, timings, total_s):
+        # Walk back from the last stage to finish, always through the dep that finished last.
+        path = []
+        if timings:
+            current = max(timings, key=lambda n: timings[n][1])
+            while current is not None:
+                start, end = timings[current]
+                path.append({"stage": current, "ms": round((end - start) * 1000, 1)})
+                deps = [d for d in self.stages[current].deps if d in timings]
+                current = max(deps, key=lambda d: timings[d][1]) if deps else None
+            path.reverse()
+        return {
+            "graph": self.name,
+            "total_ms": round(total_s * 1000, 1),
+            "stages": {n: {"start_ms": round(s * 1000, 1), "end_ms": round(e * 1000, 1)} for n, (s, e) in timings.items()},
+            "critical_path": path,
+        }
+
+
+_BACKGROUND_TASKS = set()  # strong refs so pending background coroutines are not GC'd
+
+
+def _start_background(stage, view):
+    if asyncio.iscoroutinefunction(stage.fn):
+        async def _task():
+            try:
+                await stage.fn(view)
+            except Exception as e:
+                logging.error(f"Background stage {stage.name} failed: {e}")
+
+        task = asyncio.ensure_future(_task())
+        _BACKGROUND_TASKS.add(task)
+        task.add_done_callback(_BACKGROUND_TASKS.discard)
+        return task
+    return run_in_background(stage.fn, view)
+
+
+def run_in_background(fn, *args, **kwargs):
+    def _task():
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            logging.error(f"Background task {getattr(fn, '__name__', fn)} failed: {e}")
+
+    return _BACKGROUND.submit(_task)
+
+
+def recent_reports(limit=5):
+    with _RECENT_LOCK:
+        return list(_RECENT_REPORTS)[-limit:]
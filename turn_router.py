@@ -0,0 +1,242 @@
+import os
+import re
+import time
+import threading
+from collections import deque
+
+# Cheap local routing of a turn, before any LLM call. Works on the English translation of
+# the utterance (plus the native text for short yes/no/greeting words) and picks one of:
+#   greeting / thanks   templated reply
+#   repeat              the previous assistant answer again
+#   slot                a bare profile answer ("I am 65", "farmer from Maharashtra", or
+#                       yes/no to a pending yes/no question); the profile is updated directly
+#                       and the next missing field is asked. When nothing is missing any more
+#                       the turn continues on the full path with the updated profile.
+#   full                everything else: planner -> shortlist -> evaluator
+# A fast route only applies when the whole utterance is accounted for; anything left over
+# beyond filler words sends the turn down the full path.
+
+FIELD_QUESTIONS = {
+    "age": "How old are you?",
+    "state": "Which state do you live in?",
+    "occupation": "What is your occupation? For example farmer, worker or student.",
+    "income_bracket": "What is your family's income level: low, middle or high? Do you have a BPL card?",
+    "gender": "May I know your gender?",
+    "rural": "Do you live in a village?",
+    "has_pucca_house": "Do you already own a pucca house?",
+}
+BOOLEAN_FIELDS = {"rural", "has_pucca_house"}
+
+GREETING_REPLY = "Namaste! I am Swayam, your welfare schemes assistant. Tell me a little about yourself, or ask about any government scheme."
+THANKS_REPLY = "You are welcome! Is there anything else you would like to know about government schemes?"
+
+_STATES = [
+    "andhra pradesh", "arunachal pradesh", "assam", "bihar", "chhattisgarh", "goa", "gujarat",
+    "haryana", "himachal pradesh", "jharkhand", "karnataka", "kerala", "madhya pradesh",
+    "maharashtra", "manipur", "meghalaya", "mizoram", "nagaland", "odisha", "punjab", "rajasthan",
+    "sikkim", "tamil nadu", "telangana", "tripura", "uttar pradesh", "uttarakhand", "west bengal",
+    "delhi", "jammu and kashmir", "ladakh", "puducherry", "chandigarh",
+]
+
+_FILLER = {
+    "i", "im", "i'm", "am", "a", "an", "the", "my", "is", "and", "also", "from", "in", "live",
+    "stay", "we", "are", "by", "as", "work", "of", "our", "family", "it", "that", "please",
+    "ok", "okay", "sir", "madam", "ji", "so", "well", "actually", "be", "state", "now", "very",
+    "much", "there", "swayam", "good", "to", "have", "old",
+}
+_REPEAT_FILLER = {"can", "could", "would", "you", "me", "say", "tell", "what", "again", "once", "more", "answer", "last", "said", "just"}
+
+_GREETING = re.compile(r"\b(hi|hello|hey|namaste|namaskar|namaskaram|vanakkam|ram ram|good (?:morning|afternoon|evening))\b")
+_THANKS = re.compile(r"\b(thanks?(?: you)?|thank u|dhanyavad|shukriya)\b")
+_REPEAT = re.compile(r"\b(repeat(?: that| it)?|say (?:that|it) again|come again|pardon|one more time|didn'?t (?:hear|catch|understand)(?: that| it| you)?)\b")
+_YES = re.compile(r"^(yes|yeah|yep|yup|haan|ha|ho|hoy|ji haan|correct|right)$")
+_NO = re.compile(r"^(no|nope|nahi|nahin|na|not really)$")
+_NATIVE_YES = {"होय", "हो", "हाँ", "हां", "हा", "जी", "जी हाँ"}
+_NATIVE_NO = {"नाही", "नाहीं", "नहीं", "ना", "नको"}
+_NATIVE_GREETING = {"नमस्कार", "नमस्ते", "राम राम", "हॅलो", "हेलो"}
+_NATIVE_THANKS = {"धन्यवाद", "शुक्रिया", "आभार", "थँक्यू"}
+
+_SLOT_PATTERNS = [
+    ("age", re.compile(r"\b(?:my age is|age is|aged?)\s*(\d{1,3})(?:\s*(?:years?|yrs?)(?:\s+old)?)?\b"), lambda m: m.group(1)),
+    ("age", re.compile(r"\b(\d{1,3})\s*(?:years?|yrs?)(?:\s+old)?\b"), lambda m: m.group(1)),
+    ("age", re.compile(r"\b(?:i am|i'm|im)\s+(\d{1,3})\b(?!\s*(?:kg|kilo|rupees|rs|acres?|lakh|thousand|children|kids|members))"), lambda m: m.group(1)),
+    ("gender", re.compile(r"\b(male|man|boy|female|woman|girl|lady)\b"),
+     lambda m: "male" if m.group(1) in ("male", "man", "boy") else "female"),
+    ("occupation", re.compile(r"\b(?:a\s+)?(farmer|farming|agriculture|labou?rer|daily wage worker|worker|student)\b"),
+     lambda m: {"farming": "farmer", "agriculture": "farmer", "laborer": "worker", "labourer": "worker",
+                "daily wage worker": "worker"}.get(m.group(1), m.group(1))),
+    ("income_bracket", re.compile(r"\b(bpl(?: card)?|below poverty line)\b"), lambda m: "bpl"),
+    # low/middle/high only count next to an income word ("low income", "salary is middle");
+    # on their own they are too common ("in the middle of", "high school").
+    ("income_bracket", re.compile(
+        r"\b(?:(low|middle|high)(?:er)?\s+(?:family\s+)?(?:income|salary|earnings?)|"
+        r"(?:income|salary|earnings?|earn)\s+(?:level\s+|bracket\s+)?(?:is\s+)?(?:very\s+|quite\s+)?(low|middle|high))\b"
+        r"(?:\s+(?:bracket|group|level))?"), lambda m: m.group(1) or m.group(2)),
+    ("rural", re.compile(r"\b(?:a\s+)?(village|rural(?: area)?)\b"), lambda m: "yes"),
+    ("rural", re.compile(r"\b(?:a\s+|the\s+)?(city|town|urban(?: area)?)\b"), lambda m: "no"),
+    ("state", re.compile(r"\b(" + "|".join(_STATES) + r")\b"), lambda m: m.group(1).title()),
+]
+
+
+def _clean(text):
+    return " ".join(re.sub(r"[^\w\s']", " ", (text or "").lower()).split())
+
+
+def _only_filler(text, extra=()):
+    return all(w in _FILLER or w in extra for w in text.split())
+
+
+def _strip(pattern, text):
+    # -> (matched?, text with the matches removed)
+    out, n = pattern.subn(" ", text)
+    return n > 0, " ".join(out.split())
+
+
+def extract_slots(text_en, pending_field=None):
+    # -> {field: value} when the utterance is nothing but profile answers, else None.
+    text = _clean(text_en)
+    if not text:
+        return None
+    updates = {}
+    if pending_field == "age":
+        bare = re.fullmatch(r"(\d{1,3})", text)
+        if bare:
+            return {"age": bare.group(1)}
+    if pending_field == "income_bracket":
+        # Bare answer to "What is your family's income level: low, middle or high?"
+        bare = re.fullmatch(r"(?:it is |its |it's )?(low|middle|high)", text)
+        if bare:
+            return {"income_bracket": bare.group(1)}
+    if pending_field in BOOLEAN_FIELDS:
+        if _YES.match(text):
+            return {pending_field: "yes"}
+        if _NO.match(text):
+            return {pending_field: "no"}
+    for field, pattern, value in _SLOT_PATTERNS:
+        if field in updates:
+            continue
+        m = pattern.search(text)
+        if m:
+            updates[field] = value(m)
+            text = " ".join((text[:m.start()] + " " + text[m.end():]).split())
+    if not updates or not _only_filler(text):
+        return None
+    return updates
+
+
+def entities(text_en):
+    # Every profile value mentioned anywhere in the utterance, plus yes/no answers, as a
+    # frozenset of (field, value). Used to tell apart inputs that embed almost identically
+    # ("farmer from Bihar" / "farmer from Assam").
+    text = _clean(text_en)
+    found = set()
+    for field, pattern, value in _SLOT_PATTERNS:
+        for m in pattern.finditer(text):
+            found.add((field, value(m)))
+    for word in text.split():
+        if _YES.match(word):
+            found.add(("answer", "yes"))
+        elif _NO.match(word) or word in ("not", "never"):
+            found.add(("answer", "no"))
+    return frozenset(found)
+
+
+def apply_updates(profile, contradictions, updates):
+    # Same bookkeeping as the planner: changed values are recorded as contradictions.
+    changed = []
+    for field, value in updates.items():
+        old = profile.get(field)
+        if old not in (None, "") and str(old).strip() != str(value).strip():
+            contradictions.append({"field": field, "old": old, "new": value})
+            changed.append((field, old, value))
+        profile[field] = value
+    return changed
+
+
+def _label(field):
+    return field.replace("_", " ")
+
+
+def _last_answer(history):
+    for m in reversed(history):
+        if m.get("role") == "assistant":
+            return m.get("content")
+    return None
+
+
+class TurnRouter:
+
+    def __init__(self, missing_fn):
+        # missing_fn(profile, scheme_ids) -> ordered missing fields for those schemes
+        self.missing_fn = missing_fn
+        self.enabled = os.getenv("TURN_ROUTER_ENABLED", "1") == "1"
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._recent = deque(maxlen=int(os.getenv("TURN_ROUTER_RECENT", "20")))
+
+    def route(self, text_native, text_en, session):
+        # -> {"kind", "reply_en" (None = run the full pipeline), "updates"}
+        started = time.perf_counter()
+        decision = self._decide(text_native, text_en, session) if self.enabled else {"kind": "full", "reply_en": None, "updates": {}}
+        self._record(session, decision["kind"], (time.perf_counter() - started) * 1000)
+        return decision
+
+    def _decide(self, text_native, text_en, session):
+        native = " ".join((text_native or "").replace("!", " ").replace("।", " ").replace(".", " ").split())
+        text = _clean(text_en)
+
+        matched, rest = _strip(_GREETING, text)
+        if (matched and _only_filler(rest)) or native in _NATIVE_GREETING:
+            return {"kind": "greeting", "reply_en": GREETING_REPLY, "updates": {}}
+        matched, rest = _strip(_THANKS, text)
+        if (matched and _only_filler(rest, {"you"})) or native in _NATIVE_THANKS:
+            return {"kind": "thanks", "reply_en": THANKS_REPLY, "updates": {}}
+        matched, rest = _strip(_REPEAT, text)
+        if matched and _only_filler(rest, _REPEAT_FILLER):
+            last = _last_answer(session.history)
+            if last:
+                return {"kind": "repeat", "reply_en": last, "updates": {}}
+
+        pending = session.pending_field
+        updates = None
+        if pending in BOOLEAN_FIELDS and native in (_NATIVE_YES | _NATIVE_NO):
+            updates = {pending: "yes" if native in _NATIVE_YES else "no"}
+        if updates is None:
+            updates = extract_slots(text_en, pending)
+        if not updates:
+            return {"kind": "full", "reply_en": None, "updates": {}}
+
+        changed = apply_updates(session.profile, session.contradictions, updates)
+        remaining = [f for f in self.missing_fn(session.profile, session.last_shortlist) if f not in updates]
+        if not remaining:
+            # Profile complete for the schemes under discussion: let the evaluator answer.
+            session.pending_field = None
+            return {"kind": "slot+full", "reply_en": None, "updates": updates}
+
+        noted = []
+        for field, value in updates.items():
+            before = next((old for f, old, _ in changed if f == field), None)
+            if before is not None:
+                noted.append(f"updated your {_label(field)} from {before} to {value}")
+            else:
+                noted.append(f"your {_label(field)} is {value}")
+        session.pending_field = remaining[0]
+        question = FIELD_QUESTIONS.get(remaining[0], f"What is your {_label(remaining[0])}?")
+        reply = "Thank you, noted: " + ", ".join(noted) + ". " + question
+        return {"kind": "slot", "reply_en": reply, "updates": updates}
+
+    def _record(self, session, kind, ms):
+        with self._lock:
+            self._counts[kind] = self._counts.get(kind, 0) + 1
+            self._recent.append({"session": session.session_id, "route": kind, "ms": round(ms, 2), "at": time.time()})
+
+    def stats(self):
+        with self._lock:
+            total = sum(self._counts.values())
+            fast = sum(n for k, n in self._counts.items() if k not in ("full", "slot+full"))
+            return {
+                "enabled": self.enabled,
+                "routes": dict(self._counts),
+                "fast_ratio": round(fast / total, 3) if total else 0.0,
+                "recent": list(self._recent)[-5:],
+            }